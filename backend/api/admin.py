@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import User, Article, Comment, Category, UserStats, WellnessPlan, WorkoutSession, ExerciseSet, Exercise, Recipe, DailyLog, CustomEvent, Badge, UserBadge
+from django.contrib.sessions.models import Session
+from django.db.models import OuterRef, Subquery
+from .models import User, Article, Comment, Category, UserStats, WellnessPlan, WorkoutSession, ExerciseSet, Exercise, Recipe, DailyLog, CustomEvent, Badge, UserBadge, UserWorkoutAggregate, UserSession
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -29,6 +31,13 @@ class UserStatsAdmin(admin.ModelAdmin):
     list_display = ('user', 'level', 'xp', 'health_score')
     search_fields = ('user__username', 'user__email')
 
+    def save_model(self, request, obj, form, change):
+        # save() sans update_fields ignore l'XP, le niveau et les compteurs (écrits atomiquement)
+        if change:
+            obj.save(update_fields=form.changed_data)
+        else:
+            obj.save()
+
 @admin.register(WellnessPlan)
 class WellnessPlanAdmin(admin.ModelAdmin):
     """
@@ -75,7 +84,7 @@ class WorkoutSessionAdmin(admin.ModelAdmin):
     list_display = ('user', 'started_at', 'duration_minutes', 'status', 'total_volume')
     list_filter = ('status', 'started_at')
     search_fields = ('user__username', 'notes')
-    readonly_fields = ('started_at', 'completed_at', 'duration_minutes', 'total_volume')
+    readonly_fields = ('started_at', 'completed_at', 'duration_minutes', 'total_volume', 'sets_count')
     inlines = [ExerciseSetInline]
     
     def get_queryset(self, request):
@@ -93,6 +102,19 @@ class ExerciseSetAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('session__user', 'exercise')
 
+@admin.register(UserWorkoutAggregate)
+class UserWorkoutAggregateAdmin(admin.ModelAdmin):
+    """
+    Agrégats analytics (lecture seule, maintenus automatiquement).
+    """
+    list_display = ('user', 'date', 'muscle_group', 'sessions_count', 'sets_count', 'volume', 'duration_minutes')
+    list_filter = ('muscle_group', 'date')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'date', 'muscle_group', 'sessions_count', 'duration_minutes', 'sets_count', 'volume')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
 @admin.register(Exercise)
 class ExerciseAdmin(admin.ModelAdmin):
     """
@@ -152,3 +174,21 @@ class UserBadgeAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'badge')
+
+@admin.register(UserSession)
+class UserSessionAdmin(admin.ModelAdmin):
+    """
+    Index des sessions ouvertes (maintenu à la connexion / déconnexion).
+    L'expiration affichée est celle de django_session.
+    """
+    list_display = ('user', 'ip', 'expire_date', 'created_at')
+    search_fields = ('user__username', 'ip')
+    readonly_fields = ('user', 'session_key', 'expire_date', 'ip', 'user_agent', 'created_at')
+
+    def get_queryset(self, request):
+        expire_date = Session.objects.filter(session_key=OuterRef('session_key')).values('expire_date')[:1]
+        return super().get_queryset(request).select_related('user').annotate(expire_date=Subquery(expire_date))
+
+    @admin.display(description='Expire le', ordering='expire_date')
+    def expire_date(self, obj):
+        return obj.expire_date
@@ -0,0 +1,33 @@
+"""
+Management command qui (re)construit la table UserWorkoutAggregate
+à partir des séances et sets existants (réparation ; la migration 0025
+fait le remplissage initial).
+
+Usage:
+    python manage.py backfill_workout_aggregates
+    python manage.py backfill_workout_aggregates --user alice  # un seul utilisateur
+"""
+from django.core.management.base import BaseCommand, CommandError
+from api.models import User
+from api.services.aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les agrégats d\'entraînement (par jour et par groupe musculaire)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username ou ID d\'un utilisateur (par défaut : tous)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            lookup = options['user']
+            user = User.objects.filter(id=lookup).first() if lookup.isdigit() else None
+            user = user or User.objects.filter(username=lookup).first()
+            if user is None:
+                raise CommandError(f"Utilisateur introuvable : {lookup}")
+            user_ids = [user.id]
+
+        created = rebuild_aggregates(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {created} lignes d'agrégats reconstruites."))
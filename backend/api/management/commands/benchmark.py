@@ -0,0 +1,292 @@
+"""
+Management command qui mesure la latence des pages et endpoints clés sur le
+jeu de données synthétique (seed_load) et la compare à une référence versionnée.
+
+Pour chaque cible : p50 / p95 de latence et requêtes SQL par appel ; pour le
+run : pic de mémoire (RSS). Une régression au-delà du seuil (latence, mémoire)
+ou toute requête SQL en plus fait échouer la commande.
+
+Une cible qui ne répond pas en 2xx est signalée avec son statut et fait
+échouer la commande (la référence n'est alors pas écrite). Les volumes du jeu
+de données sont enregistrés avec la référence : sur un autre volume, seules
+les requêtes SQL sont comparées.
+
+Par défaut les requêtes passent par le client de test Django (en processus).
+Avec --gunicorn, un serveur local est lancé et interrogé en HTTP ; les requêtes
+SQL sont alors lues dans l'en-tête Server-Timing (staff ou DEBUG uniquement).
+Le superuser de mesure (bench_admin) est créé pour le run puis supprimé.
+
+La référence versionnée (benchmarks/baseline.json) est mesurée sur le
+seed_load par défaut (--scale 0.01 --days 730 --seed 42, SQLite).
+
+Usage:
+    python manage.py seed_load
+    python manage.py benchmark
+    python manage.py benchmark --only dashboard --only analytics --requests 50
+    python manage.py benchmark --gunicorn
+    python manage.py benchmark --update-baseline   # après une amélioration assumée
+"""
+import json
+import logging
+import re
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.management.commands.seed_load import USERNAME_PREFIX
+from api.models import Article, User, UserStats, WorkoutSession
+
+BASELINE_PATH = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+DEFAULT_THRESHOLD = 0.25  # +25 % sur p50 / p95 / RSS
+ADMIN_USERNAME = 'bench_admin'
+NOISE_MS = 5.0            # Écart absolu toléré : le p95 sur 20 appels encaisse un pic isolé
+
+# (nom, nom d'URL, client) — client : 'user' (session), 'admin' (superuser), 'api' (JWT)
+TARGETS = [
+    ('home', 'home', 'user'),
+    ('dashboard', 'dashboard', 'user'),
+    ('analytics', 'analytics', 'user'),
+    ('leaderboard', 'leaderboard', 'user'),
+    ('workout_history', 'workout_history', 'user'),
+    ('blog_list', 'blog_list', 'user'),
+    ('article_detail', 'article_detail', 'user'),
+    ('profile', 'profile', 'user'),
+    ('admin_panel', 'admin_panel', 'admin'),
+    ('api_sessions', 'api:workout-sessions-list', 'api'),
+    ('api_stats', 'api:workout-sessions-stats', 'api'),
+    ('api_records', 'api:workout-sessions-records', 'api'),
+    ('api_series', 'api:workout-series', 'api'),
+    ('api_articles', 'api:article-list', 'api'),
+]
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(values, pct):
+    """Percentile au rang le plus proche (valeurs non vides)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil sans float
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Pic de RSS (ru_maxrss est en Ko sous Linux, en octets sous macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Command(BaseCommand):
+    help = 'Mesure la latence des pages et endpoints clés et la compare à la référence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Appels mesurés par cible')
+        parser.add_argument('--warmup', type=int, default=2, help='Appels de chauffe par cible (non mesurés)')
+        parser.add_argument('--only', action='append', choices=[t[0] for t in TARGETS], help='Cible(s) à mesurer')
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--threshold', type=float, help='Régression tolérée (0.25 = +25 %%)')
+        parser.add_argument('--update-baseline', action='store_true', help='Écrit les mesures comme nouvelle référence')
+        parser.add_argument('--output', help='Écrit aussi les mesures dans ce fichier JSON')
+        parser.add_argument('--gunicorn', action='store_true', help='Mesure via un gunicorn local (HTTP)')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError("--requests doit valoir au moins 1.")
+        self.options = options
+        targets = [t for t in TARGETS if not options['only'] or t[0] in options['only']]
+        admin = self.create_admin() if any(kind == 'admin' for _, _, kind in targets) else None
+        server = None
+        metrics_logger = logging.getLogger('api.metrics')
+        metrics_level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)  # Une ligne par appel : le tableau suffit
+        try:
+            credentials = self.credentials(admin)
+            server = self.start_gunicorn(options['port']) if options['gunicorn'] else None
+            endpoints, failures = {}, []
+            for name, url_name, kind in targets:
+                endpoints[name] = result = self.measure(self.url(url_name), credentials[kind])
+                if 'p50_ms' not in result:
+                    failures.append(f"{name} : {result['path']} a répondu {result['status']}")
+                    self.stdout.write(f"  {name:<16} ❌ HTTP {result['status']}")
+                    continue
+                queries = '-' if result['queries'] is None else result['queries']
+                self.stdout.write(f"  {name:<16} p50 {result['p50_ms']:>8.1f} ms   "
+                                  f"p95 {result['p95_ms']:>8.1f} ms   {queries:>4} requêtes")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+            if admin is not None:
+                admin.delete()
+            metrics_logger.setLevel(metrics_level)
+        rss = peak_rss_mb(resource.RUSAGE_CHILDREN if server is not None else resource.RUSAGE_SELF)
+        self.stdout.write(f"  pic RSS : {rss} Mo")
+
+        results = {'mode': 'gunicorn' if server is not None else 'client', 'dataset': self.dataset,
+                   'requests': options['requests'], 'peak_rss_mb': rss, 'endpoints': endpoints}
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+        if failures:
+            for line in failures:
+                self.stderr.write(f"  ❌ {line}")
+            raise CommandError(f"{len(failures)} cible(s) en erreur")
+
+        path = Path(options['baseline'])
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+        if options['update_baseline']:
+            results['threshold'] = baseline.get('threshold', DEFAULT_THRESHOLD)
+            previous = baseline.get('endpoints', {}) if baseline.get('dataset') == results['dataset'] else {}
+            results['endpoints'] = {**previous, **endpoints}
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"📌 Référence mise à jour : {path}"))
+            return
+
+        if baseline.get('mode', results['mode']) != results['mode']:
+            raise CommandError(f"La référence {path} a été mesurée en mode {baseline['mode']}, pas {results['mode']}.")
+        regressions = self.compare(results, baseline)
+        if regressions:
+            for line in regressions:
+                self.stderr.write(f"  ❌ {line}")
+            raise CommandError(f"{len(regressions)} régression(s) par rapport à {path}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(endpoints)} cibles dans la référence"))
+
+    # --- Préparation ----------------------------------------------------------
+    def create_admin(self):
+        """Superuser de mesure, supprimé en fin de run (refuse d'écraser un compte existant)."""
+        if User.objects.filter(username=ADMIN_USERNAME).exists():
+            raise CommandError(f"L'utilisateur {ADMIN_USERNAME} existe déjà : supprimez-le ou excluez admin_panel.")
+        return User.objects.create_superuser(
+            ADMIN_USERNAME, f'{ADMIN_USERNAME}@fitwell.local', None, is_onboarded=True,
+        )
+
+    def credentials(self, admin):
+        """En-têtes (cookie de session ou JWT) par type de client."""
+        seeded = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        stats = (UserStats.objects.filter(user__in=seeded)
+                 .select_related('user').order_by('-completed_workouts', 'user_id').first())
+        if stats is None:
+            raise CommandError("Aucune donnée seed_load : lancez d'abord python manage.py seed_load.")
+        user = stats.user  # L'utilisateur le plus actif : le cas le plus lourd
+        self.dataset = {
+            'users': seeded.count(),
+            'sessions': WorkoutSession.objects.filter(user__in=seeded).count(),
+        }
+        self.article = Article.objects.filter(is_published=True).order_by('-created_at').first()
+
+        def session_cookie(account):
+            client = Client()
+            client.force_login(account)
+            return {'Cookie': f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'}
+
+        return {
+            'user': session_cookie(user),
+            'admin': session_cookie(admin) if admin is not None else None,
+            'api': {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'},
+        }
+
+    def url(self, url_name):
+        if url_name == 'article_detail':
+            if self.article is None:
+                raise CommandError("Aucun article publié pour article_detail.")
+            return reverse(url_name, kwargs={'slug': self.article.slug})
+        return reverse(url_name)
+
+    def start_gunicorn(self, port):
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.wsgi', '--bind', f'127.0.0.1:{port}', '--workers', '1'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn s'est arrêté au démarrage.")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"gunicorn n'écoute pas sur le port {port}.")
+
+    # --- Mesure ---------------------------------------------------------------
+    def call(self, path, headers):
+        """Un appel : (statut, durée en ms, requêtes SQL ou None)."""
+        if self.options['gunicorn']:
+            request = urllib.request.Request(f"http://127.0.0.1:{self.options['port']}{path}", headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    status, timing = response.status, response.headers.get('Server-Timing', '')
+            except urllib.error.HTTPError as error:
+                status, timing = error.code, ''
+            elapsed = (time.perf_counter() - start) * 1000
+            match = SERVER_TIMING_QUERIES.search(timing)
+            return status, elapsed, int(match.group(1)) if match else None
+
+        client = Client(raise_request_exception=False, **{f"HTTP_{key.upper().replace('-', '_')}": value for key, value in headers.items()})
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(path)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed, len(queries)
+
+    def measure(self, path, headers):
+        """Mesures d'une cible, ou {'path', 'status'} dès le premier appel hors 2xx."""
+        for _ in range(self.options['warmup']):
+            status, _, _ = self.call(path, headers)
+            if not 200 <= status < 300:
+                return {'path': path, 'status': status}
+        timings, queries = [], None
+        for _ in range(self.options['requests']):
+            status, elapsed, count = self.call(path, headers)
+            if not 200 <= status < 300:
+                return {'path': path, 'status': status}
+            timings.append(elapsed)
+            queries = count if queries is None or count is None else max(queries, count)
+        return {
+            'path': path,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': queries,
+        }
+
+    def compare(self, results, baseline):
+        """Lignes décrivant chaque régression par rapport à la référence."""
+        threshold = self.options['threshold']
+        if threshold is None:
+            threshold = baseline.get('threshold', DEFAULT_THRESHOLD)
+        regressions = []
+        reference = baseline.get('endpoints', {})
+        timed = baseline.get('dataset', results['dataset']) == results['dataset']
+        if not timed:
+            self.stdout.write(f"  ⚠️  Jeu de données {results['dataset']} différent de la référence "
+                              f"{baseline['dataset']} : seules les requêtes SQL sont comparées.")
+        for name, current in results['endpoints'].items():
+            base = reference.get(name)
+            if base is None:
+                self.stdout.write(f"  {name} : pas de référence (--update-baseline pour l'enregistrer)")
+                continue
+            for key in ('p50_ms', 'p95_ms') if timed else ():
+                limit = base[key] * (1 + threshold) + NOISE_MS
+                if current[key] > limit:
+                    regressions.append(f"{name} {key} : {current[key]} ms (référence {base[key]} ms)")
+            if None not in (current['queries'], base.get('queries')) and current['queries'] > base['queries']:
+                regressions.append(f"{name} : {current['queries']} requêtes SQL (référence {base['queries']})")
+        base_rss = baseline.get('peak_rss_mb')
+        if timed and base_rss and results['peak_rss_mb'] > base_rss * (1 + threshold):
+            regressions.append(f"pic RSS : {results['peak_rss_mb']} Mo (référence {base_rss} Mo)")
+        return regressions
@@ -0,0 +1,35 @@
+"""
+Management command qui exporte toutes les données d'un utilisateur (profil,
+plans, journal, séances, sets, agenda, badges, commentaires) dans un zip,
+écrit en streaming (voir api.services.archive).
+
+Usage:
+    python manage.py export_user_data johndoe
+    python manage.py export_user_data johndoe --format csv --output /tmp/johndoe.zip
+"""
+from django.core.management.base import BaseCommand, CommandError
+from api.models import User
+from api.services.archive import ARCHIVE_FORMATS, archive_filename, iter_user_archive
+
+
+class Command(BaseCommand):
+    help = 'Exporte toutes les données d\'un utilisateur dans une archive zip (NDJSON ou CSV)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Nom d'utilisateur ou email")
+        parser.add_argument('--format', choices=ARCHIVE_FORMATS, default='ndjson')
+        parser.add_argument('--output', help="Chemin du zip (par défaut : fitwell_<user>_<date>_<format>.zip)")
+
+    def handle(self, *args, **options):
+        identifier = options['username']
+        user = User.objects.filter(username=identifier).first() or User.objects.filter(email=identifier).first()
+        if user is None:
+            raise CommandError(f"Utilisateur introuvable : {identifier}")
+
+        path = options['output'] or archive_filename(user, options['format'])
+        size = 0
+        with open(path, 'wb') as output:
+            for chunk in iter_user_archive(user.id, fmt=options['format']):
+                output.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"✅ Archive de {user.username} écrite : {path} ({size} octets)"))
@@ -0,0 +1,34 @@
+"""
+Management command qui reconstruit les classements triés en cache depuis la base
+(préchauffage après un déploiement, ou pour réparer une dérive). Facultative :
+sans elle, le premier worker qui trouve le cache froid construit le classement
+une fois sa réponse envoyée. Avec LocMem (cache propre à chaque processus), le
+classement construit ici n'est visible que de cette commande.
+
+Usage:
+    python manage.py rebuild_leaderboard_cache
+    python manage.py rebuild_leaderboard_cache --metric xp
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.services.ranking import METRICS, get_board, rebuild_boards
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les classements en cache (XP, streak, séances)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, help='Une seule métrique (par défaut : toutes)')
+
+    def handle(self, *args, **options):
+        metrics = [options['metric']] if options['metric'] else METRICS
+        if 'locmem' in settings.CACHE_BACKEND:
+            self.stdout.write(self.style.WARNING(
+                "⚠️  Cache LocMem : classements propres à ce processus, les workers web construiront les leurs."
+            ))
+        rebuild_boards(metrics)
+        for metric in metrics:
+            board = get_board(metric)
+            size = len(board) if board is not None else 0
+            self.stdout.write(f'  {metric}: {size} utilisateurs')
+        self.stdout.write(self.style.SUCCESS(f"🏆 Classements reconstruits : {', '.join(metrics)}"))
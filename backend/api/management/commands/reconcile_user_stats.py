@@ -0,0 +1,40 @@
+"""
+Management command qui recalcule les compteurs dénormalisés de UserStats
+(séances terminées, volume cumulé, commentaires, plans) et répare ceux qui
+ont dérivé (la migration 0024 les remplit à l'installation). À lancer en cron.
+
+Usage:
+    python manage.py reconcile_user_stats
+    python manage.py reconcile_user_stats --user alice --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from api.models import User
+from api.services.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Répare les compteurs dénormalisés de UserStats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username ou ID d\'un utilisateur (par défaut : tous)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Affiche les écarts sans les corriger')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            lookup = options['user']
+            user = User.objects.filter(id=lookup).first() if lookup.isdigit() else None
+            user = user or User.objects.filter(username=lookup).first()
+            if user is None:
+                raise CommandError(f"Utilisateur introuvable : {lookup}")
+            user_ids = [user.id]
+
+        drifted = reconcile_counters(user_ids=user_ids, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        for stats in drifted[:20]:
+            self.stdout.write(
+                f"  user {stats.user_id}: {stats.completed_workouts} séances, {stats.lifetime_volume:.0f} kg, "
+                f"{stats.comment_count} commentaires, {stats.plan_count} plans"
+            )
+        verb = 'à corriger' if options['dry_run'] else 'corrigés'
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(drifted)} compteurs {verb}."))
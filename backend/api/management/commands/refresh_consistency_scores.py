@@ -0,0 +1,21 @@
+"""
+Management command qui recalcule le score de régularité de tous les
+utilisateurs. Les écritures (journal, séance, import) le tiennent à jour ;
+ce cron quotidien fait glisser la fenêtre de 30 jours pour les inactifs.
+
+Usage:
+    python manage.py refresh_consistency_scores
+"""
+from django.core.management.base import BaseCommand
+from api.services.consistency import refresh_consistency_scores
+
+
+class Command(BaseCommand):
+    help = 'Recalcule le score de régularité (jours actifs sur 30 jours)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = refresh_consistency_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {changed} scores de régularité mis à jour."))
@@ -0,0 +1,25 @@
+"""
+Management command qui recalcule le snapshot du classement (top N par métrique).
+À lancer périodiquement (cron, toutes les LEADERBOARD_REFRESH_SECONDS). La page
+classement ne le réécrit jamais : au-delà de ce délai, elle lit le top N en
+direct (requête indexée) tant que le snapshot n'a pas été recalculé.
+
+Usage:
+    python manage.py refresh_leaderboard
+    python manage.py refresh_leaderboard --metric xp --size 50
+"""
+from django.core.management.base import BaseCommand
+from api.services.leaderboard import METRICS, LEADERBOARD_SIZE, refresh_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recalcule le snapshot du classement global'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, help='Une seule métrique (par défaut : toutes)')
+        parser.add_argument('--size', type=int, default=LEADERBOARD_SIZE)
+
+    def handle(self, *args, **options):
+        metrics = [options['metric']] if options['metric'] else METRICS
+        refresh_leaderboard(metrics=metrics, size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f"🏆 Classement rafraîchi : {', '.join(metrics)}"))
@@ -0,0 +1,347 @@
+"""
+Management command qui génère un jeu de données synthétique volumineux pour
+observer le comportement à l'échelle (benchmarks, plans d'exécution, budgets
+de requêtes).
+
+À --scale 1 : 100k utilisateurs, ≈1M séances et ≈10M sets, des années de
+journaux quotidiens et des milliers d'articles avec tags, likes et commentaires.
+Le nombre moyen de séances par utilisateur découle du total de sets visé
+(FULL_SCALE['sets']) : les volumes restent proportionnels à --scale.
+Tout passe par bulk_create en lots, avec une graine fixe : deux exécutions à
+la même date produisent les mêmes données.
+
+bulk_create ne déclenche aucun signal : UserStats, totaux par exercice et
+compteurs sont calculés en mémoire, les agrégats et classements reconstruits
+à la fin (comme l'import d'historique, api.services.workout_import).
+
+Usage:
+    python manage.py seed_load                  # scale 0.01 : 1k utilisateurs, ≈10k séances, ≈100k sets
+    python manage.py seed_load --scale 1        # volumes complets
+    python manage.py seed_load --scale 0.1 --days 365 --seed 7
+    python manage.py seed_load --flush          # supprime d'abord les données d'une exécution précédente
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, time as dt_time
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import (
+    Article, Category, Comment, DailyLog, Exercise, ExerciseSet, SessionExerciseTally,
+    Tag, User, UserStats, UserWorkoutAggregate, WorkoutSession,
+)
+from api.models.gamification import cumulative_xp, level_for_cumulative_xp
+from api.services.aggregates import rebuild_aggregates
+from api.services.consistency import refresh_consistency_scores
+
+USERNAME_PREFIX = 'load_'
+SLUG_PREFIX = 'load-'
+PASSWORD = 'loadtest2026'
+
+# Volumes à --scale 1
+FULL_SCALE = {
+    'users': 100_000,
+    'sets': 10_000_000,
+    'articles': 5_000,
+    'tags': 200,
+}
+SETS_PER_SESSION = (4, 16)  # 10 sets en moyenne par séance terminée
+LOG_RATE = 0.1              # Part moyenne des jours avec un DailyLog
+LIKES_PER_ARTICLE = 20
+COMMENTS_PER_ARTICLE = 10
+TAGS_PER_ARTICLE = (1, 4)
+CANCELLED_RATE = 0.03
+
+# Utilisateurs traités ensemble : borne la mémoire (~100k sets par lot à l'échelle 1)
+USERS_PER_CHUNK = 100
+CATEGORY_NAMES = [
+    "Entraînement Force", "Nutrition Performance", "Mental & Mindset",
+    "Récupération", "Bio-Hacking", "Cardio & Endurance",
+]
+
+
+@contextmanager
+def historical_dates(*fields):
+    """Désactive auto_now_add le temps du seed pour écrire des dates passées."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données synthétique volumineux (benchmarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.01,
+                            help='Facteur appliqué aux volumes (1 = 100k utilisateurs, ≈10M sets)')
+        parser.add_argument('--days', type=int, default=730, help='Profondeur de l\'historique en jours')
+        parser.add_argument('--log-rate', type=float, default=LOG_RATE,
+                            help='Part moyenne des jours avec un journal quotidien')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--flush', action='store_true', help='Supprime les données d\'un seed_load précédent')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0 or options['days'] < 1:
+            raise CommandError("--scale doit être positif et --days au moins 1.")
+        if options['flush']:
+            self.flush()
+        elif User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError("Des données seed_load existent déjà : relancez avec --flush.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.days = options['days']
+        self.log_rate = options['log_rate']
+        self.today = timezone.localdate()
+        counts = {name: max(1, round(value * options['scale'])) for name, value in FULL_SCALE.items()}
+        # 10M sets / 100k utilisateurs / 10 sets par séance ≈ 10 séances par utilisateur (annulées comprises)
+        self.sessions_per_user = counts['sets'] / counts['users'] / (sum(SETS_PER_SESSION) / 2) / (1 - CANCELLED_RATE)
+
+        started = time.perf_counter()
+        exercise_ids = self.exercise_ids()
+        with historical_dates(
+            ExerciseSet._meta.get_field('created_at'), DailyLog._meta.get_field('date'),
+            Article._meta.get_field('created_at'), Comment._meta.get_field('created_at'),
+        ):
+            user_ids = self.create_users(counts['users'])
+            comment_counts = self.create_content(user_ids, counts['articles'], counts['tags'])
+            totals = {'sessions': 0, 'sets': 0, 'logs': 0}
+            for start in range(0, len(user_ids), USERS_PER_CHUNK):
+                chunk = user_ids[start:start + USERS_PER_CHUNK]
+                for key, value in self.create_activity(chunk, exercise_ids, comment_counts).items():
+                    totals[key] += value
+                self.stdout.write(f"   … {start + len(chunk)}/{len(user_ids)} utilisateurs, {totals['sets']} sets")
+
+        refresh_consistency_scores(batch_size=self.batch_size)
+        self.stdout.write('Reconstruction des classements...')
+        call_command('rebuild_leaderboard_cache', stdout=self.stdout)
+        call_command('refresh_leaderboard', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(user_ids)} utilisateurs, {totals['sessions']} séances, {totals['sets']} sets, "
+            f"{totals['logs']} journaux, {counts['articles']} articles "
+            f"en {time.perf_counter() - started:.0f}s (mot de passe : {PASSWORD})"
+        ))
+
+    def flush(self):
+        self.stdout.write('Suppression des données seed_load précédentes...')
+        quote = connection.ops.quote_name
+        users = (f"SELECT id FROM {quote(User._meta.db_table)} "
+                 f"WHERE username LIKE %s ESCAPE '\\'")
+        sessions = (f"SELECT id FROM {quote(WorkoutSession._meta.db_table)} "
+                    f"WHERE {quote('user_id')} IN ({users})")
+        pattern = USERNAME_PREFIX.replace('_', '\\_') + '%'
+        with transaction.atomic():
+            # Tables volumineuses : DELETE SQL direct, sans charger ni signaler chaque ligne
+            # (les comptes supprimés emportent de toute façon leurs stats et agrégats)
+            with connection.cursor() as cursor:
+                for model, field, subquery in (
+                    (ExerciseSet, 'session', sessions),
+                    (SessionExerciseTally, 'session', sessions),
+                    (WorkoutSession, 'user', users),
+                    (DailyLog, 'user', users),
+                    (UserWorkoutAggregate, 'user', users),
+                ):
+                    column = model._meta.get_field(field).column
+                    cursor.execute(
+                        f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({subquery})",
+                        [pattern],
+                    )
+            Article.objects.filter(slug__startswith=SLUG_PREFIX).delete()
+            Tag.objects.filter(slug__startswith=SLUG_PREFIX).delete()
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def exercise_ids(self):
+        if not Exercise.objects.exists():
+            call_command('seed_exercises', stdout=self.stdout)
+        return list(Exercise.objects.order_by('id').values_list('id', flat=True))
+
+    def moment(self, days_ago):
+        """Datetime (aware) à `days_ago` jours d'aujourd'hui, heure de journée tirée au hasard."""
+        day = self.today - timedelta(days=days_ago)
+        return timezone.make_aware(datetime.combine(day, dt_time(self.rng.randint(6, 21), self.rng.randint(0, 59))))
+
+    # --- Utilisateurs ---------------------------------------------------------
+    def create_users(self, count):
+        self.stdout.write(f'Création de {count} utilisateurs...')
+        password = make_password(PASSWORD)  # Un seul hachage pour tout le monde
+        for start in range(0, count, self.batch_size):
+            User.objects.bulk_create([
+                User(
+                    username=f'{USERNAME_PREFIX}{number:06d}',
+                    email=f'{USERNAME_PREFIX}{number:06d}@load.fitwell.local',
+                    password=password,
+                    is_onboarded=True,
+                    is_verified=self.rng.random() < 0.6,
+                    date_joined=self.moment(self.rng.randrange(self.days)),
+                    last_login=self.moment(self.rng.randrange(min(self.days, 60))),
+                    login_count=self.rng.randint(1, 300),
+                )
+                for number in range(start, min(start + self.batch_size, count))
+            ], batch_size=self.batch_size)
+        return list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id').values_list('id', flat=True)
+        )
+
+    # --- Blog -----------------------------------------------------------------
+    def create_content(self, user_ids, article_count, tag_count):
+        """Articles, tags, likes et commentaires. Retourne {user_id: commentaires écrits}."""
+        self.stdout.write(f'Création de {article_count} articles, {tag_count} tags...')
+        rng = self.rng
+        categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES]
+        Tag.objects.bulk_create(
+            [Tag(name=f'{SLUG_PREFIX}tag-{n}', slug=f'{SLUG_PREFIX}tag-{n}') for n in range(tag_count)],
+            batch_size=self.batch_size,
+        )
+        tag_ids = list(Tag.objects.filter(slug__startswith=SLUG_PREFIX).values_list('id', flat=True))
+        authors = rng.sample(user_ids, min(len(user_ids), max(1, article_count // 10)))
+
+        articles = Article.objects.bulk_create([
+            Article(
+                title=f'Article de charge {n}',
+                slug=f'{SLUG_PREFIX}article-{n}',
+                author_id=rng.choice(authors),
+                category=rng.choice(categories),
+                content=f'<p>Contenu synthétique {n}.</p>' * rng.randint(5, 40),
+                is_published=rng.random() < 0.9,
+                created_at=self.moment(rng.randrange(self.days)),
+            )
+            for n in range(article_count)
+        ], batch_size=self.batch_size)
+
+        ArticleTag, ArticleLike = Article.tags.through, Article.likes.through
+        tags, likes, comments = [], [], []
+        comment_counts = {}
+        for article in articles:
+            tags.extend(
+                ArticleTag(article_id=article.id, tag_id=tag_id)
+                for tag_id in rng.sample(tag_ids, min(len(tag_ids), rng.randint(*TAGS_PER_ARTICLE)))
+            )
+            likes.extend(
+                ArticleLike(article_id=article.id, user_id=user_id)
+                for user_id in rng.sample(user_ids, min(len(user_ids), rng.randint(0, 2 * LIKES_PER_ARTICLE)))
+            )
+            for _ in range(rng.randint(0, 2 * COMMENTS_PER_ARTICLE)):
+                author_id = rng.choice(user_ids)
+                comment_counts[author_id] = comment_counts.get(author_id, 0) + 1
+                comments.append(Comment(
+                    article_id=article.id, author_id=author_id,
+                    content=f'Commentaire synthétique sur l\'article {article.id}.',
+                    created_at=article.created_at + timedelta(hours=rng.randint(1, 24 * 30)),
+                ))
+        ArticleTag.objects.bulk_create(tags, batch_size=self.batch_size)
+        ArticleLike.objects.bulk_create(likes, batch_size=self.batch_size)
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        return comment_counts
+
+    # --- Entraînements, journaux, statistiques --------------------------------
+    def create_activity(self, user_ids, exercise_ids, comment_counts):
+        """Séances, sets, totaux par exercice, journaux et UserStats d'un lot d'utilisateurs."""
+        rng = self.rng
+        sessions, session_sets, logs = [], [], []
+        for user_id in user_ids:
+            # Assiduité très variable d'un utilisateur à l'autre (moyenne ≈ self.sessions_per_user)
+            session_count = min(self.days, round(rng.expovariate(1 / self.sessions_per_user)))
+            for days_ago in rng.sample(range(self.days), session_count):
+                started_at = self.moment(days_ago)
+                cancelled = rng.random() < CANCELLED_RATE
+                sets = [] if cancelled else self.build_sets(exercise_ids, started_at)
+                duration = rng.randint(25, 90)
+                sessions.append(WorkoutSession(
+                    user_id=user_id, started_at=started_at,
+                    completed_at=None if cancelled else started_at + timedelta(minutes=duration),
+                    duration_minutes=0 if cancelled else duration,
+                    status='cancelled' if cancelled else 'completed',
+                    total_volume=sum(s.weight * s.reps for s in sets), sets_count=len(sets),
+                ))
+                session_sets.append(sets)
+
+            log_rate = min(1.0, rng.expovariate(1 / self.log_rate)) if self.log_rate > 0 else 0
+            for days_ago in rng.sample(range(self.days), int(self.days * log_rate)):
+                logs.append(DailyLog(
+                    user_id=user_id, date=self.today - timedelta(days=days_ago),
+                    water_liters=round(rng.uniform(0.5, 4), 1), sleep_hours=round(rng.uniform(4, 10), 1),
+                    mood=rng.randint(1, 10), weight=round(rng.gauss(75, 12), 1) if rng.random() < 0.3 else None,
+                ))
+
+        with transaction.atomic():
+            WorkoutSession.objects.bulk_create(sessions, batch_size=self.batch_size)
+            exercise_sets, tallies = [], {}
+            for session, sets in zip(sessions, session_sets):
+                for exercise_set in sets:
+                    exercise_set.session_id = session.id
+                    tally = tallies.get((session.id, exercise_set.exercise_id))
+                    if tally is None:
+                        tally = tallies[(session.id, exercise_set.exercise_id)] = SessionExerciseTally(
+                            session_id=session.id, exercise_id=exercise_set.exercise_id,
+                        )
+                    tally.sets_count += 1
+                    tally.volume += exercise_set.volume
+                exercise_sets.extend(sets)
+            ExerciseSet.objects.bulk_create(exercise_sets, batch_size=self.batch_size)
+            SessionExerciseTally.objects.bulk_create(tallies.values(), batch_size=self.batch_size)
+            DailyLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            UserStats.objects.bulk_create(
+                self.build_stats(user_ids, sessions, logs, comment_counts), batch_size=self.batch_size,
+            )
+            rebuild_aggregates(user_ids=user_ids, batch_size=self.batch_size)
+        return {'sessions': len(sessions), 'sets': len(exercise_sets), 'logs': len(logs)}
+
+    def build_sets(self, exercise_ids, started_at):
+        """Sets d'une séance : quelques exercices, plusieurs séries chacun."""
+        rng = self.rng
+        remaining = rng.randint(*SETS_PER_SESSION)
+        sets, offset = [], 0
+        while remaining > 0:
+            exercise_id = rng.choice(exercise_ids)
+            base_weight = rng.choice((0, 10, 20, 40, 60, 80, 100))
+            for set_number in range(1, min(remaining, rng.randint(2, 5)) + 1):
+                offset += rng.randint(1, 4)
+                sets.append(ExerciseSet(
+                    exercise_id=exercise_id, set_number=set_number,
+                    reps=rng.randint(5, 15), weight=float(base_weight + rng.choice((0, 2.5, 5))),
+                    rest_seconds=rng.choice((60, 90, 120)),
+                    created_at=started_at + timedelta(minutes=offset),
+                ))
+                remaining -= 1
+        return sets
+
+    def build_stats(self, user_ids, sessions, logs, comment_counts):
+        """UserStats cohérents avec les lignes créées (le signal post_save ne passe pas)."""
+        rng = self.rng
+        completed = {user_id: [0, 0.0] for user_id in user_ids}
+        last_active = {}
+        for session in sessions:
+            if session.status == 'completed':
+                completed[session.user_id][0] += 1
+                completed[session.user_id][1] += session.total_volume
+            last_active[session.user_id] = max(last_active.get(session.user_id, session.started_at.date()),
+                                               session.started_at.date())
+        for log in logs:
+            last_active[log.user_id] = max(last_active.get(log.user_id, log.date), log.date)
+
+        stats = []
+        for user_id in user_ids:
+            workouts, volume = completed[user_id]
+            total_xp = workouts * 80 + rng.randint(0, 2000)
+            level = level_for_cumulative_xp(total_xp)
+            stats.append(UserStats(
+                user_id=user_id,
+                xp=total_xp - cumulative_xp(level, 0), level=level,
+                current_streak=rng.choice((0, 0, 1, 2, 3, 5, 8, 13, 30)),
+                last_activity_date=last_active.get(user_id),
+                health_score=rng.randint(20, 95), fitness_score=rng.randint(0, 100),
+                recovery_score=rng.randint(0, 100), lifestyle_score=rng.randint(0, 100),
+                completed_workouts=workouts, lifetime_volume=volume,
+                comment_count=comment_counts.get(user_id, 0),
+            ))
+        return stats
@@ -0,0 +1,27 @@
+"""
+Management command qui entretient l'index des sessions ouvertes (UserSession) :
+purge en masse des sessions expirées ou disparues, et indexation des sessions
+ouvertes avant la mise en place de l'index. À lancer en cron (ex. toutes les heures).
+
+Usage:
+    python manage.py sync_user_sessions
+    python manage.py sync_user_sessions --backfill
+"""
+from django.core.management.base import BaseCommand
+from api.services.sessions import backfill_sessions, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Purge les sessions expirées de l\'index UserSession (et indexe les sessions existantes avec --backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Indexe les sessions ouvertes non encore indexées')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_sessions()
+        self.stdout.write(f"  {purged} sessions expirées retirées")
+        if options['backfill']:
+            created = backfill_sessions(batch_size=options['batch_size'])
+            self.stdout.write(f"  {created} sessions indexées")
+        self.stdout.write(self.style.SUCCESS("✅ Index des sessions à jour."))
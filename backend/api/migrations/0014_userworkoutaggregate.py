@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_user_is_hidden_user_last_login_ip_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWorkoutAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('muscle_group', models.CharField(blank=True, default='', max_length=20)),
+                ('sessions_count', models.IntegerField(default=0)),
+                ('duration_minutes', models.IntegerField(default=0)),
+                ('sets_count', models.IntegerField(default=0)),
+                ('volume', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_aggregates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('user', 'date', 'muscle_group')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_userworkoutaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('xp', 'Énergie'), ('streak', 'Régularité'), ('workouts', 'Mouvement')], max_length=20)),
+                ('position', models.PositiveIntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('score', models.IntegerField(default=0)),
+                ('level', models.IntegerField(default=1)),
+                ('total_volume', models.FloatField(default=0.0)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['metric', 'position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-xp'], name='userstats_xp_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-current_streak'], name='userstats_streak_rank_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together={('metric', 'position')},
+        ),
+    ]
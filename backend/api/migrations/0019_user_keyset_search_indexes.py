@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+# Index propres à PostgreSQL. Recherche admin : icontains se traduit par
+# UPPER(col::text) LIKE UPPER('%q%'), servi par un index GIN trigram sur la
+# même expression ; le préfixe d'IP par HOST(ip) LIKE 'q%'.
+SEARCH_INDEXES = [
+    # DESC place NULL en premier sur PostgreSQL : l'index doit suivre l'ORDER BY ... NULLS LAST
+    'DROP INDEX IF EXISTS user_login_keyset_idx',
+    'CREATE INDEX user_login_keyset_idx ON api_user ("last_login" DESC NULLS LAST, "id" DESC)',
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS user_username_trgm_idx ON api_user USING gin (UPPER("username"::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS user_email_trgm_idx ON api_user USING gin (UPPER("email"::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS user_ip_prefix_idx ON api_user (HOST("last_login_ip") text_pattern_ops)',
+]
+DROP_SEARCH_INDEXES = [
+    'DROP INDEX IF EXISTS user_username_trgm_idx',
+    'DROP INDEX IF EXISTS user_email_trgm_idx',
+    'DROP INDEX IF EXISTS user_ip_prefix_idx',
+]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_user_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_last_login_idx',
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-last_login', '-id'], name='user_login_keyset_idx'),
+        ),
+        migrations.RunPython(_run_on_postgres(SEARCH_INDEXES), _run_on_postgres(DROP_SEARCH_INDEXES)),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_user_keyset_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workoutsession',
+            name='started_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
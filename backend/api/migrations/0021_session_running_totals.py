@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def backfill_totals(apps, schema_editor):
+    """Calcule sets_count, total_volume et les totaux par exercice des séances existantes."""
+    from django.db.models import Count, F, Sum
+    WorkoutSession = apps.get_model('api', 'WorkoutSession')
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+    SessionExerciseTally = apps.get_model('api', 'SessionExerciseTally')
+
+    tallies, sessions = [], {}
+    rows = ExerciseSet.objects.values('session_id', 'exercise_id').annotate(
+        n=Count('id'), volume=Sum(F('weight') * F('reps')),
+    ).order_by('session_id')
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        volume = row['volume'] or 0.0
+        tallies.append(SessionExerciseTally(
+            session_id=row['session_id'], exercise_id=row['exercise_id'], sets_count=row['n'], volume=volume,
+        ))
+        totals = sessions.setdefault(row['session_id'], [0, 0.0])
+        totals[0] += row['n']
+        totals[1] += volume
+        if len(tallies) >= BATCH_SIZE:
+            SessionExerciseTally.objects.bulk_create(tallies)
+            tallies = []
+    SessionExerciseTally.objects.bulk_create(tallies)
+
+    ids = list(sessions)
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = WorkoutSession.objects.filter(id__in=ids[start:start + BATCH_SIZE]).only('id')
+        for session in batch:
+            session.sets_count, session.total_volume = sessions[session.id]
+        WorkoutSession.objects.bulk_update(batch, ['sets_count', 'total_volume'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_workoutsession_started_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutsession',
+            name='sets_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SessionExerciseTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sets_count', models.PositiveIntegerField(default=0)),
+                ('volume', models.FloatField(default=0.0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.exercise')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_tallies', to='api.workoutsession')),
+            ],
+            options={
+                'unique_together': {('session', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_session_running_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exerciseset',
+            index=models.Index(fields=['session', 'exercise'], include=('weight', 'reps'), name='set_session_exercise_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutsession',
+            index=models.Index(fields=['user', 'status', 'started_at'], include=('total_volume', 'duration_minutes'), name='session_user_status_idx'),
+        ),
+    ]
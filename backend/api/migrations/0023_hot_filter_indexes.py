@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_workout_series_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='exerciseset',
+            name='set_session_exercise_cov_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at'], name='article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at'], name='article_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', '-created_at'], name='comment_article_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customevent',
+            index=models.Index(fields=['user', 'day_of_week', 'start_time'], name='event_user_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseset',
+            index=models.Index(fields=['session', 'exercise', 'set_number'], include=('weight', 'reps'), name='set_session_exercise_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:40
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+COUNTER_FIELDS = ('completed_workouts', 'lifetime_volume', 'comment_count', 'plan_count')
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Remplit les compteurs ajoutés par 0016 depuis les tables sources, comme
+    api.services.counters.reconcile_counters (une requête groupée par table).
+    """
+    from django.db.models import Count, Sum
+    UserStats = apps.get_model('api', 'UserStats')
+    WorkoutSession = apps.get_model('api', 'WorkoutSession')
+    Comment = apps.get_model('api', 'Comment')
+    WellnessPlan = apps.get_model('api', 'WellnessPlan')
+
+    counters = {}
+
+    def row(user_id):
+        return counters.setdefault(user_id, {field: 0 for field in COUNTER_FIELDS})
+
+    sessions = WorkoutSession.objects.filter(status='completed').values('user_id')
+    for item in sessions.annotate(n=Count('id'), volume=Sum('total_volume')).order_by():
+        row(item['user_id']).update(completed_workouts=item['n'], lifetime_volume=item['volume'] or 0.0)
+    for item in Comment.objects.values('author_id').annotate(n=Count('id')).order_by():
+        row(item['author_id'])['comment_count'] = item['n']
+    for item in WellnessPlan.objects.values('user_id').annotate(n=Count('id')).order_by():
+        row(item['user_id'])['plan_count'] = item['n']
+
+    user_ids = list(counters)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = list(UserStats.objects.filter(user_id__in=user_ids[start:start + BATCH_SIZE]).only('id', 'user_id'))
+        for stats in batch:
+            for field, value in counters[stats.user_id].items():
+                setattr(stats, field, value)
+        UserStats.objects.bulk_update(batch, COUNTER_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from collections import defaultdict
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+DAY_TOTAL = ''
+COUNTER_FIELDS = ('sessions_count', 'duration_minutes', 'sets_count', 'volume')
+
+
+def backfill_aggregates(apps, schema_editor):
+    """
+    Remplit la table créée par 0014 depuis les séances terminées et leurs sets,
+    comme api.services.aggregates.rebuild_aggregates (deux requêtes groupées).
+    """
+    from django.db.models import Count, F, Sum
+    from django.db.models.functions import TruncDate
+    UserWorkoutAggregate = apps.get_model('api', 'UserWorkoutAggregate')
+    WorkoutSession = apps.get_model('api', 'WorkoutSession')
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+
+    rows = defaultdict(lambda: {field: 0 for field in COUNTER_FIELDS})
+
+    sessions = WorkoutSession.objects.filter(status='completed')
+    for item in sessions.annotate(day=TruncDate('started_at')).values('user_id', 'day').annotate(
+        sessions=Count('id'), duration=Sum('duration_minutes')
+    ).order_by():
+        row = rows[(item['user_id'], item['day'], DAY_TOTAL)]
+        row['sessions_count'] = item['sessions']
+        row['duration_minutes'] = item['duration'] or 0
+
+    sets = ExerciseSet.objects.filter(session__status='completed')
+    for item in sets.annotate(day=TruncDate('session__started_at')).values(
+        'session__user_id', 'day', 'exercise__muscle_group'
+    ).annotate(sets=Count('id'), volume=Sum(F('weight') * F('reps'))).order_by():
+        volume = item['volume'] or 0
+        for muscle_group in (DAY_TOTAL, item['exercise__muscle_group']):
+            row = rows[(item['session__user_id'], item['day'], muscle_group)]
+            row['sets_count'] += item['sets']
+            row['volume'] += volume
+
+    UserWorkoutAggregate.objects.all().delete()
+    UserWorkoutAggregate.objects.bulk_create(
+        [
+            UserWorkoutAggregate(user_id=user_id, date=day, muscle_group=muscle_group, **values)
+            for (user_id, day, muscle_group), values in rows.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_backfill_userstats_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_backfill_workout_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='usersession',
+            name='usersession_user_expire_idx',
+        ),
+        migrations.RemoveField(
+            model_name='usersession',
+            name='expire_date',
+        ),
+    ]
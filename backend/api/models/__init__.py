@@ -1,6 +1,6 @@
-from .user import User
+from .user import User, UserSession
 from .content import Category, Article, Comment, Tag
-from .workout import Exercise, WorkoutSession, ExerciseSet
+from .workout import Exercise, WorkoutSession, ExerciseSet, SessionExerciseTally, UserWorkoutAggregate
 from .nutrition import Recipe
-from .gamification import UserStats, Badge, UserBadge
+from .gamification import UserStats, Badge, UserBadge, LeaderboardEntry
 from .plan import CustomEvent, WellnessPlan, DailyLog
@@ -75,6 +75,14 @@ class Article(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            # Blog public : WHERE is_published ORDER BY created_at DESC (index partiel)
+            models.Index(fields=['-created_at'], condition=models.Q(is_published=True), name='article_published_idx'),
+            # API (tous les articles, par date) et "mes articles"
+            models.Index(fields=['author', '-created_at'], name='article_author_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -91,5 +99,11 @@ class Comment(models.Model):
     tags = models.ManyToManyField(Tag, related_name='comments', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Commentaires d'un article, du plus récent au plus ancien
+            models.Index(fields=['article', '-created_at'], name='comment_article_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.article.title}"
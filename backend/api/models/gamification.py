@@ -1,4 +1,7 @@
+from math import isqrt
 from django.db import models
+from django.db.models import F, FloatField, IntegerField
+from django.db.models.functions import Cast, Floor, Sqrt
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
@@ -8,6 +11,21 @@ from .user import User
 # -----------------------------------------------------------------------------
 # GAMIFICATION & STATS
 # -----------------------------------------------------------------------------
+# Le niveau N demande N * XP_PER_LEVEL XP ; `xp` est la progression dans le niveau.
+# XP cumulée pour atteindre le niveau L : XP_PER_LEVEL * L * (L - 1) / 2.
+XP_PER_LEVEL = 500
+
+
+def cumulative_xp(level, xp):
+    """XP totale gagnée depuis le niveau 1."""
+    return XP_PER_LEVEL * level * (level - 1) // 2 + xp
+
+
+def level_for_cumulative_xp(total):
+    """Niveau atteint avec `total` XP cumulée (forme close, sans boucle)."""
+    return (1 + isqrt(1 + 8 * total // XP_PER_LEVEL)) // 2
+
+
 class UserStats(models.Model):
     """
     Statistiques et progression de l'utilisateur.
@@ -26,6 +44,60 @@ class UserStats(models.Model):
     lifestyle_score = models.IntegerField(default=0)
     consistency_score = models.IntegerField(default=0)
 
+    # Compteurs dénormalisés, maintenus par UPDATE atomiques (api.services.counters)
+    completed_workouts = models.PositiveIntegerField(default=0)
+    lifetime_volume = models.FloatField(default=0.0)
+    comment_count = models.PositiveIntegerField(default=0)
+    plan_count = models.PositiveIntegerField(default=0)
+
+    COUNTER_FIELDS = ('completed_workouts', 'lifetime_volume', 'comment_count', 'plan_count')
+    # Colonnes écrites uniquement par UPDATE atomique (add_xp, compteurs)
+    ATOMIC_FIELDS = ('xp', 'level') + COUNTER_FIELDS
+
+    # --- Suivi des champs modifiés (dirty tracking) ---
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _remember_values(self, fields=None):
+        """Mémorise les valeurs actuelles comme reflet de la base (toutes, ou `fields`)."""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for f in self._meta.concrete_fields:
+            if f.attname in self.__dict__ and (fields is None or f.name in fields or f.attname in fields):
+                loaded[f.attname] = getattr(self, f.attname)
+
+    def get_dirty_fields(self):
+        """Champs modifiés en mémoire depuis le chargement (ou la dernière sauvegarde)."""
+        loaded = self.__dict__.get('_loaded_values')
+        fields = [f for f in self._meta.concrete_fields if not f.primary_key]
+        if loaded is None:
+            return [f.name for f in fields]
+        return [
+            f.name for f in fields
+            if f.attname in self.__dict__
+            and (f.attname not in loaded or getattr(self, f.attname) != loaded[f.attname])
+        ]
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_values(kwargs.get('fields'))
+
+    def save(self, *args, **kwargs):
+        # Sans update_fields explicite : seuls les champs modifiés sont écrits, et
+        # jamais l'XP ni les compteurs (UPDATE atomiques), qu'une instance chargée
+        # plus tôt écraserait. Rien de modifié : aucune requête.
+        # (update_fields explicite, ex. depuis l'admin, les écrit normalement.)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                name for name in self.get_dirty_fields() if name not in self.ATOMIC_FIELDS
+            ]
+            if not kwargs['update_fields']:
+                return
+        super().save(*args, **kwargs)
+        self._remember_values(kwargs.get('update_fields'))
+
     def update_streak(self):
         """
         Updates the current streak based on last activity date.
@@ -44,22 +116,47 @@ class UserStats(models.Model):
             
         self.last_activity_date = today
         self.save()
+        self._publish_scores('streak')
 
     def add_xp(self, amount):
         """
         Adds XP and handles leveling up.
+        Un seul UPDATE atomique : le niveau est recalculé en SQL depuis l'XP
+        cumulée, donc deux gains simultanés ne peuvent pas s'écraser.
         """
-        self.xp += amount
-        
-        # Formula: Level N requires N * 500 XP
-        required_xp = self.level * 500
-        
-        while self.xp >= required_xp:
-            self.xp -= required_xp
-            self.level += 1
-            required_xp = self.level * 500
-            
-        self.save()
+        previous_level = self.level
+
+        half = XP_PER_LEVEL // 2
+        total = F('level') * (F('level') - 1) * half + F('xp') + amount
+        # Même formule que level_for_cumulative_xp ; exacte aux paliers (carrés parfaits)
+        new_level = Cast(
+            Floor((Sqrt(Cast(total, FloatField()) * 8.0 / XP_PER_LEVEL + 1.0) + 1.0) / 2.0),
+            IntegerField(),
+        )
+        UserStats.objects.filter(pk=self.pk).update(
+            level=new_level,
+            xp=total - new_level * (new_level - 1) * half,
+        )
+        self.refresh_from_db(fields=['xp', 'level'])
+
+        # Le niveau est aussi affiché dans le classement des streaks
+        metrics = ('xp', 'streak') if self.level != previous_level else ('xp',)
+        self._publish_scores(*metrics)
+
+    def _publish_scores(self, *metrics):
+        """Pousse les nouveaux scores dans les classements en cache (api.services.ranking)."""
+        from api.services.ranking import SCORE_FIELDS, push_score
+        username = self.user.username if UserStats.user.is_cached(self) else None
+        for metric in metrics:
+            push_score(metric, self.user_id, getattr(self, SCORE_FIELDS[metric]), username=username, level=self.level)
+
+    class Meta:
+        # Index de classement : "rang de X" = COUNT des utilisateurs devant X
+        indexes = [
+            models.Index(fields=['-xp'], name='userstats_xp_rank_idx'),
+            models.Index(fields=['-current_streak'], name='userstats_streak_rank_idx'),
+            models.Index(fields=['-completed_workouts'], name='userstats_workouts_rank_idx'),
+        ]
 
     @property
     def xp_threshold(self):
@@ -123,6 +220,36 @@ class UserBadge(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.badge.name}"
 
+# -----------------------------------------------------------------------------
+# CLASSEMENT (SNAPSHOT)
+# -----------------------------------------------------------------------------
+class LeaderboardEntry(models.Model):
+    """
+    Snapshot du top N par métrique, rafraîchi périodiquement (api.services.leaderboard).
+    La page classement lit ces lignes au lieu de trier toute la table des utilisateurs.
+    """
+    METRIC_CHOICES = [
+        ('xp', _('Énergie')),
+        ('streak', _('Régularité')),
+        ('workouts', _('Mouvement')),
+    ]
+
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    position = models.PositiveIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    username = models.CharField(max_length=150)
+    score = models.IntegerField(default=0)
+    level = models.IntegerField(default=1)
+    total_volume = models.FloatField(default=0.0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('metric', 'position')
+        ordering = ['metric', 'position']
+
+    def __str__(self):
+        return f"{self.metric} #{self.position} - {self.username}"
+
 # Signal pour créer UserStats automatiquement
 @receiver(post_save, sender=User)
 def create_user_stats(sender, instance, created, **kwargs):
@@ -131,5 +258,8 @@ def create_user_stats(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_stats(sender, instance, **kwargs):
-    if hasattr(instance, 'stats'):
-        instance.stats.save()
+    # Seules des stats déjà chargées peuvent porter des modifications ; save() n'écrit que celles-ci
+    if User.stats.is_cached(instance):
+        stats = getattr(instance, 'stats', None)
+        if stats is not None:
+            stats.save()
@@ -32,6 +32,12 @@ class CustomEvent(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Agenda du jour (dashboard) et planning : WHERE user [AND day_of_week] ORDER BY start_time
+            models.Index(fields=['user', 'day_of_week', 'start_time'], name='event_user_day_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.user.username})"
 
@@ -95,6 +101,7 @@ class DailyLog(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # L'index unique (user, date) sert aussi les listes "derniers jours" (ORDER BY date DESC)
         unique_together = ('user', 'date')
 
     def __str__(self):
@@ -28,5 +28,37 @@ class User(AbstractUser):
     # ----- Soft delete (masquer sans supprimer) -----
     is_hidden = models.BooleanField(default=False, help_text="Masqué par l'admin (équivalent soft-delete)")
 
+    class Meta(AbstractUser.Meta):
+        # Index partiels : seules les lignes "vraies" (minoritaires) sont indexées,
+        # pour les compteurs et filtres du dashboard admin.
+        indexes = [
+            # Liste admin : ORDER BY last_login DESC NULLS LAST, id DESC + pagination par curseur
+            # (NULLS LAST ajouté sur PostgreSQL par la migration 0019 ; SQLite trie déjà NULL en dernier)
+            models.Index(fields=['-last_login', '-id'], name='user_login_keyset_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_hidden=True), name='user_hidden_partial_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_verified=True), name='user_verified_partial_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_staff=True), name='user_staff_partial_idx'),
+        ]
+
     def __str__(self):
         return self.username
+
+
+# -----------------------------------------------------------------------------
+# INDEX DES SESSIONS OUVERTES
+# -----------------------------------------------------------------------------
+class UserSession(models.Model):
+    """
+    Une ligne par session authentifiée (remplie à la connexion, suivie aux
+    rotations de clé, retirée à la déconnexion ou à expiration). Évite de
+    décoder chaque Session pour savoir qui est en ligne (api.services.sessions) ;
+    l'expiration reste celle de django_session.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='open_sessions')
+    session_key = models.CharField(max_length=40, unique=True)
+    ip = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.CharField(max_length=500, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.session_key[:8]}…"
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from .user import User
@@ -58,15 +59,24 @@ class WorkoutSession(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workout_sessions')
-    started_at = models.DateTimeField(auto_now_add=True)
+    # default (et non auto_now_add) : l'import d'historique fournit ses propres dates
+    started_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
     duration_minutes = models.IntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     notes = models.TextField(blank=True)
     total_volume = models.FloatField(default=0.0)  # Total kg lifted (weight * reps)
+    # Totaux courants maintenus par UPDATE atomiques à chaque set (api.services.tallies)
+    sets_count = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Historique, statistiques et séries : WHERE user AND status, groupé / trié par started_at.
+            # INCLUDE (PostgreSQL) : totaux lus depuis l'index seul ; ignoré par SQLite.
+            models.Index(fields=['user', 'status', 'started_at'], include=['total_volume', 'duration_minutes'],
+                         name='session_user_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
@@ -88,16 +98,36 @@ class WorkoutSession(models.Model):
     def complete_session(self):
         """Mark session as completed and calculate stats"""
         from django.utils import timezone
+        # Volume et nombre de sets sont déjà à jour en base : relus, jamais recalculés
+        self.refresh_from_db(fields=['total_volume', 'sets_count'])
         self.completed_at = timezone.now()
         self.status = 'completed'
         self.duration_minutes = self.calculate_duration()
-        self.total_volume = self.calculate_total_volume()
-        self.save()
+        self.save(update_fields=['completed_at', 'status', 'duration_minutes'])
+
+        # Agrégats analytics (par jour / groupe musculaire) + records personnels
+        from api.services.aggregates import record_completed_session
+        from api.services.consistency import refresh_consistency_score
+        from api.services.counters import bump_counters
+        from api.services.records import invalidate_personal_records
+        from api.services.series import note_sets_changed
+        record_completed_session(self)
+        refresh_consistency_score(self.user_id)  # Lit les agrégats à jour : après record_completed_session
+        invalidate_personal_records(self.user_id)
+        note_sets_changed(self.user_id)  # Les séries ne comptent que les séances terminées
+        bump_counters(self.user_id, completed_workouts=1, lifetime_volume=self.total_volume)
         
         # Award XP to user
         if hasattr(self.user, 'stats'):
+            stats = self.user.stats
+            stats.refresh_from_db(fields=['completed_workouts', 'lifetime_volume'])
             xp_earned = 50 + (self.duration_minutes // 10) * 10  # Base 50 XP + 10 per 10 min
-            self.user.stats.add_xp(xp_earned)
+            stats.add_xp(xp_earned)
+
+            # Classement "séances terminées" en cache
+            from api.services.ranking import push_score
+            push_score('workouts', self.user_id, stats.completed_workouts, username=self.user.username,
+                       level=stats.level, total_volume=stats.lifetime_volume)
 
 class ExerciseSet(models.Model):
     """
@@ -115,6 +145,23 @@ class ExerciseSet(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Séries (api.services.series) : jointure par séance, groupement par exercice,
+            # volume (weight * reps) calculé sans lire la table ; MAX(set_number) par exercice (log_sets)
+            models.Index(fields=['session', 'exercise', 'set_number'], include=['weight', 'reps'],
+                         name='set_session_exercise_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tally()
+        return instance
+
+    def remember_tally(self):
+        """Mémorise la contribution du set aux totaux (séance, exercice, volume) telle qu'en base."""
+        if all(f in self.__dict__ for f in ('session_id', 'exercise_id', 'weight', 'reps')):
+            self._loaded_tally = (self.session_id, self.exercise_id, self.volume)
     
     def __str__(self):
         return f"{self.exercise.name} - Set {self.set_number}: {self.reps} reps @ {self.weight}kg"
@@ -123,3 +170,46 @@ class ExerciseSet(models.Model):
     def volume(self):
         """Calculate volume for this set (weight * reps)"""
         return self.weight * self.reps
+
+class SessionExerciseTally(models.Model):
+    """
+    Totaux d'un exercice dans une séance (nombre de sets, volume), maintenus
+    par UPDATE atomiques à chaque set ajouté, modifié ou supprimé.
+    """
+    session = models.ForeignKey(WorkoutSession, on_delete=models.CASCADE, related_name='exercise_tallies')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='+')
+    sets_count = models.PositiveIntegerField(default=0)
+    volume = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('session', 'exercise')
+
+    def __str__(self):
+        return f"Séance {self.session_id} - exercice {self.exercise_id}: {self.sets_count} sets"
+
+# -----------------------------------------------------------------------------
+# AGRÉGATS MATÉRIALISÉS (ANALYTICS)
+# -----------------------------------------------------------------------------
+class UserWorkoutAggregate(models.Model):
+    """
+    Agrégat pré-calculé des entraînements d'un utilisateur, par jour et par groupe musculaire.
+    La ligne avec muscle_group vide ('') porte le total de la journée (séances, durée, volume).
+    Rempli à l'installation par la migration 0025, puis maintenu incrémentalement par
+    api.services.aggregates (backfill_workout_aggregates pour réparer).
+    """
+    DAY_TOTAL = ''
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workout_aggregates')
+    date = models.DateField()
+    muscle_group = models.CharField(max_length=20, blank=True, default=DAY_TOTAL)
+    sessions_count = models.IntegerField(default=0)
+    duration_minutes = models.IntegerField(default=0)
+    sets_count = models.IntegerField(default=0)
+    volume = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('user', 'date', 'muscle_group')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} [{self.muscle_group or 'total'}]"
@@ -1,7 +1,7 @@
 from .auth import EmailTokenObtainPairSerializer, UserSerializer, UserStatsSerializer
 from .content import ArticleSerializer, CommentSerializer, CategorySerializer, TagSerializer, RecipeSerializer
 from .wellness import WellnessPlanSerializer
-from .workout import ExerciseSerializer, ExerciseSetSerializer, WorkoutSessionSerializer, WorkoutSessionCreateSerializer, ExerciseSetCreateSerializer
+from .workout import ExerciseSerializer, ExerciseSetSerializer, WorkoutSessionSerializer, WorkoutSessionListSerializer, WorkoutSessionCreateSerializer, ExerciseSetCreateSerializer, ExerciseSetBatchSerializer, WorkoutImportSessionSerializer
 
 __all__ = [
     'EmailTokenObtainPairSerializer',
@@ -15,6 +15,9 @@ __all__ = [
     'ExerciseSerializer',
     'ExerciseSetSerializer',
     'WorkoutSessionSerializer',
+    'WorkoutSessionListSerializer',
     'WorkoutSessionCreateSerializer',
     'ExerciseSetCreateSerializer',
+    'ExerciseSetBatchSerializer',
+    'WorkoutImportSessionSerializer',
 ]
@@ -23,12 +23,29 @@ class ExerciseSetSerializer(serializers.ModelSerializer):
 class WorkoutSessionSerializer(serializers.ModelSerializer):
     sets = ExerciseSetSerializer(many=True, read_only=True)
     user_username = serializers.ReadOnlyField(source='user.username')
-    sets_count = serializers.IntegerField(source='sets.count', read_only=True)
     
     class Meta:
         model = WorkoutSession
         fields = ('id', 'user', 'user_username', 'started_at', 'completed_at', 'duration_minutes', 'status', 'notes', 'total_volume', 'sets', 'sets_count')
-        read_only_fields = ('user', 'started_at', 'completed_at', 'duration_minutes', 'total_volume')
+        read_only_fields = ('user', 'started_at', 'completed_at', 'duration_minutes', 'total_volume', 'sets_count')
+
+
+class WorkoutSessionListSerializer(serializers.ModelSerializer):
+    """
+    Représentation allégée pour les listes : totaux dénormalisés et ids des exercices
+    travaillés (les exercices sont renvoyés une seule fois, à côté de la page).
+    Attend `exercise_tallies` préchargés.
+    """
+    exercise_ids = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutSession
+        fields = ('id', 'started_at', 'completed_at', 'duration_minutes', 'status', 'notes', 'total_volume',
+                  'sets_count', 'exercise_ids')
+        read_only_fields = fields
+
+    def get_exercise_ids(self, obj):
+        return [tally.exercise_id for tally in obj.exercise_tallies.all()]
 
 
 class WorkoutSessionCreateSerializer(serializers.ModelSerializer):
@@ -41,3 +58,43 @@ class ExerciseSetCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExerciseSet
         fields = ('exercise', 'set_number', 'reps', 'weight', 'rest_seconds', 'notes')
+
+
+class ExerciseSetBatchSerializer(serializers.Serializer):
+    """Un set d'un envoi groupé (file hors ligne) ; l'exercice est vérifié par api.services.sets."""
+    exercise_id = serializers.IntegerField()
+    reps = serializers.IntegerField(min_value=1)
+    weight = serializers.FloatField(min_value=0)
+    rest_seconds = serializers.IntegerField(min_value=0, default=60)
+    notes = serializers.CharField(allow_blank=True, default='')
+
+
+class WorkoutImportSetSerializer(serializers.Serializer):
+    """Un set importé ; l'exercice est désigné par son slug."""
+    exercise = serializers.SlugField()
+    set_number = serializers.IntegerField(min_value=1, required=False)
+    reps = serializers.IntegerField(min_value=0)
+    weight = serializers.FloatField(min_value=0)
+    rest_seconds = serializers.IntegerField(min_value=0, default=60)
+    notes = serializers.CharField(allow_blank=True, default='')
+
+    def validate_exercise(self, value):
+        # Table slug → id fournie par l'import (api.services.workout_import.exercise_slug_map)
+        slugs = self.context.get('exercise_slugs')
+        if slugs is not None and value not in slugs:
+            raise serializers.ValidationError(f"Exercice inconnu : {value}")
+        return value
+
+
+class WorkoutImportSessionSerializer(serializers.Serializer):
+    """Une séance importée (terminée) et ses sets."""
+    started_at = serializers.DateTimeField()
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+    duration_minutes = serializers.IntegerField(min_value=0, required=False)
+    notes = serializers.CharField(allow_blank=True, default='')
+    sets = WorkoutImportSetSerializer(many=True, allow_empty=True, default=list)
+
+    def validate(self, attrs):
+        if attrs.get('completed_at') and attrs['completed_at'] < attrs['started_at']:
+            raise serializers.ValidationError({'completed_at': 'Doit être postérieur à started_at.'})
+        return attrs
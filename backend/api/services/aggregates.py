@@ -0,0 +1,217 @@
+"""
+Maintenance des agrégats d'entraînement matérialisés (UserWorkoutAggregate).
+
+Les agrégats sont mis à jour incrémentalement :
+- à la fin d'une séance (record_completed_session) ;
+- à la création d'un set sur une séance déjà terminée (record_sets) ;
+- à la modification ou suppression d'un set d'une séance terminée (record_set_change) ;
+- à la suppression d'une séance terminée (forget_completed_session) ;
+- à l'import d'historique, depuis les objets en mémoire (record_imported_sessions).
+Les sets ajoutés pendant une séance active sont comptés à sa complétion.
+Une ligne retombée à zéro (ni séance ni set) est supprimée.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, Sum, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from api.models import UserWorkoutAggregate, WorkoutSession, ExerciseSet, Exercise
+
+DAY_TOTAL = UserWorkoutAggregate.DAY_TOTAL
+COUNTER_FIELDS = ('sessions_count', 'duration_minutes', 'sets_count', 'volume')
+
+
+def _session_date(session):
+    """Jour de la séance, dans le fuseau courant (identique à started_at__date)."""
+    return timezone.localtime(session.started_at).date()
+
+
+def _empty_delta():
+    return {field: 0 for field in COUNTER_FIELDS}
+
+
+def _apply_deltas(user_id, deltas):
+    """
+    Ajoute les deltas {(date, muscle_group): {champ: valeur}} aux lignes existantes
+    et crée celles qui manquent. Une lecture + un bulk_update + un bulk_create.
+    """
+    if not deltas:
+        return
+    with transaction.atomic():
+        dates = {day for day, _ in deltas}
+        existing = {
+            (row.date, row.muscle_group): row
+            for row in UserWorkoutAggregate.objects.select_for_update().filter(user_id=user_id, date__in=dates)
+        }
+        to_create, to_update, to_delete = [], [], []
+        for (day, muscle_group), values in deltas.items():
+            row = existing.get((day, muscle_group))
+            if row is None:
+                if values['sessions_count'] > 0 or values['sets_count'] > 0:
+                    to_create.append(UserWorkoutAggregate(user_id=user_id, date=day, muscle_group=muscle_group, **values))
+                continue
+            for field, value in values.items():
+                setattr(row, field, getattr(row, field) + value)
+            if row.sessions_count > 0 or row.sets_count > 0:
+                to_update.append(row)
+            else:
+                to_delete.append(row.id)
+        if to_create:
+            UserWorkoutAggregate.objects.bulk_create(to_create)
+        if to_update:
+            UserWorkoutAggregate.objects.bulk_update(to_update, COUNTER_FIELDS)
+        if to_delete:
+            UserWorkoutAggregate.objects.filter(id__in=to_delete).delete()
+
+
+def _session_deltas(session, sign):
+    """
+    Contribution d'une séance terminée : une ligne "journée" et une ligne par
+    groupe musculaire travaillé (une seule requête groupée sur les sets).
+    sign=1 pour l'ajouter, -1 pour la retirer.
+    """
+    day = _session_date(session)
+    deltas = defaultdict(_empty_delta)
+    total = deltas[(day, DAY_TOTAL)]
+    total['sessions_count'] = sign
+    total['duration_minutes'] = sign * session.duration_minutes
+
+    per_muscle = session.sets.values('exercise__muscle_group').annotate(
+        sets=Count('id'),
+        volume=Sum(F('weight') * F('reps')),
+    ).order_by()
+    for item in per_muscle:
+        row = deltas[(day, item['exercise__muscle_group'])]
+        row['sets_count'] = sign * item['sets']
+        row['volume'] = sign * (item['volume'] or 0)
+        total['sets_count'] += row['sets_count']
+        total['volume'] += row['volume']
+    return deltas
+
+
+def record_completed_session(session):
+    """Intègre une séance qui vient d'être terminée."""
+    _apply_deltas(session.user_id, _session_deltas(session, 1))
+
+
+def forget_completed_session(session):
+    """Retire une séance terminée sur le point d'être supprimée (ses sets sont encore en base)."""
+    if session.status == 'completed':
+        _apply_deltas(session.user_id, _session_deltas(session, -1))
+
+
+def record_sets(session, exercise_sets):
+    """
+    Intègre des sets ajoutés à une séance déjà terminée.
+    Ignoré pour une séance active : ses sets seront comptés à la complétion.
+    """
+    if session.status != 'completed' or not exercise_sets:
+        return
+    day = _session_date(session)
+    muscle_by_exercise = dict(
+        Exercise.objects.filter(id__in={s.exercise_id for s in exercise_sets}).values_list('id', 'muscle_group')
+    )
+    deltas = defaultdict(_empty_delta)
+    for exercise_set in exercise_sets:
+        for key in ((day, DAY_TOTAL), (day, muscle_by_exercise[exercise_set.exercise_id])):
+            deltas[key]['sets_count'] += 1
+            deltas[key]['volume'] += exercise_set.volume
+    _apply_deltas(session.user_id, deltas)
+
+
+def record_set_change(old, new):
+    """
+    Applique la modification (old et new) ou la suppression (new=None) d'un set.
+    old / new : (session_id, exercise_id, volume), cf. ExerciseSet.remember_tally.
+    Seules les séances terminées sont concernées ; une requête sur les séances,
+    une sur les exercices, puis les deltas.
+    """
+    if old is None or old == new:
+        return
+    changes = [(old, -1)] + ([(new, 1)] if new is not None else [])
+    sessions = {
+        session.id: session
+        for session in WorkoutSession.objects.filter(
+            id__in={tally[0] for tally, _ in changes}, status='completed',
+        ).only('id', 'user_id', 'started_at')
+    }
+    if not sessions:
+        return
+    muscle_by_exercise = dict(
+        Exercise.objects.filter(id__in={tally[1] for tally, _ in changes}).values_list('id', 'muscle_group')
+    )
+    deltas_by_user = defaultdict(lambda: defaultdict(_empty_delta))
+    for (session_id, exercise_id, volume), sign in changes:
+        session = sessions.get(session_id)
+        if session is None:
+            continue
+        day = _session_date(session)
+        for key in ((day, DAY_TOTAL), (day, muscle_by_exercise[exercise_id])):
+            row = deltas_by_user[session.user_id][key]
+            row['sets_count'] += sign
+            row['volume'] += sign * volume
+    for user_id, deltas in deltas_by_user.items():
+        _apply_deltas(user_id, deltas)
+
+
+def record_imported_sessions(user_id, sessions, exercise_sets):
+    """
+    Intègre des séances terminées créées par bulk_create (import) avec leurs sets,
+    calculés en mémoire : une requête sur les exercices, puis les deltas.
+    """
+    muscle_by_exercise = dict(
+        Exercise.objects.filter(id__in={s.exercise_id for s in exercise_sets}).values_list('id', 'muscle_group')
+    )
+    deltas = defaultdict(_empty_delta)
+    for session in sessions:
+        total = deltas[(_session_date(session), DAY_TOTAL)]
+        total['sessions_count'] += 1
+        total['duration_minutes'] += session.duration_minutes
+    for exercise_set in exercise_sets:
+        day = _session_date(exercise_set.session)
+        for key in ((day, DAY_TOTAL), (day, muscle_by_exercise[exercise_set.exercise_id])):
+            deltas[key]['sets_count'] += 1
+            deltas[key]['volume'] += exercise_set.volume
+    _apply_deltas(user_id, deltas)
+
+
+def rebuild_aggregates(user_ids=None, batch_size=1000):
+    """
+    Reconstruit entièrement les agrégats depuis WorkoutSession/ExerciseSet
+    (backfill ou réparation). Retourne le nombre de lignes créées.
+    """
+    aggregates = UserWorkoutAggregate.objects.all()
+    sessions = WorkoutSession.objects.filter(status='completed')
+    sets = ExerciseSet.objects.filter(session__status='completed')
+    if user_ids is not None:
+        aggregates = aggregates.filter(user_id__in=user_ids)
+        sessions = sessions.filter(user_id__in=user_ids)
+        sets = sets.filter(session__user_id__in=user_ids)
+
+    rows = defaultdict(_empty_delta)
+    for item in sessions.annotate(day=TruncDate('started_at')).values('user_id', 'day').annotate(
+        sessions=Count('id'), duration=Sum('duration_minutes')
+    ).order_by():
+        row = rows[(item['user_id'], item['day'], DAY_TOTAL)]
+        row['sessions_count'] = item['sessions']
+        row['duration_minutes'] = item['duration'] or 0
+
+    for item in sets.annotate(day=TruncDate('session__started_at')).values(
+        'session__user_id', 'day', 'exercise__muscle_group'
+    ).annotate(sets=Count('id'), volume=Sum(F('weight') * F('reps'))).order_by():
+        volume = item['volume'] or 0
+        for muscle_group in (DAY_TOTAL, item['exercise__muscle_group']):
+            row = rows[(item['session__user_id'], item['day'], muscle_group)]
+            row['sets_count'] += item['sets']
+            row['volume'] += volume
+
+    with transaction.atomic():
+        aggregates.delete()
+        UserWorkoutAggregate.objects.bulk_create(
+            [
+                UserWorkoutAggregate(user_id=user_id, date=day, muscle_group=muscle_group, **values)
+                for (user_id, day, muscle_group), values in rows.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(rows)
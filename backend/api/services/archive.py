@@ -0,0 +1,143 @@
+"""
+Archive complète des données d'un utilisateur (RGPD / portabilité).
+
+Un zip contenant un fichier par jeu de données (NDJSON ou CSV), écrit morceau
+par morceau : chaque table est lue par `.values(...).iterator(chunk_size=...)`
+(curseur côté serveur sur PostgreSQL) et le zip est produit dans un tampon non
+adressable vidé à chaque écriture. Ni le jeu de données ni l'archive ne sont
+jamais entièrement en mémoire ; le même générateur sert la commande
+`export_user_data` et l'endpoint /api/users/me/archive/.
+"""
+import csv
+import io
+import json
+import zipfile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from api.models import (
+    Comment, CustomEvent, DailyLog, ExerciseSet, User, UserBadge, WellnessPlan, WorkoutSession,
+)
+
+ARCHIVE_CHUNK_SIZE = 2000
+ARCHIVE_FORMATS = ('ndjson', 'csv')
+# Taille à partir de laquelle le tampon du fichier en cours est compressé et envoyé
+FLUSH_BYTES = 64 * 1024
+
+# Jeu de données : (modèle, filtre propriétaire, champs exportés)
+ARCHIVE_DATASETS = {
+    'profile': (User, 'id', (
+        'id', 'username', 'email', 'first_name', 'last_name', 'bio', 'avatar',
+        'date_joined', 'marketing_opt_in', 'is_onboarded',
+        'stats__level', 'stats__xp', 'stats__current_streak', 'stats__health_score',
+    )),
+    'plans': (WellnessPlan, 'user_id', (
+        'id', 'created_at', 'age', 'gender', 'height', 'weight', 'goal', 'activity_level',
+        'workout_plan', 'nutrition_plan',
+    )),
+    'daily_logs': (DailyLog, 'user_id', (
+        'id', 'date', 'water_liters', 'sleep_hours', 'mood', 'weight', 'notes', 'updated_at',
+    )),
+    'sessions': (WorkoutSession, 'user_id', (
+        'id', 'started_at', 'completed_at', 'duration_minutes', 'status', 'total_volume', 'notes',
+    )),
+    'sets': (ExerciseSet, 'session__user_id', (
+        'id', 'session_id', 'exercise__name', 'set_number', 'reps', 'weight', 'rest_seconds',
+        'notes', 'created_at',
+    )),
+    'events': (CustomEvent, 'user_id', (
+        'id', 'title', 'event_type', 'day_of_week', 'start_time', 'end_time', 'is_completed',
+        'priority', 'created_at',
+    )),
+    'badges': (UserBadge, 'user_id', (
+        'badge__name', 'badge__category', 'badge__xp_reward', 'unlocked_at',
+    )),
+    'comments': (Comment, 'author_id', (
+        'id', 'article_id', 'article__title', 'content', 'created_at',
+    )),
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Tampon non adressable : zipfile y écrit, le générateur le vide.
+    Sans seek(), zipfile passe en mode flux (descripteurs de données après chaque fichier).
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _drained(sink):
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def iter_records(user_id, dataset, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """Lignes (dict) d'un jeu de données, lues par paquets de `chunk_size`."""
+    model, owner, fields = ARCHIVE_DATASETS[dataset]
+    queryset = model.objects.filter(**{owner: user_id}).order_by('pk').values(*fields)
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _encode_lines(dataset, records, fmt):
+    """Lignes encodées (bytes) : NDJSON, ou CSV avec en-tête."""
+    if fmt == 'ndjson':
+        for record in records:
+            yield (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+        return
+    fields = ARCHIVE_DATASETS[dataset][2]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for record in records:
+        value_row = [
+            json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+            for value in (record[field] for field in fields)
+        ]
+        writer.writerow(value_row)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_user_archive(user_id, fmt='ndjson', datasets=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Générateur des octets du zip de l'utilisateur (un fichier par jeu de données).
+    `datasets` limite l'archive à certaines clés de ARCHIVE_DATASETS.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Format inconnu : {fmt} ({', '.join(ARCHIVE_FORMATS)})")
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for dataset in datasets or ARCHIVE_DATASETS:
+            records = iter_records(user_id, dataset, chunk_size=chunk_size)
+            # force_zip64 : la taille finale n'est pas connue à l'ouverture
+            with archive.open(f'{dataset}.{fmt}', mode='w', force_zip64=True) as member:
+                pending = 0
+                for line in _encode_lines(dataset, records, fmt):
+                    member.write(line)
+                    pending += len(line)
+                    if pending >= FLUSH_BYTES:
+                        pending = 0
+                        yield from _drained(sink)
+            yield from _drained(sink)
+    yield from _drained(sink)  # Répertoire central, écrit à la fermeture du zip
+
+
+def archive_filename(user, fmt='ndjson'):
+    return f"fitwell_{user.username}_{timezone.now():%Y%m%d}_{fmt}.zip"
@@ -0,0 +1,70 @@
+"""
+Score de régularité : part des CONSISTENCY_WINDOW_DAYS derniers jours où
+l'utilisateur a été actif (journal quotidien ou séance terminée).
+
+Les jours actifs sont comptés en base : UNION des dates des DailyLog et des
+agrégats journaliers (UserWorkoutAggregate), puis COUNT — une requête.
+Le score stocké dans UserStats n'est écrit que par les chemins d'écriture
+(journal rempli, séance terminée ou supprimée, import) et par
+refresh_consistency_scores en cron, qui fait aussi glisser la fenêtre ;
+jamais pendant le rendu d'une page (le journal vide créé par le GET du
+dashboard ne déclenche rien).
+"""
+from collections import Counter
+from datetime import timedelta
+from django.utils import timezone
+from api.models import DailyLog, UserStats, UserWorkoutAggregate
+
+CONSISTENCY_WINDOW_DAYS = 30
+
+
+def _active_days(since, user_id=None):
+    """(user_id, date) distincts des jours actifs depuis `since` (UNION, sans doublon)."""
+    logs = DailyLog.objects.filter(date__gte=since)
+    workouts = UserWorkoutAggregate.objects.filter(
+        date__gte=since, muscle_group=UserWorkoutAggregate.DAY_TOTAL, sessions_count__gt=0,
+    )
+    if user_id is not None:
+        logs = logs.filter(user_id=user_id)
+        workouts = workouts.filter(user_id=user_id)
+    return logs.values_list('user_id', 'date').order_by().union(
+        workouts.values_list('user_id', 'date').order_by()
+    )
+
+
+def _score(active_days):
+    return min(100, int(active_days / CONSISTENCY_WINDOW_DAYS * 100))
+
+
+def _window_start(today=None):
+    return (today or timezone.now().date()) - timedelta(days=CONSISTENCY_WINDOW_DAYS)
+
+
+def get_consistency_score(user_id, today=None):
+    """Score de régularité (0-100) calculé en une requête, sans écriture."""
+    return _score(_active_days(_window_start(today), user_id).count())
+
+
+def refresh_consistency_score(user_id, today=None):
+    """Recalcule et stocke le score d'un utilisateur (un SELECT, un UPDATE ciblé). Retourne le score."""
+    score = get_consistency_score(user_id, today)
+    UserStats.objects.filter(user_id=user_id).exclude(consistency_score=score).update(consistency_score=score)
+    return score
+
+
+def refresh_consistency_scores(batch_size=1000, today=None):
+    """
+    Recalcule le score de tous les utilisateurs (cron quotidien : la fenêtre glisse).
+    Retourne le nombre de scores modifiés.
+    """
+    active = Counter(
+        user_id for user_id, _ in _active_days(_window_start(today)).iterator(chunk_size=batch_size)
+    )
+    changed = []
+    for stat in UserStats.objects.only('id', 'user_id', 'consistency_score').iterator(chunk_size=batch_size):
+        score = _score(active.get(stat.user_id, 0))
+        if stat.consistency_score != score:
+            stat.consistency_score = score
+            changed.append(stat)
+    UserStats.objects.bulk_update(changed, ['consistency_score'], batch_size=batch_size)
+    return len(changed)
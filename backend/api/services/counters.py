@@ -0,0 +1,71 @@
+"""
+Compteurs dénormalisés de UserStats (séances terminées, volume cumulé,
+commentaires, plans).
+
+Chaque écriture concernée applique un UPDATE atomique (F()) : pas de
+lecture préalable, pas de course entre deux requêtes simultanées.
+reconcile_counters recalcule tout depuis les tables sources en cas de dérive.
+"""
+from django.db.models import Count, F, Sum
+from api.models import Comment, UserStats, WellnessPlan, WorkoutSession
+
+
+def bump_counters(user_id, **deltas):
+    """Ajoute les deltas aux compteurs, ex. bump_counters(1, completed_workouts=1, lifetime_volume=850.0)."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def _differs(current, expected):
+    # Le volume cumulé par additions successives peut différer du SUM à l'arrondi près
+    return abs(current - expected) > 0.01
+
+
+def _counters_from_db(user_ids=None):
+    """{user_id: {compteur: valeur}} recalculé depuis les tables sources (une requête groupée par table)."""
+    sessions = WorkoutSession.objects.filter(status='completed')
+    comments = Comment.objects.all()
+    plans = WellnessPlan.objects.all()
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        comments = comments.filter(author_id__in=user_ids)
+        plans = plans.filter(user_id__in=user_ids)
+
+    counters = {}
+
+    def row(user_id):
+        return counters.setdefault(user_id, {field: 0 for field in UserStats.COUNTER_FIELDS})
+
+    for item in sessions.values('user_id').annotate(n=Count('id'), volume=Sum('total_volume')).order_by():
+        row(item['user_id']).update(completed_workouts=item['n'], lifetime_volume=item['volume'] or 0.0)
+    for item in comments.values('author_id').annotate(n=Count('id')).order_by():
+        row(item['author_id'])['comment_count'] = item['n']
+    for item in plans.values('user_id').annotate(n=Count('id')).order_by():
+        row(item['user_id'])['plan_count'] = item['n']
+    return counters
+
+
+def reconcile_counters(user_ids=None, batch_size=1000, dry_run=False):
+    """
+    Répare les compteurs qui ont dérivé des tables sources.
+    Retourne la liste des UserStats corrigés (non sauvegardés si dry_run).
+    """
+    expected = _counters_from_db(user_ids)
+    stats = UserStats.objects.only('id', 'user_id', *UserStats.COUNTER_FIELDS)
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+
+    drifted = []
+    for stat in stats.iterator(chunk_size=batch_size):
+        values = expected.get(stat.user_id, {field: 0 for field in UserStats.COUNTER_FIELDS})
+        if any(_differs(getattr(stat, field), value) for field, value in values.items()):
+            for field, value in values.items():
+                setattr(stat, field, value)
+            drifted.append(stat)
+    if drifted and not dry_run:
+        UserStats.objects.bulk_update(drifted, UserStats.COUNTER_FIELDS, batch_size=batch_size)
+    return drifted
@@ -0,0 +1,139 @@
+"""
+Exports CSV en streaming.
+
+Les lignes sont lues par paquets (`values_list(...).iterator(chunk_size=...)`)
+et envoyées au client au fil de l'eau via StreamingHttpResponse : la mémoire
+reste constante quel que soit le volume exporté. Compression gzip optionnelle
+et sélection des colonnes (`?columns=id,email`).
+"""
+import csv
+import zlib
+from django.http import StreamingHttpResponse
+from api.models import DailyLog, ExerciseSet, User, WorkoutSession
+
+EXPORT_CHUNK_SIZE = 2000
+# Lignes CSV regroupées par morceau envoyé (évite un write() réseau par ligne)
+ROWS_PER_WRITE = 500
+
+# Jeux de données exportables : modèle, champ propriétaire, colonnes (clé, en-tête, champ ORM)
+DATASETS = {
+    'users': {
+        'model': User,
+        'owner': None,
+        'columns': (
+            ('id', 'ID', 'id'),
+            ('username', "Nom d'utilisateur", 'username'),
+            ('email', 'Email', 'email'),
+            ('is_staff', 'Staff', 'is_staff'),
+            ('date_joined', "Date d'inscription", 'date_joined'),
+        ),
+    },
+    'sessions': {
+        'model': WorkoutSession,
+        'owner': 'user_id',
+        'columns': (
+            ('id', 'ID', 'id'),
+            ('started_at', 'Début', 'started_at'),
+            ('completed_at', 'Fin', 'completed_at'),
+            ('duration_minutes', 'Durée (min)', 'duration_minutes'),
+            ('status', 'Statut', 'status'),
+            ('total_volume', 'Volume (kg)', 'total_volume'),
+            ('notes', 'Notes', 'notes'),
+        ),
+    },
+    'sets': {
+        'model': ExerciseSet,
+        'owner': 'session__user_id',
+        'columns': (
+            ('id', 'ID', 'id'),
+            ('session', 'Séance', 'session_id'),
+            ('exercise', 'Exercice', 'exercise__name'),
+            ('set_number', 'Série', 'set_number'),
+            ('reps', 'Répétitions', 'reps'),
+            ('weight', 'Poids (kg)', 'weight'),
+            ('rest_seconds', 'Repos (s)', 'rest_seconds'),
+            ('created_at', 'Date', 'created_at'),
+        ),
+    },
+    'daily_logs': {
+        'model': DailyLog,
+        'owner': 'user_id',
+        'columns': (
+            ('date', 'Date', 'date'),
+            ('water_liters', 'Eau (L)', 'water_liters'),
+            ('sleep_hours', 'Sommeil (h)', 'sleep_hours'),
+            ('mood', 'Humeur', 'mood'),
+            ('weight', 'Poids (kg)', 'weight'),
+            ('notes', 'Notes', 'notes'),
+        ),
+    },
+}
+
+
+class Echo:
+    """Pseudo-fichier pour csv.writer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def select_columns(dataset, requested=None):
+    """
+    Colonnes à exporter. `requested` : clés séparées par des virgules (toutes si vide).
+    Lève ValueError sur une clé inconnue.
+    """
+    columns = DATASETS[dataset]['columns']
+    if not requested:
+        return columns
+    by_key = {column[0]: column for column in columns}
+    keys = [key.strip() for key in requested.split(',') if key.strip()]
+    unknown = [key for key in keys if key not in by_key]
+    if unknown or not keys:
+        raise ValueError(
+            f"Colonnes inconnues : {', '.join(unknown) or requested}. "
+            f"Disponibles : {', '.join(by_key)}"
+        )
+    return tuple(by_key[key] for key in keys)
+
+
+def iter_csv_rows(dataset, user_id=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Générateur de morceaux CSV (str) : en-tête puis lignes lues par paquets de `chunk_size`."""
+    spec = DATASETS[dataset]
+    columns = columns or spec['columns']
+    queryset = spec['model'].objects.all()
+    if spec['owner']:
+        queryset = queryset.filter(**{spec['owner']: user_id})
+    rows = queryset.order_by('pk').values_list(*(column[2] for column in columns)).iterator(chunk_size=chunk_size)
+
+    writer = csv.writer(Echo())
+    yield writer.writerow([column[1] for column in columns])
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """Compresse à la volée un flux de str (format gzip, wbits=31)."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def streaming_csv_response(dataset, filename, user_id=None, columns=None, gzip=False):
+    """StreamingHttpResponse CSV (optionnellement gzip) pour un jeu de données de DATASETS."""
+    chunks = iter_csv_rows(dataset, user_id=user_id, columns=columns)
+    if gzip:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
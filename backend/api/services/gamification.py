@@ -1,56 +1,138 @@
-from api.models import Badge, UserBadge, WorkoutSession, Comment
+"""
+Moteur d'attribution des badges.
 
-def check_and_award_badges(user):
+Le catalogue des badges est indexé par condition_type et gardé en mémoire ;
+il est rechargé quand un badge est créé, modifié ou supprimé (version dans
+le cache Django). La version n'est partagée entre processus qu'avec un cache
+partagé (CACHE_BACKEND Redis / Memcached) ; avec LocMem, les autres workers
+voient le changement au plus tard après CATALOGUE_MAX_AGE. Un événement ("workout_completed",
+"plan_created"...) n'évalue que les conditions qu'il peut faire évoluer.
+
+Le streak est mis à jour au plus une fois par jour et par utilisateur
+(touch_streak, appelé par web.middleware.StreakMiddleware).
+"""
+import time
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from api.models import Badge, UserBadge, UserStats
+from api.models.gamification import cumulative_xp, level_for_cumulative_xp
+
+CATALOGUE_VERSION_KEY = 'badges:catalogue:version'
+
+# Conditions réévaluées pour chaque événement ; sans événement, toutes le sont.
+# 'level' est toujours évalué : les récompenses d'XP peuvent faire monter de niveau.
+EVENT_CONDITIONS = {
+    'onboarding': ('account_created', 'plan_count', 'current_streak'),
+    'workout_completed': ('workout_count', 'total_volume', 'current_streak'),
+    'plan_created': ('plan_count', 'current_streak'),
+    'comment_posted': ('comment_count',),
+}
+
+CATALOGUE_MAX_AGE = 5 * 60  # Rechargement forcé : borne le retard d'un worker sans cache partagé
+STREAK_TOUCH_TIMEOUT = 60 * 60 * 24
+
+_catalogue = None  # (version, chargé à, {condition_type: [Badge, ...]}) — copie propre au processus
+
+
+def invalidate_badge_catalogue():
+    """À appeler quand un badge change : chaque processus rechargera le catalogue."""
+    cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+
+
+def get_badge_catalogue():
+    """{condition_type: [Badge, ...]} trié par seuil croissant (une requête au rechargement)."""
+    global _catalogue
+    version = cache.get_or_set(CATALOGUE_VERSION_KEY, time.time_ns, None)
+    now = time.monotonic()
+    if _catalogue is None or _catalogue[0] != version or now - _catalogue[1] > CATALOGUE_MAX_AGE:
+        index = defaultdict(list)
+        for badge in Badge.objects.order_by('condition_value', 'id'):
+            index[badge.condition_type].append(badge)
+        _catalogue = (version, now, dict(index))
+    return _catalogue[2]
+
+
+def _eligible(catalogue, progress, condition_types, unlocked_ids):
+    """Badges non débloqués dont la condition est atteinte (progress : {condition_type: valeur})."""
+    eligible = []
+    for condition_type in condition_types:
+        value = progress.get(condition_type)
+        for badge in catalogue.get(condition_type, ()):
+            if condition_type != 'account_created' and (value is None or value < badge.condition_value):
+                break  # Trié par seuil : les suivants ne sont pas atteints non plus
+            if badge.id not in unlocked_ids:
+                eligible.append(badge)
+    return eligible
+
+
+def check_and_award_badges(user, event=None):
     """
     Vérifie et attribue automatiquement les badges à un utilisateur.
+    `event` (clé de EVENT_CONDITIONS) limite l'évaluation aux badges concernés.
     Retourne la liste des nouveaux badges débloqués.
+
+    L'évaluation se fait sous verrou de la ligne UserStats : deux appels
+    simultanés pour le même utilisateur se suivent, le second relit les badges
+    et l'XP crédités par le premier (niveau et cascade compris).
     """
+    catalogue = get_badge_catalogue()
+    condition_types = [
+        condition_type for condition_type in (EVENT_CONDITIONS[event] if event else catalogue)
+        if condition_type in catalogue and condition_type != 'level'
+    ]
+    if not condition_types and 'level' not in catalogue:
+        return []
+
     newly_unlocked = []
-    
-    # Get user stats
-    if not hasattr(user, 'stats'):
-        return newly_unlocked
-
-    stats = user.stats
-    workout_count = WorkoutSession.objects.filter(user=user, status='completed').count()
-    total_volume = sum(s.total_volume for s in WorkoutSession.objects.filter(user=user, status='completed'))
-    comment_count = Comment.objects.filter(author=user).count()
-    plan_count = user.plans.count()
-    
-    # Get all badges
-    all_badges = Badge.objects.all()
-    
-    # Get already unlocked badges
-    unlocked_badge_ids = user.badges.values_list('badge_id', flat=True)
-    
-    for badge in all_badges:
-        # Skip if already unlocked
-        if badge.id in unlocked_badge_ids:
-            continue
-        
-        # Check conditions
-        should_unlock = False
-        
-        if badge.condition_type == 'workout_count':
-            should_unlock = workout_count >= badge.condition_value
-        elif badge.condition_type == 'total_volume':
-            should_unlock = total_volume >= badge.condition_value
-        elif badge.condition_type == 'current_streak':
-            should_unlock = stats.current_streak >= badge.condition_value
-        elif badge.condition_type == 'level':
-            should_unlock = stats.level >= badge.condition_value
-        elif badge.condition_type == 'plan_count':
-            should_unlock = plan_count >= badge.condition_value
-        elif badge.condition_type == 'comment_count':
-            should_unlock = comment_count >= badge.condition_value
-        elif badge.condition_type == 'account_created':
-            should_unlock = True
-        
-        if should_unlock:
-            # Award badge
-            UserBadge.objects.create(user=user, badge=badge)
-            # Award XP
-            stats.add_xp(badge.xp_reward)
-            newly_unlocked.append(badge)
-    
+    with transaction.atomic():
+        # XP et compteurs sont écrits par UPDATE atomiques : relus ici plutôt que sur user.stats
+        stats = UserStats.objects.select_for_update().filter(user=user).first()
+        if stats is None:
+            return newly_unlocked
+        progress = {
+            'workout_count': stats.completed_workouts,
+            'total_volume': stats.lifetime_volume,
+            'current_streak': stats.current_streak,
+            'level': stats.level,
+            'plan_count': stats.plan_count,
+            'comment_count': stats.comment_count,
+        }
+
+        unlocked_ids = set(UserBadge.objects.filter(user=user).values_list('badge_id', flat=True))
+        eligible = _eligible(catalogue, progress, condition_types + ['level'], unlocked_ids)
+        # Les récompenses font parfois monter de niveau : badges de niveau en cascade,
+        # calculés en mémoire pour ne créditer l'XP qu'une fois.
+        xp_reward = 0
+        while eligible:
+            newly_unlocked.extend(eligible)
+            unlocked_ids.update(badge.id for badge in eligible)
+            xp_reward += sum(badge.xp_reward for badge in eligible)
+            progress['level'] = level_for_cumulative_xp(cumulative_xp(stats.level, stats.xp) + xp_reward)
+            eligible = _eligible(catalogue, progress, ['level'], unlocked_ids)
+
+        if newly_unlocked:
+            # Une seule requête ; ignore_conflicts ne sert que de filet (l'unicité user/badge
+            # est déjà garantie par le verrou)
+            UserBadge.objects.bulk_create(
+                [UserBadge(user=user, badge=badge) for badge in newly_unlocked], ignore_conflicts=True,
+            )
+            stats.add_xp(xp_reward)
+    user.stats = stats  # L'appelant voit l'XP et le niveau à jour
     return newly_unlocked
+
+
+def touch_streak(user):
+    """
+    Met à jour le streak de l'utilisateur une fois par jour. Les appels suivants
+    du même jour ne font aucune requête (clé "streak-touched:<id>:<date>" en cache).
+    Retourne True si le streak a été réévalué.
+    """
+    today = timezone.now().date()  # Même référence que UserStats.update_streak
+    key = f'streak-touched:{user.pk}:{today.isoformat()}'
+    if not cache.add(key, True, STREAK_TOUCH_TIMEOUT):
+        return False
+    if hasattr(user, 'stats'):
+        user.stats.update_streak()
+    return True
@@ -0,0 +1,127 @@
+"""
+Classement global (page /leaderboard/).
+
+Lecture principale : les classements triés en cache (api.services.ranking),
+sans SQL ; ils sont construits après la réponse qui les a trouvés absents
+(api.services.ranking). En attendant, ou si le cache est inutilisable, repli
+sur la base :
+- Top N : servi depuis le snapshot LeaderboardEntry s'il a moins de
+  LEADERBOARD_REFRESH_SECONDS ; sinon (absent ou trop ancien), top N lu en
+  direct (ORDER BY indexé + LIMIT), sans écriture. Seule la commande
+  refresh_leaderboard réécrit le snapshot, jamais une requête de lecture.
+- Rangs d'un utilisateur : COUNT des utilisateurs strictement devant lui,
+  sur des colonnes indexées de UserStats (xp, streak, compteur de séances),
+  une requête indexée par métrique.
+  Coût constant quel que soit le nombre d'inscrits.
+"""
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from api.models import LeaderboardEntry, User, UserStats
+from api.services.ranking import SCORE_FIELDS, get_board
+
+METRICS = ('xp', 'streak', 'workouts')
+LEADERBOARD_SIZE = 10
+LEADERBOARD_REFRESH_SECONDS = 300  # Au-delà, le snapshot n'est plus servi
+
+
+def _top_rows(metric, size):
+    """Top N d'une métrique, sous forme de dicts prêts pour le snapshot."""
+    field = SCORE_FIELDS[metric]
+    stats = UserStats.objects.order_by(f'-{field}', 'user_id').values(
+        'user_id', 'user__username', 'level', field, 'lifetime_volume'
+    )
+    if metric == 'workouts':
+        stats = stats.filter(completed_workouts__gt=0)
+    return [
+        {'user_id': s['user_id'], 'username': s['user__username'], 'score': s[field], 'level': s['level'],
+         'total_volume': s['lifetime_volume']}
+        for s in stats[:size]
+    ]
+
+
+def refresh_leaderboard(metrics=METRICS, size=LEADERBOARD_SIZE):
+    """Recalcule le snapshot des métriques demandées (une requête triée par métrique)."""
+    now = timezone.now()
+    for metric in metrics:
+        entries = [
+            LeaderboardEntry(metric=metric, position=position, refreshed_at=now, **row)
+            for position, row in enumerate(_top_rows(metric, size), start=1)
+        ]
+        try:
+            with transaction.atomic():
+                LeaderboardEntry.objects.filter(metric=metric).delete()
+                LeaderboardEntry.objects.bulk_create(entries)
+        except IntegrityError:
+            # Rafraîchissement concurrent : l'autre requête a déjà écrit le snapshot
+            pass
+
+
+def _leaderboards_from_cache(size):
+    """{metric: [RankedEntry, ...]} depuis les classements en cache, ou None."""
+    boards = {metric: get_board(metric) for metric in METRICS}
+    if any(board is None for board in boards.values()):
+        return None
+    tops = {metric: board.top(size) for metric, board in boards.items()}
+    # Comme le snapshot : seuls les utilisateurs ayant terminé une séance
+    tops['workouts'] = [entry for entry in tops['workouts'] if entry.score > 0]
+
+    # Utilisateur poussé sans son username (instance User non chargée) : une requête ciblée
+    missing = {e.user_id for entries in tops.values() for e in entries if e.username is None}
+    if missing:
+        usernames = dict(User.objects.filter(id__in=missing).values_list('id', 'username'))
+        tops = {
+            metric: [e._replace(username=usernames.get(e.user_id, '')) if e.username is None else e for e in entries]
+            for metric, entries in tops.items()
+        }
+    return tops
+
+
+def get_leaderboards(size=LEADERBOARD_SIZE):
+    """
+    Retourne {metric: [entrée, ...]} (attributs user_id, username, score, level, total_volume).
+    Depuis le cache si possible, sinon depuis le snapshot en une requête ; une
+    métrique sans snapshot récent est lue en direct (une requête indexée), sans
+    rien écrire.
+    """
+    tops = _leaderboards_from_cache(size)
+    if tops is not None:
+        return tops
+
+    stale_before = timezone.now() - timedelta(seconds=LEADERBOARD_REFRESH_SECONDS)
+    boards = {metric: [] for metric in METRICS}
+    for entry in LeaderboardEntry.objects.filter(position__lte=size):
+        boards[entry.metric].append(entry)
+    fresh = {metric: bool(entries) and min(e.refreshed_at for e in entries) >= stale_before
+             for metric, entries in boards.items()}
+    for metric, entries in boards.items():
+        # Un top vide est légitime (personne n'a terminé de séance) si le reste du snapshot est récent
+        if not fresh[metric] and (entries or not any(fresh.values())):
+            boards[metric] = [
+                LeaderboardEntry(metric=metric, position=position, **row)
+                for position, row in enumerate(_top_rows(metric, size), start=1)
+            ]
+    return boards
+
+
+def get_user_ranks(user, metrics=METRICS):
+    """
+    {metric: rang} (1 = premier) : 1 + nombre d'utilisateurs avec un score strictement supérieur.
+    Depuis le cache si possible, sinon un COUNT par métrique : chacun est servi par
+    l'index de sa colonne (un COUNT filtré commun parcourrait toute la table).
+    """
+    ranks = {}
+    for metric in metrics:
+        board = get_board(metric)
+        if board is not None and user.id in board:
+            ranks[metric] = board.rank(user.id)
+        else:
+            field = SCORE_FIELDS[metric]
+            mine = getattr(user.stats, field)
+            ranks[metric] = UserStats.objects.filter(**{f'{field}__gt': mine}).count() + 1
+    return ranks
+
+
+def get_user_rank(user, metric):
+    """Rang (1 = premier) pour une métrique."""
+    return get_user_ranks(user, [metric])[metric]
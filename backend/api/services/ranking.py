@@ -0,0 +1,310 @@
+"""
+Classements triés en cache (XP, streak, séances terminées).
+
+Chaque métrique est un SortedLeaderboard : des paquets triés de (-score, user_id)
+interrogés par bisection. Une mise à jour ne déplace qu'un paquet (au plus
+2 * BUCKET_SIZE éléments), un rang coûte un parcours des tailles de paquets :
+pas de SQL, et pas de décalage de toute la liste à chaque écriture.
+
+Stockage dans le cache Django configuré (settings.CACHES) :
+- `leaderboard:<metric>:seq`     : dernier numéro d'écriture réservé ;
+- `leaderboard:<metric>:op:<n>`  : l'écriture n°n (user_id, score, labels) ;
+- `leaderboard:<metric>:version` : nombre d'écritures publiées ; incrémenté
+  seulement après l'écriture de l'op, jamais avant ;
+- `leaderboard:<metric>:snapshot` : (version, nombre de morceaux) du dernier
+  snapshot, dont les morceaux de SNAPSHOT_CHUNK utilisateurs sont rangés sous
+  `leaderboard:<metric>:snapshot:<version>:<i>` (aucune valeur géante en cache).
+  Réécrit toutes les SNAPSHOT_EVERY écritures.
+Chaque processus garde sa copie locale et ne rejoue que les écritures
+qu'il n'a pas encore vues.
+
+Construction paresseuse, dans le processus web : une lecture sur cache froid
+retourne None (les appelants se replient sur le SQL : snapshot LeaderboardEntry,
+COUNT indexé) et demande le classement, construit une fois la réponse envoyée
+(signal request_finished, build_pending_boards). Le classement expire après
+BOARD_TTL et est alors reconstruit de la même façon.
+Avec un cache partagé (Memcached, Redis, DatabaseCache : CACHE_BACKEND), un seul
+worker le construit et tous le partagent. Avec LocMem (défaut), chaque worker
+a le sien : les écritures des autres workers n'y arrivent pas, d'où un retard
+borné par BOARD_TTL. La commande rebuild_leaderboard_cache le préchauffe.
+"""
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+from itertools import chain, islice
+from django.core.cache import cache
+from api.models import UserStats
+
+METRICS = ('xp', 'streak', 'workouts')
+# Colonne de UserStats qui porte le score de chaque métrique
+SCORE_FIELDS = {'xp': 'xp', 'streak': 'current_streak', 'workouts': 'completed_workouts'}
+BUCKET_SIZE = 1000
+SNAPSHOT_EVERY = 50
+SNAPSHOT_CHUNK = 5000
+SNAPSHOT_GRACE = 5 * 60  # Durée de vie des morceaux d'un snapshot remplacé (lectures en cours)
+MAX_REPLAY = 2 * SNAPSHOT_EVERY
+OP_TIMEOUT = 60 * 60 * 24
+BOARD_TTL = 15 * 60      # Un classement est reconstruit depuis la base au plus tard après ce délai
+BUILD_LOCK_SECONDS = 60
+
+RankedEntry = namedtuple('RankedEntry', 'position user_id username score level total_volume')
+
+
+class SortedLeaderboard:
+    """Classement trié par score décroissant, mis à jour incrémentalement."""
+
+    def __init__(self, entries=(), labels=None):
+        # entries : [(-score, user_id)] ; labels : {user_id: {'username', 'level', ...}}
+        entries = sorted(entries)
+        self.buckets = [entries[i:i + BUCKET_SIZE] for i in range(0, len(entries), BUCKET_SIZE)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.scores = {user_id: -neg_score for neg_score, user_id in entries}
+        self.labels = labels or {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, user_id):
+        return user_id in self.scores
+
+    def _insert(self, item):
+        if not self.buckets:
+            self.buckets.append([item])
+            self.maxes.append(item)
+            return
+        index = min(bisect_left(self.maxes, item), len(self.buckets) - 1)
+        bucket = self.buckets[index]
+        insort(bucket, item)
+        self.maxes[index] = bucket[-1]
+        if len(bucket) > 2 * BUCKET_SIZE:
+            # Paquet trop gros : coupé en deux pour borner le coût des insertions
+            self.buckets[index:index + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+            self.maxes[index:index + 1] = [bucket[BUCKET_SIZE - 1], bucket[-1]]
+
+    def _remove(self, item):
+        index = bisect_left(self.maxes, item)
+        bucket = self.buckets[index]
+        del bucket[bisect_left(bucket, item)]
+        if bucket:
+            self.maxes[index] = bucket[-1]
+        else:
+            del self.buckets[index]
+            del self.maxes[index]
+
+    def update(self, user_id, score, **labels):
+        """Place (ou déplace) un utilisateur à son nouveau score ; score None = retrait."""
+        old = self.scores.get(user_id)
+        if score is None:
+            if old is not None:
+                self._remove((-old, user_id))
+                del self.scores[user_id]
+                self.labels.pop(user_id, None)
+            return
+        if old != score:
+            if old is not None:
+                self._remove((-old, user_id))
+            self._insert((-score, user_id))
+            self.scores[user_id] = score
+        known = {k: v for k, v in labels.items() if v is not None}
+        if known:
+            self.labels.setdefault(user_id, {}).update(known)
+
+    def rank(self, user_id):
+        """Rang (1 = premier) : 1 + nombre d'utilisateurs au score strictement supérieur."""
+        key = (-self.scores[user_id], 0)
+        index = bisect_left(self.maxes, key)
+        ahead = sum(len(bucket) for bucket in self.buckets[:index])
+        if index < len(self.buckets):
+            ahead += bisect_left(self.buckets[index], key)
+        return ahead + 1
+
+    def top(self, n):
+        """Les n premiers, avec leurs libellés (username, niveau, volume)."""
+        result = []
+        for position, (neg_score, user_id) in enumerate(islice(chain.from_iterable(self.buckets), n), start=1):
+            labels = self.labels.get(user_id, {})
+            result.append(RankedEntry(
+                position, user_id, labels.get('username'), -neg_score,
+                labels.get('level', 1), labels.get('total_volume', 0),
+            ))
+        return result
+
+    def chunks(self, size):
+        """Morceaux (entries, labels) d'au plus `size` utilisateurs, pour le snapshot."""
+        entries = list(chain.from_iterable(self.buckets))
+        for start in range(0, len(entries), size):
+            part = entries[start:start + size]
+            yield part, {user_id: self.labels[user_id] for _, user_id in part if user_id in self.labels}
+
+
+# -----------------------------------------------------------------------------
+# SYNCHRONISATION VIA LE CACHE DJANGO
+# -----------------------------------------------------------------------------
+_local = {}  # {metric: (version, SortedLeaderboard)} — copie propre au processus
+
+
+def _key(metric, suffix):
+    return f'leaderboard:{metric}:{suffix}'
+
+
+def _chunk_keys(metric, version, count):
+    return [_key(metric, f'snapshot:{version}:{i}') for i in range(count)]
+
+
+def _store_snapshot(metric, version, board):
+    """Publie le snapshot morceau par morceau ; ceux du précédent expirent après SNAPSHOT_GRACE."""
+    previous = cache.get(_key(metric, 'snapshot'))
+    chunks = list(board.chunks(SNAPSHOT_CHUNK))
+    cache.set_many(dict(zip(_chunk_keys(metric, version, len(chunks)), chunks)), BOARD_TTL)
+    cache.set(_key(metric, 'snapshot'), (version, len(chunks)), BOARD_TTL)
+    if previous is not None and previous[0] != version:
+        for chunk_key in _chunk_keys(metric, *previous):
+            cache.touch(chunk_key, SNAPSHOT_GRACE)
+
+
+def _load_snapshot(metric):
+    header = cache.get(_key(metric, 'snapshot'))
+    if header is None:
+        return None
+    version, count = header
+    keys = _chunk_keys(metric, version, count)
+    chunks = cache.get_many(keys)
+    if len(chunks) != count:
+        return None
+    entries, labels = [], {}
+    for chunk_key in keys:
+        part, part_labels = chunks[chunk_key]
+        entries.extend(part)
+        labels.update(part_labels)
+    _local[metric] = (version, SortedLeaderboard(entries, labels))
+    return _local[metric]
+
+
+def _invalidate(metric):
+    """
+    Abandonne le classement en cache (écritures perdues, snapshot évincé) : lectures
+    en SQL et push_score sans effet jusqu'à la prochaine construction.
+    """
+    cache.delete(_key(metric, 'version'))
+    _local.pop(metric, None)
+
+
+def _sync(metric, target):
+    """
+    Amène la copie locale à la version `target` en rejouant les écritures manquantes.
+    Une écriture réservée mais pas encore écrite arrête le rejeu : la copie reste
+    à la dernière version complète et rattrapera à la lecture suivante. Retourne
+    None (après invalidation) si le retard dépasse MAX_REPLAY même après snapshot.
+    """
+    local = _local.get(metric)
+    if local is None or local[0] > target or target - local[0] > MAX_REPLAY:
+        local = _load_snapshot(metric)
+    if local is None or target - local[0] > MAX_REPLAY:
+        _invalidate(metric)
+        return None
+
+    version, board = local
+    if version < target:
+        op_keys = [_key(metric, f'op:{n}') for n in range(version + 1, target + 1)]
+        ops = cache.get_many(op_keys)
+        for op_key in op_keys:
+            if op_key not in ops:
+                break
+            user_id, score, labels = ops[op_key]
+            board.update(user_id, score, **labels)
+            version += 1
+        _local[metric] = (version, board)
+    return _local[metric]
+
+
+_pending = set()  # Métriques demandées sur cache froid pendant la requête en cours
+
+
+def get_board(metric):
+    """
+    Classement à jour pour `metric`, ou None si le cache est froid ou inutilisable :
+    l'appelant se replie alors sur la base, et le classement sera construit à la
+    fin de la requête.
+    """
+    version = cache.get(_key(metric, 'version'))
+    if version is None:
+        _pending.add(metric)
+        return None
+    synced = _sync(metric, version)
+    return synced[1] if synced else None
+
+
+def forget_pending_boards():
+    _pending.clear()
+
+
+def build_pending_boards():
+    """
+    Construit les classements demandés sur cache froid (après la réponse, signal
+    request_finished). Le verrou cache.add évite les constructions simultanées
+    quand le cache est partagé entre workers.
+    """
+    while _pending:
+        metric = _pending.pop()
+        if cache.get(_key(metric, 'version')) is not None:
+            continue
+        lock = _key(metric, 'building')
+        if cache.add(lock, True, BUILD_LOCK_SECONDS):
+            try:
+                rebuild_boards([metric])
+            finally:
+                cache.delete(lock)
+
+
+def push_score(metric, user_id, score, **labels):
+    """
+    Enregistre le nouveau score d'un utilisateur. Sans effet si le classement
+    n'est pas encore chargé : la prochaine construction lira la base.
+    L'écriture est stockée avant d'être publiée (version) : un lecteur ne voit
+    jamais une version dont l'op n'existe pas encore, sauf réservation concurrente.
+    """
+    if cache.get(_key(metric, 'version')) is None:
+        return
+    try:
+        number = cache.incr(_key(metric, 'seq'))
+    except ValueError:
+        return
+    cache.set(_key(metric, f'op:{number}'), (user_id, score, labels), OP_TIMEOUT)
+    try:
+        version = cache.incr(_key(metric, 'version'))
+    except ValueError:
+        return  # Classement expiré entre-temps : la prochaine construction lira la base
+    synced = _sync(metric, version)
+    if synced and number % SNAPSHOT_EVERY == 0:
+        _store_snapshot(metric, *synced)
+        # Les écritures plus anciennes que MAX_REPLAY ne seront plus rejouées
+        oldest = synced[0] - MAX_REPLAY
+        cache.delete_many([_key(metric, f'op:{n}') for n in range(oldest - SNAPSHOT_EVERY + 1, oldest + 1)])
+
+
+def _scores_from_db(metric):
+    """(user_id, score, labels) pour tous les utilisateurs."""
+    field = SCORE_FIELDS[metric]
+    rows = UserStats.objects.values_list('user_id', 'user__username', 'level', field, 'lifetime_volume')
+    for user_id, username, level, score, volume in rows.iterator():
+        yield user_id, score, {'username': username, 'level': level, 'total_volume': volume}
+
+
+def rebuild_boards(metrics=METRICS):
+    """
+    Reconstruit les classements depuis la base et les publie dans le cache.
+    Lit tous les utilisateurs : jamais pendant le traitement d'une requête
+    (build_pending_boards après la réponse, ou commande rebuild_leaderboard_cache).
+    """
+    for metric in metrics:
+        entries, labels = [], {}
+        for user_id, score, user_labels in _scores_from_db(metric):
+            entries.append((-score, user_id))
+            labels[user_id] = user_labels
+        board = SortedLeaderboard(entries, labels)
+        # Version horodatée : toute copie locale plus ancienne rechargera ce snapshot
+        version = int(time.time() * 1000)
+        _store_snapshot(metric, version, board)
+        cache.set(_key(metric, 'seq'), version, BOARD_TTL)
+        cache.set(_key(metric, 'version'), version, BOARD_TTL)
+        _local[metric] = (version, board)
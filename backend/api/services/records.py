@@ -0,0 +1,79 @@
+"""
+Moteur de records personnels (PR).
+
+Tous les records d'un utilisateur sont calculés en UNE requête groupée par
+(exercice, répétitions), puis repliés en Python par exercice.
+Le résultat est mis en cache par utilisateur et invalidé à chaque set enregistré.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Max
+from api.models import ExerciseSet
+
+RECORDS_CACHE_TIMEOUT = 60 * 60 * 24  # 24h (invalidation explicite sur écriture)
+
+
+def _cache_key(user_id):
+    return f'records:user:{user_id}'
+
+
+def estimated_one_rep_max(weight, reps):
+    """
+    Estimation du 1RM (formule d'Epley) : poids × (1 + reps / 30).
+    Une série d'une seule répétition est déjà un 1RM.
+    """
+    if reps <= 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def compute_personal_records(user_id):
+    """
+    Calcule les records de chaque exercice pratiqué (séances terminées uniquement).
+    Trié par nombre de sets décroissant (exercices les plus travaillés d'abord).
+    """
+    rows = ExerciseSet.objects.filter(
+        session__user_id=user_id,
+        session__status='completed'
+    ).values(
+        'exercise_id', 'exercise__name', 'exercise__muscle_group', 'reps'
+    ).annotate(
+        sets_count=Count('id'),
+        max_weight=Max('weight')
+    ).order_by()
+
+    records = {}
+    for row in rows:
+        record = records.setdefault(row['exercise_id'], {
+            'exercise_id': row['exercise_id'],
+            'exercise_name': row['exercise__name'],
+            'muscle_group': row['exercise__muscle_group'],
+            'sets_count': 0,
+            'max_weight': 0,
+            'max_volume': 0,
+            'estimated_1rm': 0,
+            'max_reps': 0,
+            'rep_maxes': {},
+        })
+        reps, weight = row['reps'], row['max_weight'] or 0
+        record['sets_count'] += row['sets_count']
+        record['max_weight'] = max(record['max_weight'], weight)
+        record['max_volume'] = max(record['max_volume'], weight * reps)
+        record['estimated_1rm'] = max(record['estimated_1rm'], round(estimated_one_rep_max(weight, reps), 1))
+        record['max_reps'] = max(record['max_reps'], reps)
+        record['rep_maxes'][reps] = weight
+
+    return sorted(records.values(), key=lambda r: (-r['sets_count'], r['exercise_name']))
+
+
+def get_personal_records(user, limit=None):
+    """Records de l'utilisateur, servis depuis le cache quand c'est possible."""
+    key = _cache_key(user.id)
+    records = cache.get(key)
+    if records is None:
+        records = compute_personal_records(user.id)
+        cache.set(key, records, RECORDS_CACHE_TIMEOUT)
+    return records[:limit] if limit is not None else records
+
+
+def invalidate_personal_records(user_id):
+    cache.delete(_cache_key(user_id))
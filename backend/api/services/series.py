@@ -0,0 +1,93 @@
+"""
+Séries temporelles d'entraînement (volume, sets, répétitions, fréquence)
+par jour / semaine / mois, éventuellement ventilées par groupe musculaire
+ou par exercice.
+
+Une requête GROUP BY sur ExerciseSet ⨝ WorkoutSession ⨝ Exercise, servie par
+les index couvrants session_user_status_idx et set_session_exercise_idx.
+Le résultat est mis en cache sous une clé qui contient le "marqueur" des sets
+de l'utilisateur : l'id du dernier set enregistré, remplacé par un tampon à
+chaque modification ou suppression. Une relecture ne coûte aucune requête tant
+qu'aucun set n'a changé.
+"""
+import time
+from django.core.cache import cache
+from django.db.models import Count, DateField, F, Max, Sum
+from api.models import ExerciseSet
+from api.services.workout_stats import GROUPINGS
+
+SERIES_CACHE_TIMEOUT = 60 * 60 * 24
+
+METRICS = {
+    'volume': lambda: Sum(F('weight') * F('reps')),
+    'sets': lambda: Count('id'),
+    'reps': lambda: Sum('reps'),
+    'frequency': lambda: Count('session_id', distinct=True),
+}
+GROUP_BY = {
+    'muscle_group': 'exercise__muscle_group',
+    'exercise': 'exercise__slug',
+}
+
+
+def _marker_key(user_id):
+    return f'workout-series:marker:{user_id}'
+
+
+def series_marker(user_id):
+    """Id du dernier set de l'utilisateur (ou tampon de la dernière modification)."""
+    marker = cache.get(_marker_key(user_id))
+    if marker is None:
+        last_id = ExerciseSet.objects.filter(session__user_id=user_id).aggregate(last=Max('id'))['last']
+        marker = str(last_id or 0)
+        cache.add(_marker_key(user_id), marker, None)
+    return marker
+
+
+def note_sets_changed(user_id, last_set_id=None):
+    """
+    À appeler quand les sets (ou le statut d'une séance) d'un utilisateur changent.
+    `last_set_id` : id du dernier set créé ; sans lui (modification, suppression), un tampon unique.
+    """
+    marker = str(last_set_id) if last_set_id else f'changed-{time.time_ns()}'
+    cache.set(_marker_key(user_id), marker, None)
+
+
+def compute_series(user_id, bucket='week', metric='volume', group_by=None, start=None, end=None):
+    """[{'period', 'group', 'value'}] trié par période, sur les séances terminées."""
+    sets = ExerciseSet.objects.filter(session__user_id=user_id, session__status='completed')
+    if start:
+        sets = sets.filter(session__started_at__date__gte=start)
+    if end:
+        sets = sets.filter(session__started_at__date__lte=end)
+
+    fields = ['period'] + ([GROUP_BY[group_by]] if group_by else [])
+    rows = sets.annotate(
+        period=GROUPINGS[bucket]('session__started_at', output_field=DateField()),
+    ).values(*fields).annotate(value=METRICS[metric]()).order_by(*fields)
+    return [
+        {
+            'period': row['period'],
+            'group': row[GROUP_BY[group_by]] if group_by else None,
+            'value': round(row['value'] or 0, 2),
+        }
+        for row in rows
+    ]
+
+
+def get_series(user_id, bucket='week', metric='volume', group_by=None, start=None, end=None):
+    """
+    Série en cache (clé : utilisateur, paramètres, marqueur des sets).
+    Lève ValueError sur un paramètre inconnu.
+    """
+    for name, value, allowed in (('bucket', bucket, GROUPINGS), ('metric', metric, METRICS),
+                                 ('group_by', group_by or None, GROUP_BY)):
+        if value is not None and value not in allowed:
+            raise ValueError(f"{name} inconnu : {value} ({', '.join(allowed)})")
+
+    key = f'workout-series:{user_id}:{bucket}:{metric}:{group_by or "-"}:{start or "-"}:{end or "-"}:{series_marker(user_id)}'
+    series = cache.get(key)
+    if series is None:
+        series = compute_series(user_id, bucket, metric, group_by or None, start, end)
+        cache.set(key, series, SERIES_CACHE_TIMEOUT)
+    return series
@@ -0,0 +1,105 @@
+"""
+Index des sessions authentifiées (UserSession).
+
+Alimenté par les signaux user_logged_in / user_logged_out (api.signals) et
+par le changement de mot de passe (rotation de clé, sync_rotated_session) ;
+les lignes dont la Session a expiré ou disparu sont purgées en masse
+(commande sync_user_sessions). L'expiration est toujours lue dans
+django_session, qui la prolonge à chaque enregistrement de la session.
+Le dashboard admin y lit "qui est en ligne" en une requête groupée.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.contrib.sessions.models import Session
+from django.db.models import Count
+from django.utils import timezone
+from api.models import User, UserSession
+
+
+def live_session_keys(now=None):
+    """Sous-requête des clés de Session non expirées (index expire_date de django_session)."""
+    return Session.objects.filter(expire_date__gte=now or timezone.now()).values('session_key')
+
+
+def record_session(request, user, ip=None, user_agent=''):
+    """
+    Indexe la session courante de `user` (appelé à la connexion). login()
+    change la clé de la session reçue (nouvelle clé, ou session vidée si elle
+    appartenait à un autre utilisateur) : la ligne de l'ancienne clé, lue dans
+    le cookie de la requête, est retirée au passage.
+    """
+    session = getattr(request, 'session', None)
+    if not isinstance(session, DatabaseSessionStore):
+        return None  # L'index s'appuie sur django_session (backends db / cached_db)
+    if session.session_key is None:
+        session.save()  # Session vidée par login() : la nouvelle clé est attribuée maintenant
+    session_key = session.session_key
+    row, _ = UserSession.objects.update_or_create(
+        session_key=session_key,
+        defaults={'user': user, 'ip': ip, 'user_agent': user_agent[:500]},
+    )
+    previous_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if previous_key != session_key:
+        forget_session(previous_key)
+    return row
+
+
+def sync_rotated_session(request, old_key):
+    """
+    Reporte la ligne de `old_key` sur la nouvelle clé de la session, après
+    une rotation hors connexion (update_session_auth_hash au changement de
+    mot de passe). IP, user-agent et date d'ouverture sont conservés.
+    """
+    new_key = getattr(getattr(request, 'session', None), 'session_key', None)
+    if old_key and new_key and new_key != old_key:
+        UserSession.objects.filter(session_key=old_key).update(session_key=new_key)
+
+
+def forget_session(session_key):
+    """Retire une session de l'index (déconnexion)."""
+    if session_key:
+        UserSession.objects.filter(session_key=session_key).delete()
+
+
+def purge_expired_sessions(now=None):
+    """Supprime en une requête les lignes dont la Session a expiré ou disparu."""
+    purged, _ = UserSession.objects.exclude(session_key__in=live_session_keys(now)).delete()
+    return purged
+
+
+def backfill_sessions(batch_size=1000):
+    """
+    Indexe les sessions déjà ouvertes avant la création de UserSession
+    (seul endroit où les Session sont décodées, une fois).
+    """
+    now = timezone.now()
+    known = set(UserSession.objects.values_list('session_key', flat=True))
+    rows = []
+    for session in Session.objects.filter(expire_date__gte=now).iterator(chunk_size=batch_size):
+        if session.session_key in known:
+            continue
+        user_id = session.get_decoded().get('_auth_user_id')
+        if user_id:
+            rows.append(UserSession(user_id=int(user_id), session_key=session.session_key))
+    existing_users = set(User.objects.filter(id__in={row.user_id for row in rows}).values_list('id', flat=True))
+    rows = [row for row in rows if row.user_id in existing_users]
+    UserSession.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return len(rows)
+
+
+def active_sessions():
+    """Sessions dont la Session n'a pas expiré (expiration lue dans django_session)."""
+    return UserSession.objects.filter(session_key__in=live_session_keys())
+
+
+def active_session_counts(user_ids):
+    """{user_id: nombre de sessions actives} pour les utilisateurs donnés (une requête groupée)."""
+    return dict(
+        active_sessions().filter(user_id__in=user_ids).values('user_id').annotate(n=Count('id'))
+        .order_by().values_list('user_id', 'n')
+    )
+
+
+def online_user_count():
+    """Nombre d'utilisateurs ayant au moins une session active."""
+    return active_sessions().values('user_id').distinct().count()
@@ -0,0 +1,67 @@
+"""
+Enregistrement groupé des sets d'une séance.
+
+Un envoi (un set, ou la file hors ligne du navigateur) coûte une requête
+pour vérifier les exercices, une requête groupée pour le dernier numéro de
+série par exercice et le total de la séance, et un seul bulk_create.
+bulk_create ne déclenchant pas post_save, les effets de track_exercise_set
+(totaux de la séance, records, agrégats) sont appliqués ici pour tout le lot.
+"""
+from django.db.models import Count, Max
+from api.models import Exercise, ExerciseSet
+from api.services.aggregates import record_sets
+from api.services.records import invalidate_personal_records
+from api.services.series import note_sets_changed
+from api.services.tallies import apply_set_batch
+
+MAX_SETS_PER_BATCH = 200
+
+
+def log_sets(session, items):
+    """
+    Ajoute des sets validés (ExerciseSetBatchSerializer) à la séance, dans l'ordre reçu.
+    Les numéros de série continuent ceux déjà enregistrés pour chaque exercice.
+    Retourne (sets créés, nombre total de sets de la séance). Lève ValueError
+    si un exercice n'existe pas.
+    """
+    exercise_names = dict(
+        Exercise.objects.filter(id__in={item['exercise_id'] for item in items}).values_list('id', 'name')
+    )
+    unknown = sorted({item['exercise_id'] for item in items} - exercise_names.keys())
+    if unknown:
+        raise ValueError(f"Exercice introuvable : {', '.join(map(str, unknown))}")
+
+    last_numbers, total = {}, 0
+    # Les exercices déjà travaillés dans la séance ont leur ligne SessionExerciseTally
+    for row in session.sets.values('exercise_id').annotate(last=Max('set_number'), n=Count('id')).order_by():
+        last_numbers[row['exercise_id']] = row['last']
+        total += row['n']
+
+    existing_exercise_ids = set(last_numbers)
+    exercise_sets = []
+    for item in items:
+        number = last_numbers.get(item['exercise_id'], 0) + 1
+        last_numbers[item['exercise_id']] = number
+        exercise_set = ExerciseSet(session=session, set_number=number, **item)
+        exercise_set.exercise_name = exercise_names[item['exercise_id']]
+        exercise_sets.append(exercise_set)
+    ExerciseSet.objects.bulk_create(exercise_sets)
+
+    apply_set_batch(session.id, exercise_sets, existing_exercise_ids)
+    invalidate_personal_records(session.user_id)
+    note_sets_changed(session.user_id, exercise_sets[-1].id if exercise_sets else None)
+    record_sets(session, exercise_sets)
+    return exercise_sets, total + len(exercise_sets)
+
+
+def set_payload(exercise_set):
+    """Représentation JSON d'un set renvoyée au front (studio de séance)."""
+    return {
+        'id': exercise_set.id,
+        'exercise_name': exercise_set.exercise_name,
+        'set_number': exercise_set.set_number,
+        'reps': exercise_set.reps,
+        'weight': exercise_set.weight,
+        'volume': exercise_set.volume,
+        'rest_seconds': exercise_set.rest_seconds,
+    }
@@ -0,0 +1,106 @@
+"""
+Totaux courants des séances : nombre de sets et volume, par séance
+(WorkoutSession.sets_count / total_volume) et par exercice (SessionExerciseTally).
+
+Chaque set ajouté, modifié ou supprimé applique son delta par UPDATE atomique
+(F()) : la complétion d'une séance n'a plus rien à recalculer et les listes de
+séances lisent les totaux sans toucher à la table des sets.
+"""
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from api.models import SessionExerciseTally, WorkoutSession
+
+
+def _bump_exercise(session_id, exercise_id, sets, volume):
+    updated = SessionExerciseTally.objects.filter(session_id=session_id, exercise_id=exercise_id).update(
+        sets_count=F('sets_count') + sets, volume=F('volume') + volume,
+    )
+    if updated or sets < 0:
+        return
+    try:
+        with transaction.atomic():
+            SessionExerciseTally.objects.create(
+                session_id=session_id, exercise_id=exercise_id, sets_count=sets, volume=volume,
+            )
+    except IntegrityError:
+        # Ligne créée entre-temps par une requête concurrente
+        _bump_exercise(session_id, exercise_id, sets, volume)
+
+
+def apply_tally(session_id, exercise_id, sets=0, volume=0.0):
+    """Ajoute (ou retire, deltas négatifs) des sets et du volume à une séance et à l'exercice."""
+    WorkoutSession.objects.filter(pk=session_id).update(
+        sets_count=F('sets_count') + sets, total_volume=F('total_volume') + volume,
+    )
+    _bump_exercise(session_id, exercise_id, sets, volume)
+
+
+def apply_set_batch(session_id, exercise_sets, existing_exercise_ids=None):
+    """
+    Intègre des sets créés par bulk_create : un UPDATE de la séance, un par exercice
+    déjà présent et un bulk_create pour les nouveaux. `existing_exercise_ids` : exercices
+    ayant déjà des sets dans la séance (tous supposés présents si None).
+    """
+    per_exercise = defaultdict(lambda: [0, 0.0])
+    for exercise_set in exercise_sets:
+        tally = per_exercise[exercise_set.exercise_id]
+        tally[0] += 1
+        tally[1] += exercise_set.volume
+        exercise_set.remember_tally()
+    if not per_exercise:
+        return
+    WorkoutSession.objects.filter(pk=session_id).update(
+        sets_count=F('sets_count') + len(exercise_sets),
+        total_volume=F('total_volume') + sum(volume for _, volume in per_exercise.values()),
+    )
+    new = {} if existing_exercise_ids is None else {
+        exercise_id: tally for exercise_id, tally in per_exercise.items() if exercise_id not in existing_exercise_ids
+    }
+    for exercise_id, (sets, volume) in per_exercise.items():
+        if exercise_id not in new:
+            _bump_exercise(session_id, exercise_id, sets, volume)
+    if new:
+        try:
+            with transaction.atomic():
+                SessionExerciseTally.objects.bulk_create([
+                    SessionExerciseTally(session_id=session_id, exercise_id=exercise_id, sets_count=sets, volume=volume)
+                    for exercise_id, (sets, volume) in new.items()
+                ])
+        except IntegrityError:
+            for exercise_id, (sets, volume) in new.items():
+                _bump_exercise(session_id, exercise_id, sets, volume)
+
+
+def track_set_saved(exercise_set, created):
+    """
+    Applique le delta d'un set créé ou modifié (séance, exercice, poids, reps).
+    Retourne la variation de volume de sa séance.
+    """
+    new = (exercise_set.session_id, exercise_set.exercise_id, exercise_set.volume)
+    old = getattr(exercise_set, '_loaded_tally', None)
+    delta = 0.0
+    if created or old is None:
+        if created:
+            apply_tally(new[0], new[1], sets=1, volume=new[2])
+            delta = new[2]
+    elif old[:2] == new[:2]:
+        if old[2] != new[2]:
+            apply_tally(new[0], new[1], volume=new[2] - old[2])
+            delta = new[2] - old[2]
+    else:
+        apply_tally(old[0], old[1], sets=-1, volume=-old[2])
+        apply_tally(new[0], new[1], sets=1, volume=new[2])
+        delta = new[2] - old[2] if old[0] == new[0] else new[2]
+    exercise_set.remember_tally()
+    return delta
+
+
+def track_set_deleted(exercise_set):
+    """Retire la contribution d'un set supprimé. Retourne la variation de volume (négative)."""
+    session_id, exercise_id, volume = getattr(
+        exercise_set, '_loaded_tally',
+        (exercise_set.session_id, exercise_set.exercise_id, exercise_set.volume),
+    )
+    apply_tally(session_id, exercise_id, sets=-1, volume=-volume)
+    return -volume
@@ -0,0 +1,182 @@
+"""
+Import d'historique d'entraînement (migration depuis une autre application).
+
+Les séances arrivent en JSON ou en CSV (une ligne par set), sont validées par
+lots de IMPORT_BATCH_SIZE, puis écrites par bulk_create dans une transaction :
+quelques requêtes par lot au lieu de plusieurs par set. Les exercices sont
+résolus par slug via une table slug → id gardée en cache.
+
+bulk_create ne déclenche aucun signal : totaux par exercice et agrégats sont
+calculés en mémoire pour chaque lot (seules les journées importées sont
+touchées) ; compteurs, régularité, records et classement sont mis à jour une
+fois pour tout l'import.
+"""
+import csv
+import io
+from collections import Counter
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from api.models import Exercise, ExerciseSet, SessionExerciseTally, UserStats, WorkoutSession
+from api.serializers import WorkoutImportSessionSerializer
+from api.services.aggregates import record_imported_sessions
+from api.services.consistency import refresh_consistency_score
+from api.services.counters import bump_counters
+from api.services.gamification import check_and_award_badges
+from api.services.ranking import push_score
+from api.services.records import invalidate_personal_records
+from api.services.series import note_sets_changed
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_SESSIONS = 5000
+EXERCISE_SLUGS_KEY = 'exercises:slug-map'
+EXERCISE_SLUGS_TIMEOUT = 60 * 60
+
+# Colonnes CSV : une ligne par set, regroupées en séances par la colonne "session"
+CSV_SESSION_FIELDS = ('started_at', 'completed_at', 'duration_minutes', 'session_notes')
+CSV_SET_FIELDS = ('exercise', 'set_number', 'reps', 'weight', 'rest_seconds', 'notes')
+
+
+def exercise_slug_map():
+    """{slug: id} de la bibliothèque d'exercices (une requête, puis cache)."""
+    slugs = cache.get(EXERCISE_SLUGS_KEY)
+    if slugs is None:
+        slugs = dict(Exercise.objects.values_list('slug', 'id'))
+        cache.set(EXERCISE_SLUGS_KEY, slugs, EXERCISE_SLUGS_TIMEOUT)
+    return slugs
+
+
+def invalidate_exercise_slug_map():
+    cache.delete(EXERCISE_SLUGS_KEY)
+
+
+def parse_csv(text):
+    """
+    Convertit un CSV (une ligne par set) en liste de séances au format JSON de l'import.
+    Les lignes d'une même séance partagent la colonne "session" (à défaut, started_at).
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {'started_at', 'exercise', 'reps', 'weight'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(sorted(missing))}")
+
+    sessions = {}
+    for row in reader:
+        key = row.get('session') or row['started_at']
+        session = sessions.get(key)
+        if session is None:
+            session = {
+                ('notes' if field == 'session_notes' else field): row[field]
+                for field in CSV_SESSION_FIELDS if row.get(field)
+            }
+            session['sets'] = []
+            sessions[key] = session
+        session['sets'].append({field: row[field] for field in CSV_SET_FIELDS if row.get(field)})
+    return list(sessions.values())
+
+
+def validate_sessions(payload):
+    """
+    Valide les séances par lots. Retourne (séances validées, erreurs) ;
+    chaque erreur est {'session': index, 'errors': {...}}.
+    """
+    context = {'exercise_slugs': exercise_slug_map()}
+    validated, errors = [], []
+    for start in range(0, len(payload), IMPORT_BATCH_SIZE):
+        serializer = WorkoutImportSessionSerializer(
+            data=payload[start:start + IMPORT_BATCH_SIZE], many=True, context=context,
+        )
+        if serializer.is_valid():
+            validated.extend(serializer.validated_data)
+        else:
+            errors.extend(
+                {'session': start + offset, 'errors': item_errors}
+                for offset, item_errors in enumerate(serializer.errors) if item_errors
+            )
+    return validated, errors
+
+
+def _build_session(user, data):
+    """Séance terminée avec volume et durée calculés en un passage sur ses sets."""
+    started_at = data['started_at']
+    completed_at = data.get('completed_at')
+    duration = data.get('duration_minutes')
+    if duration is None:
+        duration = int((completed_at - started_at).total_seconds() / 60) if completed_at else 0
+    if completed_at is None:
+        completed_at = started_at + timedelta(minutes=duration)
+    return WorkoutSession(
+        user=user,
+        started_at=started_at,
+        completed_at=completed_at,
+        duration_minutes=duration,
+        status='completed',
+        notes=data['notes'],
+        total_volume=sum(s['weight'] * s['reps'] for s in data['sets']),
+        sets_count=len(data['sets']),
+    )
+
+
+def _tallies(exercise_sets):
+    """Totaux par (séance, exercice) des sets créés, calculés en mémoire."""
+    tallies = {}
+    for exercise_set in exercise_sets:
+        key = (exercise_set.session_id, exercise_set.exercise_id)
+        tally = tallies.get(key)
+        if tally is None:
+            tally = tallies[key] = SessionExerciseTally(session_id=key[0], exercise_id=key[1])
+        tally.sets_count += 1
+        tally.volume += exercise_set.volume
+    return list(tallies.values())
+
+
+def _numbered_sets(sets):
+    """(numéro, set) : sans set_number fourni, les sets sont numérotés par exercice."""
+    per_exercise = Counter()
+    for s in sets:
+        per_exercise[s['exercise']] += 1
+        yield s.get('set_number') or per_exercise[s['exercise']], s
+
+
+def import_workout_history(user, sessions):
+    """
+    Écrit des séances validées (validate_sessions) et leurs sets, tout ou rien.
+    Retourne {'sessions': n, 'sets': n, 'total_volume': kg}.
+    """
+    slugs = exercise_slug_map()
+    sets_count, total_volume = 0, 0.0
+    with transaction.atomic():
+        for start in range(0, len(sessions), IMPORT_BATCH_SIZE):
+            batch = sessions[start:start + IMPORT_BATCH_SIZE]
+            created = WorkoutSession.objects.bulk_create([_build_session(user, data) for data in batch])
+            exercise_sets = [
+                ExerciseSet(
+                    session=session,
+                    exercise_id=slugs[s['exercise']],
+                    set_number=s.get('set_number') or number,
+                    reps=s['reps'],
+                    weight=s['weight'],
+                    rest_seconds=s['rest_seconds'],
+                    notes=s['notes'],
+                )
+                for session, data in zip(created, batch)
+                for number, s in _numbered_sets(data['sets'])
+            ]
+            ExerciseSet.objects.bulk_create(exercise_sets, batch_size=IMPORT_BATCH_SIZE)
+            SessionExerciseTally.objects.bulk_create(_tallies(exercise_sets), batch_size=IMPORT_BATCH_SIZE)
+            record_imported_sessions(user.id, created, exercise_sets)
+            sets_count += len(exercise_sets)
+            total_volume += sum(session.total_volume for session in created)
+
+        # Une mise à jour pour tout l'import (bulk_create ne passe pas par les signaux)
+        bump_counters(user.id, completed_workouts=len(sessions), lifetime_volume=total_volume)
+        refresh_consistency_score(user.id)
+
+    invalidate_personal_records(user.id)
+    note_sets_changed(user.id)
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is not None:
+        push_score('workouts', user.id, stats.completed_workouts, username=user.username,
+                   level=stats.level, total_volume=stats.lifetime_volume)
+        check_and_award_badges(user, event='workout_completed')
+    return {'sessions': len(sessions), 'sets': sets_count, 'total_volume': round(total_volume, 2)}
@@ -0,0 +1,93 @@
+"""
+Statistiques d'entraînement calculées côté base.
+
+Totaux et moyennes viennent d'UNE requête d'agrégat, la série des dernières
+séances d'une requête tronquée (LIMIT) ; la série groupée (jour / semaine /
+mois) d'une requête GROUP BY. Aucune séance n'est chargée en Python.
+Partagé par l'API (/api/workouts/sessions/stats/) et la page historique.
+"""
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from api.models import WorkoutSession
+
+RECENT_SESSIONS = 10
+GROUPINGS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def completed_sessions(user_id, start=None, end=None):
+    """Séances terminées de l'utilisateur, éventuellement bornées par dates (incluses)."""
+    sessions = WorkoutSession.objects.filter(user_id=user_id, status='completed')
+    if start:
+        sessions = sessions.filter(started_at__date__gte=start)
+    if end:
+        sessions = sessions.filter(started_at__date__lte=end)
+    return sessions
+
+
+def workout_totals(sessions):
+    """Totaux et moyennes en une requête d'agrégat."""
+    totals = sessions.aggregate(
+        sessions=Count('id'),
+        volume=Sum('total_volume'),
+        duration=Sum('duration_minutes'),
+    )
+    count = totals['sessions']
+    volume = totals['volume'] or 0
+    duration = totals['duration'] or 0
+    return {
+        'total_sessions': count,
+        'total_volume_kg': round(volume, 2),
+        'total_duration_minutes': duration,
+        'average_duration': round(duration / count, 2) if count else 0,
+        'average_volume': round(volume / count, 2) if count else 0,
+    }
+
+
+def recent_series(sessions, limit=RECENT_SESSIONS):
+    """Les `limit` dernières séances, de la plus ancienne à la plus récente (une requête LIMIT)."""
+    rows = list(
+        sessions.order_by('-started_at').values('started_at', 'total_volume', 'duration_minutes')[:limit]
+    )
+    rows.reverse()
+    return {
+        'dates': [row['started_at'] for row in rows],
+        'volume': [row['total_volume'] for row in rows],
+        'duration': [row['duration_minutes'] for row in rows],
+    }
+
+
+def grouped_series(sessions, group):
+    """Séances, volume et durée par période ('day', 'week' ou 'month'), en une requête GROUP BY."""
+    period = GROUPINGS[group]('started_at', output_field=DateField())
+    return [
+        {
+            'period': row['period'],
+            'sessions': row['sessions'],
+            'volume': round(row['volume'] or 0, 2),
+            'duration_minutes': row['duration'] or 0,
+        }
+        for row in sessions.annotate(period=period).values('period').annotate(
+            sessions=Count('id'),
+            volume=Sum('total_volume'),
+            duration=Sum('duration_minutes'),
+        ).order_by('period')
+    ]
+
+
+def get_workout_stats(user_id, start=None, end=None, group=None, recent=RECENT_SESSIONS):
+    """
+    Totaux, série des `recent` dernières séances et, si `group` est donné,
+    série agrégée par période. Lève ValueError sur un regroupement inconnu.
+    """
+    if group and group not in GROUPINGS:
+        raise ValueError(f"Regroupement inconnu : {group} ({', '.join(GROUPINGS)})")
+    sessions = completed_sessions(user_id, start, end)
+    stats = workout_totals(sessions)
+    stats['recent'] = recent_series(sessions, recent) if recent else None
+    if group:
+        stats['series'] = grouped_series(sessions, group)
+    return stats
@@ -1,10 +1,33 @@
 """
 Signals — capture l'IP et le User-Agent à chaque connexion utilisateur,
-incrémente le compteur de connexions. Ces infos s'affichent dans le
-dashboard admin custom (/en/admin-panel/).
+incrémente le compteur de connexions et indexe la session ouverte
+(UserSession). Ces infos s'affichent dans le dashboard admin custom
+(/en/admin-panel/).
+
+Maintient aussi les totaux des séances, les agrégats d'entraînement et le
+cache des records personnels quand un set est enregistré, ainsi que les
+compteurs de UserStats (commentaires, plans, séances supprimées), le catalogue
+des badges en mémoire et la table slug → id des exercices (import). Construit
+enfin, une fois la réponse envoyée, les classements demandés sur cache froid.
 """
-from django.contrib.auth.signals import user_logged_in
+import logging
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
+from api.models import User, WorkoutSession, ExerciseSet, Exercise, Comment, WellnessPlan, Badge
+from api.services.aggregates import forget_completed_session, record_set_change, record_sets
+from api.services.consistency import refresh_consistency_score
+from api.services.counters import bump_counters
+from api.services.gamification import check_and_award_badges, invalidate_badge_catalogue
+from api.services.records import invalidate_personal_records
+from api.services.ranking import METRICS, build_pending_boards, forget_pending_boards, push_score
+from api.services.series import note_sets_changed
+from api.services.sessions import record_session, forget_session
+from api.services.tallies import track_set_deleted, track_set_saved
+from api.services.workout_import import invalidate_exercise_slug_map
+
+logger = logging.getLogger('api')
 
 
 def get_client_ip(request) -> str:
@@ -24,3 +47,134 @@ def track_user_login(sender, request, user, **kwargs):
     user.last_user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
     user.login_count = (user.login_count or 0) + 1
     user.save(update_fields=['last_login_ip', 'last_user_agent', 'login_count'])
+    record_session(request, user, ip=user.last_login_ip, user_agent=user.last_user_agent)
+
+
+@receiver(user_logged_out)
+def track_user_logout(sender, request, user, **kwargs):
+    """La session fermée sort de l'index des sessions ouvertes."""
+    if request is not None and hasattr(request, 'session'):
+        forget_session(request.session.session_key)
+
+
+@receiver(post_save, sender=ExerciseSet)
+def track_exercise_set(sender, instance, created, **kwargs):
+    """
+    Un set enregistré met à jour les totaux courants de sa séance et invalide
+    les records personnels ; s'il est ajouté à une séance déjà terminée ou s'il
+    y est modifié, il met aussi à jour les agrégats analytics et le volume
+    cumulé de l'utilisateur.
+    """
+    old_tally = getattr(instance, '_loaded_tally', None)  # Valeurs en base avant cette sauvegarde
+    volume_delta = track_set_saved(instance, created)
+    session = instance.session
+    invalidate_personal_records(session.user_id)
+    note_sets_changed(session.user_id, instance.id if created else None)
+    if session.status == 'completed':
+        bump_counters(session.user_id, lifetime_volume=volume_delta)
+    if created:
+        record_sets(session, [instance])
+    else:
+        record_set_change(old_tally, (instance.session_id, instance.exercise_id, instance.volume))
+
+
+@receiver(post_delete, sender=ExerciseSet)
+def forget_exercise_set(sender, instance, origin=None, **kwargs):
+    """
+    Un set supprimé sort des totaux de sa séance et peut faire tomber un record :
+    on invalide le cache.
+    """
+    # En cascade (suppression d'une séance / d'un compte), l'origine donne le propriétaire
+    # sans recharger la séance pour chaque set ; les totaux partent avec la séance.
+    if isinstance(origin, User):
+        user_id = origin.id
+    elif isinstance(origin, WorkoutSession):
+        user_id = origin.user_id
+    else:
+        old_tally = getattr(instance, '_loaded_tally', None) or (
+            instance.session_id, instance.exercise_id, instance.volume,
+        )
+        volume_delta = track_set_deleted(instance)
+        session = instance.session
+        user_id = session.user_id
+        if session.status == 'completed':
+            bump_counters(user_id, lifetime_volume=volume_delta)
+            record_set_change(old_tally, None)
+    invalidate_personal_records(user_id)
+    note_sets_changed(user_id)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_rankings(sender, instance, **kwargs):
+    """Un compte supprimé disparaît des classements en cache."""
+    for metric in METRICS:
+        push_score(metric, instance.id, None)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.author_id, comment_count=1)
+        check_and_award_badges(instance.author, event='comment_posted')
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User):
+        return  # Compte supprimé : ses stats partent avec lui
+    bump_counters(instance.author_id, comment_count=-1)
+
+
+@receiver(post_save, sender=WellnessPlan)
+def count_plan(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.user_id, plan_count=1)
+
+
+@receiver(post_delete, sender=WellnessPlan)
+def uncount_plan(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User):
+        return  # Compte supprimé : ses stats partent avec lui
+    bump_counters(instance.user_id, plan_count=-1)
+
+
+@receiver(pre_delete, sender=WorkoutSession)
+def unrecord_session(sender, instance, origin=None, **kwargs):
+    """Une séance terminée sort des agrégats avant que ses sets ne partent en cascade."""
+    if not isinstance(origin, User):
+        forget_completed_session(instance)
+
+
+@receiver(post_delete, sender=WorkoutSession)
+def uncount_session(sender, instance, origin=None, **kwargs):
+    """Une séance terminée supprimée sort des compteurs (la complétion les a incrémentés)."""
+    if instance.status == 'completed' and not isinstance(origin, User):
+        bump_counters(instance.user_id, completed_workouts=-1, lifetime_volume=-instance.total_volume)
+        note_sets_changed(instance.user_id)
+        refresh_consistency_score(instance.user_id)  # Son jour peut ne plus être actif
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def reload_badge_catalogue(sender, **kwargs):
+    invalidate_badge_catalogue()
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def reload_exercise_slugs(sender, **kwargs):
+    invalidate_exercise_slug_map()
+
+
+@receiver(request_started)
+def reset_pending_boards(sender, **kwargs):
+    forget_pending_boards()
+
+
+@receiver(request_finished)
+def build_leaderboards(sender, **kwargs):
+    """Classements demandés sur cache froid : construits après la réponse, pas pendant."""
+    try:
+        build_pending_boards()
+    except Exception:
+        logger.exception('Construction des classements en cache impossible')
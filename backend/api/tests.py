@@ -1,8 +1,47 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import User, Article, Category, Comment, Tag
+from .management.commands.benchmark import percentile
+from .models import (
+    Article, Badge, Category, Comment, CustomEvent, DailyLog, Exercise, ExerciseSet, LeaderboardEntry,
+    Tag, User, UserBadge, UserStats, UserWorkoutAggregate, WellnessPlan, WorkoutSession,
+)
+from .models.gamification import cumulative_xp, level_for_cumulative_xp
+from .services import gamification, generate_wellness_plan, ranking
+from .services.archive import ARCHIVE_DATASETS, iter_user_archive
+from .services.consistency import get_consistency_score
+from .services.counters import reconcile_counters
+from .services.gamification import check_and_award_badges, get_badge_catalogue, invalidate_badge_catalogue
+from .services.leaderboard import METRICS, get_leaderboards, get_user_rank, get_user_ranks
+from .services.ranking import SortedLeaderboard, get_board, push_score
+from .services.records import get_personal_records
+from .services.series import get_series
+from .services.workout_import import exercise_slug_map
+from .services.workout_stats import get_workout_stats
+
+
+def make_exercise(name, muscle_group, difficulty='beginner'):
+    """Exercice de test (le slug est dérivé du nom)."""
+    return Exercise.objects.create(name=name, muscle_group=muscle_group, difficulty=difficulty, description='d')
+
 
 class AccountTests(APITestCase):
     def test_registration(self):
@@ -136,7 +175,6 @@ class CommentTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
-from .services import generate_wellness_plan
 
 class ServiceTests(APITestCase):
     def test_generate_wellness_plan_math(self):
@@ -206,3 +244,1104 @@ class WebViewsTests(APITestCase):
             response = self.client.get(url)
             self.assertEqual(response.status_code, status.HTTP_302_FOUND)
             self.assertIn('/login/', response.url)
+
+
+class WorkoutAggregateTests(TestCase):
+    """Agrégats analytics maintenus à la complétion d'une séance."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lifter', password='pw')
+        self.bench = make_exercise('Bench', 'chest')
+        self.squat = make_exercise('Squat', 'legs')
+
+    def _completed_session(self):
+        session = WorkoutSession.objects.create(user=self.user)
+        ExerciseSet.objects.create(session=session, exercise=self.bench, reps=10, weight=50)
+        ExerciseSet.objects.create(session=session, exercise=self.squat, reps=5, weight=100)
+        session.complete_session()
+        return session
+
+    def _snapshot(self):
+        return sorted(UserWorkoutAggregate.objects.filter(user=self.user).values_list(
+            'date', 'muscle_group', 'sessions_count', 'sets_count', 'volume'))
+
+    def test_complete_session_updates_aggregates(self):
+        self._completed_session()
+        self._completed_session()
+        day_total = UserWorkoutAggregate.objects.get(user=self.user, muscle_group='')
+        self.assertEqual(day_total.sessions_count, 2)
+        self.assertEqual(day_total.sets_count, 4)
+        self.assertEqual(day_total.volume, 2000)
+        chest = UserWorkoutAggregate.objects.get(user=self.user, muscle_group='chest')
+        self.assertEqual(chest.volume, 1000)
+
+    def test_set_added_after_completion_is_counted(self):
+        session = self._completed_session()
+        ExerciseSet.objects.create(session=session, exercise=self.bench, reps=1, weight=80)
+        chest = UserWorkoutAggregate.objects.get(user=self.user, muscle_group='chest')
+        self.assertEqual(chest.sets_count, 2)
+        self.assertEqual(chest.volume, 580)
+
+    def _rebuilt(self):
+        UserWorkoutAggregate.objects.all().delete()
+        call_command('backfill_workout_aggregates', stdout=StringIO())
+        return self._snapshot()
+
+    def test_set_edited_after_completion_is_applied(self):
+        session = self._completed_session()
+        bench_set = session.sets.get(exercise=self.bench)
+        bench_set.weight = 100
+        bench_set.save()
+        squat_set = session.sets.get(exercise=self.squat)
+        squat_set.exercise = self.bench
+        squat_set.save()
+        incremental = self._snapshot()
+        self.assertEqual(incremental, self._rebuilt())
+        self.assertEqual([row[1:] for row in incremental], [('', 1, 2, 1500), ('chest', 0, 2, 1500)])
+
+    def test_set_deleted_after_completion_is_removed(self):
+        session = self._completed_session()
+        session.sets.get(exercise=self.squat).delete()
+        incremental = self._snapshot()
+        self.assertEqual(incremental, self._rebuilt())
+        self.assertEqual([row[1:] for row in incremental], [('', 1, 1, 500), ('chest', 0, 1, 500)])
+
+    def test_deleted_session_leaves_aggregates(self):
+        session = self._completed_session()
+        self._completed_session()
+        session.delete()
+        self.assertEqual(UserWorkoutAggregate.objects.get(user=self.user, muscle_group='').sessions_count, 1)
+        WorkoutSession.objects.filter(user=self.user).delete()
+        self.assertEqual(self._snapshot(), [])
+        self.assertEqual(get_consistency_score(self.user.id), 0)
+
+    def test_backfill_matches_incremental(self):
+        self._completed_session()
+        WorkoutSession.objects.create(user=self.user)  # séance active : ignorée
+        incremental = self._snapshot()
+        UserWorkoutAggregate.objects.all().delete()
+        call_command('backfill_workout_aggregates', stdout=StringIO())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_migration_backfills_existing_sessions(self):
+        from django.apps import apps
+        from importlib import import_module
+        migration = import_module('api.migrations.0025_backfill_workout_aggregates')
+        self._completed_session()
+        incremental = self._snapshot()
+        UserWorkoutAggregate.objects.all().delete()
+        migration.backfill_aggregates(apps, None)
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_analytics_reads_aggregates(self):
+        self._completed_session()
+        self.user.is_onboarded = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('analytics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_workouts'], 1)
+        self.assertEqual(response.context['total_volume'], 1000)
+        self.assertEqual(response.context['muscle_values'], [500, 500])
+
+
+class PersonalRecordsTests(APITestCase):
+    """Moteur de records : une requête, cache par utilisateur, invalidation sur set."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pr', password='pw')
+        self.bench = make_exercise('Bench', 'chest')
+        self.session = WorkoutSession.objects.create(user=self.user)
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=10, weight=60)
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=3, weight=80)
+        self.session.complete_session()
+
+    def test_records_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            records = get_personal_records(self.user)
+        with self.assertNumQueries(0):
+            get_personal_records(self.user)
+        record = records[0]
+        self.assertEqual(record['max_weight'], 80)
+        self.assertEqual(record['max_volume'], 600)
+        self.assertEqual(record['max_reps'], 10)
+        self.assertEqual(record['estimated_1rm'], 88.0)
+        self.assertEqual(record['rep_maxes'], {10: 60, 3: 80})
+
+    def test_new_set_invalidates_cache(self):
+        get_personal_records(self.user)
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=1, weight=100)
+        self.assertEqual(get_personal_records(self.user)[0]['max_weight'], 100)
+
+    def test_records_endpoint(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('api:workout-sessions-records'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['exercise_name'], 'Bench')
+
+    def test_records_endpoint_limit(self):
+        ExerciseSet.objects.create(session=self.session, exercise=make_exercise('Squat', 'legs'), reps=5, weight=100)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('api:workout-sessions-records')
+        self.assertEqual(len(self.client.get(url).data), 2)
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'limit': 1000}).data), 2)
+        for limit in ('0', '-1', 'abc', ''):
+            self.assertEqual(self.client.get(url, {'limit': limit}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LeaderboardTests(TestCase):
+    """Classements triés en cache, avec repli sur COUNT indexé et snapshot."""
+
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        for i, (xp, streak) in enumerate([(300, 1), (100, 5), (200, 3)]):
+            user = User.objects.create_user(username=f'player{i}', password='pw', is_onboarded=True)
+            UserStats.objects.filter(user=user).update(xp=xp, current_streak=streak)
+            self.users.append(User.objects.get(id=user.id))
+
+    def test_user_rank(self):
+        self.assertEqual(get_user_rank(self.users[0], 'xp'), 1)
+        self.assertEqual(get_user_rank(self.users[1], 'xp'), 3)
+        self.assertEqual(get_user_rank(self.users[1], 'streak'), 1)
+
+    def test_workout_rank(self):
+        for user in (self.users[2], self.users[2], self.users[1]):
+            WorkoutSession.objects.create(user=user).complete_session()
+        self.assertEqual(get_user_rank(self.users[2], 'workouts'), 1)
+        self.assertEqual(get_user_rank(self.users[1], 'workouts'), 2)
+        self.assertEqual(get_user_rank(self.users[0], 'workouts'), 3)
+
+    def test_sorted_leaderboard(self):
+        board = SortedLeaderboard([(-10, 1), (-30, 2), (-20, 3)])
+        self.assertEqual(board.rank(2), 1)
+        board.update(1, 40, username='a')
+        self.assertEqual([e.user_id for e in board.top(3)], [1, 2, 3])
+        board.update(3, 30)
+        self.assertEqual(board.rank(3), 2)  # Ex aequo : même rang
+        board.update(2, None)
+        self.assertNotIn(2, board)
+        self.assertEqual(board.top(1)[0].username, 'a')
+
+    def test_add_xp_moves_user_without_sql(self):
+        call_command('rebuild_leaderboard_cache', stdout=StringIO())
+        self.assertEqual(get_user_rank(self.users[1], 'xp'), 3)
+        self.users[1].stats.add_xp(250)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_rank(self.users[1], 'xp'), 1)
+            boards = get_leaderboards()
+        self.assertEqual(boards['xp'][0].username, 'player1')
+
+    def test_sorted_leaderboard_splits_buckets(self):
+        with mock.patch.object(ranking, 'BUCKET_SIZE', 2):
+            board = SortedLeaderboard([(-score, score) for score in range(1, 8)])
+            for user_id in range(8, 20):
+                board.update(user_id, user_id)
+            board.update(3, None)
+            self.assertGreater(len(board.buckets), 3)
+            self.assertTrue(all(len(bucket) <= 4 for bucket in board.buckets))
+            self.assertEqual([e.user_id for e in board.top(3)], [19, 18, 17])
+            self.assertEqual(board.rank(1), 18)
+            self.assertEqual(len(board), 18)
+
+    def test_cold_cache_falls_back_to_sql(self):
+        # Pas de construction pendant la requête : rangs (un COUNT indexé par métrique) et top N lus en base
+        self.assertIsNone(get_board('xp'))
+        self.users[1].stats  # Chargées avant la mesure
+        with self.assertNumQueries(len(METRICS)):
+            self.assertEqual(get_user_ranks(self.users[1]), {'xp': 3, 'streak': 1, 'workouts': 1})
+        self.assertEqual(get_leaderboards()['xp'][0].username, 'player0')
+        self.assertIsNone(cache.get('leaderboard:xp:version'))
+
+    def test_board_built_after_the_response(self):
+        self.client.force_login(self.users[1])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('leaderboard'))
+        # Construit par request_finished, après la réponse : visible à la requête suivante
+        self.assertTrue(any('"api_userstats"."current_streak"' in q['sql'] and 'LIMIT' not in q['sql']
+                            for q in ctx.captured_queries))
+        self.assertEqual(get_board('xp').rank(self.users[1].id), 3)
+        with self.assertNumQueries(2):  # Session et utilisateur seulement
+            response = self.client.get(reverse('leaderboard'))
+        self.assertEqual(response.context['user_rank_streak'], 1)
+
+    def test_deleted_user_leaves_board(self):
+        call_command('rebuild_leaderboard_cache', stdout=StringIO())
+        self.users[0].delete()
+        self.assertNotIn(self.users[0].id, get_board('xp'))
+
+    def test_replay_from_other_process(self):
+        with mock.patch.object(ranking, 'SNAPSHOT_CHUNK', 2):
+            call_command('rebuild_leaderboard_cache', stdout=StringIO())
+        self.assertEqual(cache.get('leaderboard:streak:snapshot')[1], 2)  # Snapshot en deux morceaux
+        push_score('streak', self.users[0].id, 50)
+        # Un autre processus repart de sa copie locale vide : snapshot + écritures rejouées
+        ranking._local.clear()
+        self.assertEqual(get_board('streak').rank(self.users[0].id), 1)
+
+    def test_unpublished_write_does_not_drop_board(self):
+        call_command('rebuild_leaderboard_cache', stdout=StringIO())
+        # Un autre worker a réservé l'écriture n mais ne l'a pas encore stockée ni publiée
+        number = cache.incr('leaderboard:xp:seq')
+        push_score('xp', self.users[1].id, 999)
+        cache.incr('leaderboard:xp:version')  # Publication de n avant son op (ordre concurrent)
+        board = get_board('xp')
+        self.assertIsNotNone(board)
+        self.assertEqual(board.rank(self.users[1].id), 3)  # Rejeu arrêté avant l'op manquante
+        cache.set(f'leaderboard:xp:op:{number}', (self.users[2].id, 500, {}))
+        self.assertEqual(get_board('xp').rank(self.users[1].id), 1)
+        self.assertEqual(get_board('xp').rank(self.users[2].id), 2)
+
+    def test_lost_write_drops_board(self):
+        call_command('rebuild_leaderboard_cache', stdout=StringIO())
+        push_score('xp', self.users[1].id, 999)
+        version = cache.get('leaderboard:xp:version')
+        cache.delete(f'leaderboard:xp:op:{version}')
+        ranking._local['xp'] = (version - 1, SortedLeaderboard())
+        cache.delete('leaderboard:xp:snapshot')
+        with mock.patch.object(ranking, 'MAX_REPLAY', 0):
+            # Écriture perdue et plus de snapshot : repli sur la base jusqu'à la prochaine construction
+            self.assertIsNone(get_board('xp'))
+        self.assertIsNone(cache.get('leaderboard:xp:version'))
+        self.assertEqual(get_user_rank(self.users[0], 'xp'), 1)
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_leaderboard_cache', stdout=out)
+        self.assertIn('xp: 3 utilisateurs', out.getvalue())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_top_lists_from_snapshot(self):
+        call_command('refresh_leaderboard', stdout=StringIO())
+        boards = get_leaderboards()
+        self.assertEqual([e.username for e in boards['xp']], ['player0', 'player2', 'player1'])
+        # Le snapshot récent est resservi sans recalcul
+        UserStats.objects.filter(user=self.users[1]).update(xp=999)
+        with self.assertNumQueries(1):
+            boards = get_leaderboards()
+        self.assertEqual(boards['xp'][0].username, 'player0')
+        # Trop ancien pour une métrique : lue en direct, sans réécrire le snapshot
+        LeaderboardEntry.objects.filter(metric='xp').update(refreshed_at=timezone.now() - timedelta(days=1))
+        with self.assertNumQueries(2):
+            boards = get_leaderboards()
+        self.assertEqual(boards['xp'][0].username, 'player1')
+        self.assertEqual(LeaderboardEntry.objects.get(metric='xp', position=1).username, 'player0')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_top_lists_without_snapshot_are_read_only(self):
+        with self.assertNumQueries(1 + len(METRICS)):  # Snapshot vide, puis un top N par métrique
+            boards = get_leaderboards()
+        self.assertEqual([e.username for e in boards['xp']], ['player0', 'player2', 'player1'])
+        self.assertEqual(boards['workouts'], [])
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_leaderboard_page(self):
+        call_command('refresh_leaderboard', stdout=StringIO())  # Cache froid : snapshot du cron
+        self.client.force_login(self.users[1])
+        response = self.client.get(reverse('leaderboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user_rank_xp'], 3)
+
+
+class UserStatsCounterTests(TestCase):
+    """Compteurs dénormalisés de UserStats maintenus par les écritures."""
+
+    def setUp(self):
+        # Le catalogue des badges survit au rollback de la base entre deux tests
+        self.addCleanup(invalidate_badge_catalogue)
+        self.user = User.objects.create_user(username='counted', password='pw')
+        self.exercise = make_exercise('Row', 'back')
+        self.article = Article.objects.create(title='A', content='c', author=self.user)
+
+    def _stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def _complete(self, weight):
+        session = WorkoutSession.objects.create(user=self.user)
+        ExerciseSet.objects.create(session=session, exercise=self.exercise, reps=10, weight=weight)
+        session.complete_session()
+        return session
+
+    def test_counters_follow_writes(self):
+        first = self._complete(50)
+        self._complete(20)
+        comment = Comment.objects.create(article=self.article, author=self.user, content='Bravo')
+        WellnessPlan.objects.create(user=self.user, age=30, gender='male', height=180, weight=80,
+                                    goal='maintenance', activity_level='moderate')
+        stats = self._stats()
+        self.assertEqual((stats.completed_workouts, stats.lifetime_volume), (2, 700))
+        self.assertEqual((stats.comment_count, stats.plan_count), (1, 1))
+
+        comment.delete()
+        first.delete()
+        stats = self._stats()
+        self.assertEqual((stats.completed_workouts, stats.lifetime_volume, stats.comment_count), (1, 200, 0))
+
+    def test_stale_instance_does_not_overwrite_counters(self):
+        stale = self._stats()
+        self._complete(50)
+        stale.add_xp(10)
+        self.assertEqual(self._stats().completed_workouts, 1)
+
+    def test_badges_read_counters(self):
+        Badge.objects.create(name='Volume', description='d', category='workout',
+                             condition_type='total_volume', condition_value=400)
+        self._complete(50)
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(8):
+            # badges, savepoint, stats verrouillées, badges débloqués, INSERT groupé, crédit d'XP, relecture, release
+            unlocked = check_and_award_badges(user)
+        self.assertEqual([b.name for b in unlocked], ['Volume'])
+
+    def test_reconcile_command(self):
+        self._complete(50)
+        UserStats.objects.filter(user=self.user).update(completed_workouts=9, comment_count=3)
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('1 compteurs corrigés', out.getvalue())
+        stats = self._stats()
+        self.assertEqual((stats.completed_workouts, stats.comment_count), (1, 0))
+
+
+class BadgeEngineTests(TestCase):
+    """Évaluation des badges par événement, catalogue en mémoire."""
+
+    def setUp(self):
+        self.addCleanup(invalidate_badge_catalogue)
+        self.user = User.objects.create_user(username='collector', password='pw')
+        for name, condition_type, value, xp in [
+            ('Bienvenue', 'account_created', 1, 400),
+            ('Niveau 2', 'level', 2, 50),
+            ('Plume', 'comment_count', 1, 10),
+        ]:
+            Badge.objects.create(name=name, description='d', category='milestone',
+                                 condition_type=condition_type, condition_value=value, xp_reward=xp)
+
+    def test_event_only_evaluates_its_conditions(self):
+        unlocked = check_and_award_badges(self.user, event='workout_completed')
+        self.assertEqual(unlocked, [])
+        unlocked = check_and_award_badges(self.user, event='onboarding')
+        self.assertEqual([b.name for b in unlocked], ['Bienvenue'])
+
+    def test_level_cascade_credits_xp_once(self):
+        UserStats.objects.filter(user=self.user).update(xp=300)
+        user = User.objects.get(id=self.user.id)
+        with CaptureQueriesContext(connection) as ctx:
+            unlocked = check_and_award_badges(user, event='onboarding')
+        self.assertEqual({b.name for b in unlocked}, {'Bienvenue', 'Niveau 2'})
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_userstats"')]
+        self.assertEqual(len(updates), 1)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.level, stats.xp), (2, 250))  # 300 + 400 + 50 - 500
+        self.assertEqual(UserBadge.objects.filter(user=self.user).count(), 2)
+
+    def test_comment_awards_comment_badge(self):
+        article = Article.objects.create(title='A', content='c', author=self.user)
+        Comment.objects.create(article=article, author=self.user, content='Premier !')
+        self.assertEqual(list(UserBadge.objects.filter(user=self.user).values_list('badge__name', flat=True)),
+                         ['Plume'])
+        self.assertEqual(UserStats.objects.get(user=self.user).xp, 10)
+
+    def test_badge_unlocked_concurrently_credits_no_xp(self):
+        UserStats.objects.filter(user=self.user).update(xp=300)
+        user = User.objects.get(id=self.user.id)
+        user.stats  # Instance en mémoire antérieure à l'appel concurrent
+        welcome = Badge.objects.get(name='Bienvenue')
+        catalogue = gamification.get_badge_catalogue
+
+        def racing_catalogue():
+            # Un appel concurrent débloque Bienvenue (+400 XP : niveau 2) avant notre verrou
+            UserBadge.objects.create(user=self.user, badge=welcome)
+            UserStats.objects.get(user=self.user).add_xp(welcome.xp_reward)
+            return catalogue()
+
+        with mock.patch.object(gamification, 'get_badge_catalogue', racing_catalogue):
+            unlocked = check_and_award_badges(user, event='onboarding')
+        self.assertEqual([b.name for b in unlocked], ['Niveau 2'])  # Niveau relu, Bienvenue non recrédité
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.level, stats.xp), (2, 250))
+        self.assertEqual((user.stats.level, user.stats.xp), (2, 250))
+
+    def test_catalogue_reloaded_after_max_age(self):
+        get_badge_catalogue()
+        Badge.objects.filter(name='Plume').update(condition_type='workout_count')  # Sans signal : autre worker
+        self.assertIn('comment_count', get_badge_catalogue())
+        with mock.patch.object(gamification.time, 'monotonic',
+                               return_value=time.monotonic() + gamification.CATALOGUE_MAX_AGE + 1):
+            self.assertNotIn('comment_count', get_badge_catalogue())
+
+    def test_catalogue_cached_until_badge_saved(self):
+        get_badge_catalogue()
+        with self.assertNumQueries(0):
+            get_badge_catalogue()
+        Badge.objects.create(name='Marathon', description='d', category='workout',
+                             condition_type='workout_count', condition_value=100)
+        self.assertIn('workout_count', get_badge_catalogue())
+
+
+class AtomicXPTests(TestCase):
+    """Gain d'XP en un UPDATE, niveau en forme close."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='grinder', password='pw')
+
+    def test_closed_form_matches_level_rule(self):
+        for total in list(range(0, 20000, 37)) + [499, 500, 1499, 1500]:
+            # Règle historique : le niveau N coûte N * 500 XP
+            level, remaining = 1, total
+            while remaining >= level * 500:
+                remaining -= level * 500
+                level += 1
+            self.assertEqual(level_for_cumulative_xp(total), level)
+            self.assertEqual(cumulative_xp(level, remaining), total)
+
+    def test_add_xp_is_one_update(self):
+        stats = self.user.stats
+        with CaptureQueriesContext(connection) as ctx:
+            stats.add_xp(1700)  # 500 (niv. 1) + 1000 (niv. 2) + 200
+        writes = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('UPDATE "api_userstats"'))
+        self.assertEqual((stats.level, stats.xp), (3, 200))
+
+
+def retry_when_locked(execute, sql, params, many, context):
+    """
+    SQLite en mémoire partagée verrouille la table au lieu d'attendre : on rejoue
+    la requête (sans effet si elle a échoué). Sans objet sur PostgreSQL.
+    """
+    for _ in range(500):
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            time.sleep(0.002)
+    return execute(sql, params, many, context)
+
+
+class ConcurrentXPTests(TransactionTestCase):
+    """Gains d'XP parallèles : aucun n'est perdu."""
+
+    THREADS = 6
+    GRANTS = 20
+    AMOUNT = 37
+
+    def test_parallel_grants(self):
+        user = User.objects.create_user(username='racer', password='pw')
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def grant():
+            try:
+                # Chaque thread a sa connexion et sa propre instance (lue avant les autres écritures)
+                with connection.execute_wrapper(retry_when_locked):
+                    stats = UserStats.objects.get(user_id=user.id)
+                    start.wait()
+                    for _ in range(self.GRANTS):
+                        stats.add_xp(self.AMOUNT)
+            except Exception as exc:  # remonté dans le thread principal
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=grant) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stats = UserStats.objects.get(user_id=user.id)
+        self.assertEqual(cumulative_xp(stats.level, stats.xp), self.THREADS * self.GRANTS * self.AMOUNT)
+        self.assertEqual(stats.level, level_for_cumulative_xp(self.THREADS * self.GRANTS * self.AMOUNT))
+
+
+class UserStatsPersistenceTests(TestCase):
+    """Un User.save() n'écrit UserStats que si les stats ont changé."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='quiet', password='pw', is_onboarded=True)
+        # Streak déjà compté aujourd'hui : la connexion n'a aucune raison de toucher aux stats
+        UserStats.objects.filter(user=self.user).update(last_activity_date=timezone.now().date())
+
+    def _stats_writes(self, ctx):
+        return [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_userstats"')]
+
+    def test_login_does_not_write_stats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('login'), {'username': 'quiet', 'password': 'pw'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._stats_writes(ctx), [])
+
+    def test_user_save_with_loaded_stats(self):
+        user = User.objects.get(id=self.user.id)
+        user.stats  # chargées mais inchangées
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        self.assertEqual(self._stats_writes(ctx), [])
+
+        user.stats.health_score = 77
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        writes = self._stats_writes(ctx)
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn('"xp"', writes[0])
+        self.assertEqual(UserStats.objects.get(user=self.user).health_score, 77)
+
+
+class StreamingExportTests(APITestCase):
+    """Exports CSV en streaming : colonnes, gzip, données limitées au demandeur."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='root', email='root@test.com', password='pw')
+        self.user = User.objects.create_user(username='lifter', email='lifter@test.com', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        bench = make_exercise('Bench', 'chest')
+        for owner in (self.user, other):
+            session = WorkoutSession.objects.create(user=owner)
+            ExerciseSet.objects.create(session=session, exercise=bench, reps=5, weight=70)
+        DailyLog.objects.create(user=self.user, water_liters=2.5)
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_users_export_streams_selected_columns(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('api:user-export'), {'columns': 'username,email'})
+        self.assertTrue(response.streaming)
+        lines = self._content(response).decode().splitlines()
+        self.assertEqual(lines[0], "Nom d'utilisateur,Email")
+        self.assertIn('lifter,lifter@test.com', lines)
+        self.assertEqual(len(lines), 1 + User.objects.count())
+
+    def test_users_export_gzip_and_bad_column(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('api:user-export'), {'gzip': '1'})
+        self.assertIn('users_export.csv.gz', response['Content-Disposition'])
+        csv_text = gzip.decompress(self._content(response)).decode()
+        self.assertTrue(csv_text.startswith('ID,'))
+        response = self.client.get(reverse('api:user-export'), {'columns': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_users_export_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('api:user-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_personal_exports_only_contain_own_rows(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('api:user-export-mine', kwargs={'dataset': 'sets'})
+        lines = self._content(self.client.get(url, {'columns': 'exercise,reps,weight'})).decode().splitlines()
+        self.assertEqual(lines, ['Exercice,Répétitions,Poids (kg)', 'Bench,5,70.0'])
+        url = reverse('api:user-export-mine', kwargs={'dataset': 'sessions'})
+        self.assertEqual(len(self._content(self.client.get(url)).decode().splitlines()), 2)
+        url = reverse('api:user-export-mine', kwargs={'dataset': 'daily_logs'})
+        self.assertIn(',2.5,', self._content(self.client.get(url)).decode())
+
+
+class UserArchiveTests(APITestCase):
+    """Archive zip complète, produite en streaming (NDJSON ou CSV)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@test.com', password='pw')
+        self.other = User.objects.create_user(username='stranger', password='pw')
+        bench = make_exercise('Bench', 'chest')
+        for owner in (self.user, self.other):
+            session = WorkoutSession.objects.create(user=owner)
+            ExerciseSet.objects.create(session=session, exercise=bench, reps=8, weight=50)
+            CustomEvent.objects.create(user=owner, title=f'Yoga {owner.username}')
+        DailyLog.objects.create(user=self.user, mood=7)
+
+    def _read(self, data):
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        return {name: archive.read(name).decode() for name in archive.namelist()}
+
+    def test_archive_streams_in_several_chunks(self):
+        chunks = list(iter_user_archive(self.user.id))
+        self.assertGreater(len(chunks), len(ARCHIVE_DATASETS))
+        files = self._read(b''.join(chunks))
+        self.assertEqual(set(files), {f'{name}.ndjson' for name in ARCHIVE_DATASETS})
+        sets = [json.loads(line) for line in files['sets.ndjson'].splitlines()]
+        self.assertEqual(sets[0]['exercise__name'], 'Bench')
+        self.assertEqual(len(sets), 1)
+        self.assertEqual(json.loads(files['profile.ndjson'])['username'], 'owner')
+        self.assertNotIn('stranger', files['events.ndjson'])
+
+    def test_archive_endpoint_csv(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('api:user-archive'), {'archive_format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('fitwell_owner_', response['Content-Disposition'])
+        files = self._read(b''.join(response.streaming_content))
+        self.assertEqual(files['daily_logs.csv'].splitlines()[0].split(',')[:2], ['id', 'date'])
+        self.assertEqual(len(files['sessions.csv'].splitlines()), 2)
+
+    def test_archive_for_another_user_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('api:user-archive'), {'user': self.other.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        admin = User.objects.create_superuser(username='admin', email='a@test.com', password='pw')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('api:user-archive'), {'user': self.other.id})
+        files = self._read(b''.join(response.streaming_content))
+        self.assertIn('Yoga stranger', files['events.ndjson'])
+        response = self.client.get(reverse('api:user-archive'), {'user': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'owner.zip')
+            call_command('export_user_data', 'owner@test.com', '--format', 'csv', '--output', path,
+                         stdout=StringIO())
+            with open(path, 'rb') as archive:
+                files = self._read(archive.read())
+        self.assertIn('Bench', files['sets.csv'])
+
+
+class WorkoutImportTests(APITestCase):
+    """Import d'historique : validation par lots, bulk_create, mises à jour dérivées."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='migrant', password='pw')
+        self.client.force_authenticate(user=self.user)
+        make_exercise('Bench Press', 'chest')
+        make_exercise('Squat', 'legs')
+        self.start = timezone.now() - timedelta(days=30)
+
+    def _sessions(self, count, sets_per_session=3):
+        return [
+            {
+                'started_at': (self.start + timedelta(days=i)).isoformat(),
+                'duration_minutes': 45,
+                'sets': [{'exercise': 'bench-press', 'reps': 10, 'weight': 50} for _ in range(sets_per_session)],
+            }
+            for i in range(count)
+        ]
+
+    def test_json_import_bulk_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('api:workout-import'), {'sessions': self._sessions(20)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'sessions': 20, 'sets': 60, 'total_volume': 30000.0})
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_exerciseset"')]
+        self.assertEqual(len(inserts), 1)
+
+        session = WorkoutSession.objects.filter(user=self.user).order_by('started_at').first()
+        self.assertEqual((session.status, session.total_volume, session.duration_minutes), ('completed', 1500, 45))
+        self.assertEqual(session.started_at.date(), self.start.date())
+        self.assertEqual(list(session.sets.values_list('set_number', flat=True)), [1, 2, 3])
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.completed_workouts, stats.lifetime_volume), (20, 30000))
+        self.assertEqual(UserWorkoutAggregate.objects.filter(user=self.user, muscle_group='').count(), 20)
+        self.assertEqual(get_personal_records(self.user)[0]['max_weight'], 50)
+
+    def test_sets_numbered_per_exercise(self):
+        sessions = self._sessions(1)
+        sessions[0]['sets'] = [{'exercise': slug, 'reps': 5, 'weight': 80} for slug in ('squat', 'bench-press', 'squat')]
+        sessions[0]['sets'].append({'exercise': 'squat', 'set_number': 9, 'reps': 5, 'weight': 80})
+        self.client.post(reverse('api:workout-import'), sessions, format='json')
+        numbers = ExerciseSet.objects.order_by('id').values_list('exercise__slug', 'set_number')
+        self.assertEqual(list(numbers), [('squat', 1), ('bench-press', 1), ('squat', 2), ('squat', 9)])
+
+    def test_aggregates_updated_for_imported_days_only(self):
+        existing = WorkoutSession.objects.create(user=self.user, started_at=self.start)
+        ExerciseSet.objects.create(session=existing, exercise=Exercise.objects.get(slug='squat'), set_number=1,
+                                   reps=5, weight=100)
+        existing.complete_session()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('api:workout-import'), self._sessions(2), format='json')
+        # Pas de relecture de l'historique (rebuild_aggregates)
+        self.assertFalse(any('FROM "api_exerciseset"' in q['sql'] for q in ctx.captured_queries))
+        day_total = UserWorkoutAggregate.objects.get(user=self.user, date=existing.started_at.date(), muscle_group='')
+        self.assertEqual((day_total.sessions_count, day_total.sets_count, day_total.volume), (2, 4, 2000))
+        self.assertEqual(UserWorkoutAggregate.objects.get(user=self.user, muscle_group='legs').volume, 500)
+
+    def test_csv_import_groups_rows_by_session(self):
+        day = self.start.isoformat()
+        body = (
+            'session,started_at,duration_minutes,exercise,reps,weight\n'
+            f'a,{day},30,squat,5,100\n'
+            f'a,{day},30,squat,5,110\n'
+            f'b,{day},20,bench-press,8,60\n'
+        )
+        response = self.client.post(reverse('api:workout-import'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['sessions'], response.data['sets']), (2, 3))
+        self.assertEqual(sorted(WorkoutSession.objects.values_list('total_volume', flat=True)), [480, 1050])
+
+    def test_invalid_rows_import_nothing(self):
+        sessions = self._sessions(3)
+        sessions[1]['sets'][0]['exercise'] = 'deadlift'
+        sessions[2]['sets'][0]['reps'] = -1
+        response = self.client.post(reverse('api:workout-import'), sessions, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['session'] for error in response.data['errors']], [1, 2])
+        self.assertFalse(WorkoutSession.objects.exists())
+
+    def test_slug_map_is_cached_and_invalidated(self):
+        exercise_slug_map()
+        with self.assertNumQueries(0):
+            exercise_slug_map()
+        make_exercise('Deadlift', 'back', 'advanced')
+        self.assertIn('deadlift', exercise_slug_map())
+
+
+class SessionRunningTotalsTests(APITestCase):
+    """Totaux courants des séances et par exercice, maintenus par UPDATE atomiques."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tally', password='pw')
+        self.bench = make_exercise('Bench', 'chest')
+        self.row = make_exercise('Row', 'back')
+        self.session = WorkoutSession.objects.create(user=self.user)
+
+    def _totals(self):
+        self.session.refresh_from_db()
+        tallies = {t.exercise_id: (t.sets_count, t.volume) for t in self.session.exercise_tallies.all()}
+        return self.session.sets_count, self.session.total_volume, tallies
+
+    def test_add_edit_delete_sets(self):
+        first = ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=10, weight=50)
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=5, weight=80)
+        self.assertEqual(self._totals(), (2, 900, {self.bench.id: (2, 900)}))
+
+        edited = ExerciseSet.objects.get(id=first.id)
+        edited.weight = 60
+        edited.save()
+        self.assertEqual(self._totals(), (2, 1000, {self.bench.id: (2, 1000)}))
+
+        edited.exercise = self.row
+        edited.save()
+        self.assertEqual(self._totals(), (2, 1000, {self.bench.id: (1, 400), self.row.id: (1, 600)}))
+
+        ExerciseSet.objects.get(id=first.id).delete()
+        self.assertEqual(self._totals(), (1, 400, {self.bench.id: (1, 400), self.row.id: (0, 0)}))
+
+    def test_completion_does_not_read_sets(self):
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=10, weight=50)
+        session = WorkoutSession.objects.get(id=self.session.id)
+        with CaptureQueriesContext(connection) as ctx:
+            session.complete_session()
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "api_exerciseset"' in q['sql']
+                          and 'GROUP BY' not in q['sql']])
+        self.assertEqual((session.total_volume, session.sets_count), (500, 1))
+        self.assertEqual(UserStats.objects.get(user=self.user).lifetime_volume, 500)
+
+        # Un set ajouté après coup suit dans le volume cumulé
+        ExerciseSet.objects.create(session=session, exercise=self.bench, reps=1, weight=100)
+        self.assertEqual(UserStats.objects.get(user=self.user).lifetime_volume, 600)
+
+    def test_session_list_does_not_count_sets(self):
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, reps=10, weight=50)
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api:workout-sessions-list'))
+        self.assertEqual(response.data['results'][0]['sets_count'] if 'results' in response.data
+                         else response.data[0]['sets_count'], 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'] and 'api_exerciseset' in q['sql']])
+
+
+class WorkoutSessionListTests(APITestCase):
+    """Liste allégée des séances : nombre de requêtes constant, exercices side-loadés."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='history', password='pw')
+        self.client.force_authenticate(user=self.user)
+        exercises = [
+            make_exercise(f'Move {i}', 'chest')
+            for i in range(3)
+        ]
+        for i in range(25):
+            session = WorkoutSession.objects.create(user=self.user)
+            for exercise in exercises[:1 + i % 3]:
+                ExerciseSet.objects.create(session=session, exercise=exercise, reps=10, weight=40)
+
+    def _list(self, page_size):
+        return self.client.get(reverse('api:workout-sessions-list'), {'page_size': page_size})
+
+    def test_query_count_independent_of_page_size(self):
+        for page_size in (5, 20):
+            # COUNT de pagination, page de séances, totaux par exercice, exercices side-loadés
+            with self.assertNumQueries(4):
+                response = self._list(page_size)
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_lean_payload_with_side_loaded_exercises(self):
+        data = self._list(10).data
+        session = data['results'][0]
+        self.assertNotIn('sets', session)
+        self.assertEqual(session['sets_count'], len(session['exercise_ids']))
+        self.assertEqual(len(data['exercises']), 3)
+        self.assertEqual(data['exercises'][session['exercise_ids'][0]]['muscle_group'], 'chest')
+
+    def test_detail_keeps_full_nesting(self):
+        session = WorkoutSession.objects.filter(user=self.user).first()
+        response = self.client.get(reverse('api:workout-sessions-detail', args=[session.id]))
+        self.assertEqual(response.data['sets'][0]['exercise_details']['name'], 'Move 0')
+        self.assertEqual(response.data['user_username'], 'history')
+
+
+class WorkoutStatsTests(APITestCase):
+    """Statistiques d'entraînement agrégées en base (totaux, dernières séances, séries par période)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats', password='pw')
+        base = timezone.make_aware(datetime(2025, 3, 3, 12, 0))  # Un lundi
+        for i, (volume, duration) in enumerate([(1000, 30), (2000, 60), (3000, 90), (500, 20)]):
+            WorkoutSession.objects.create(user=self.user, started_at=base + timedelta(days=3 * i), status='completed',
+                                          total_volume=volume, duration_minutes=duration)
+        WorkoutSession.objects.create(user=self.user, total_volume=999)  # Active : ignorée
+
+    def test_totals_and_recent_in_two_queries(self):
+        with self.assertNumQueries(2):
+            stats = get_workout_stats(self.user.id, recent=3)
+        self.assertEqual(stats['total_sessions'], 4)
+        self.assertEqual(stats['total_volume_kg'], 6500)
+        self.assertEqual(stats['average_duration'], 50)
+        self.assertEqual(stats['recent']['volume'], [2000, 3000, 500])
+
+    def test_grouped_by_week_with_range(self):
+        stats = get_workout_stats(self.user.id, start=date(2025, 3, 4), group='week')
+        self.assertEqual(stats['total_sessions'], 3)
+        self.assertEqual([(row['period'], row['sessions'], row['volume']) for row in stats['series']],
+                         [(date(2025, 3, 3), 2, 5000), (date(2025, 3, 10), 1, 500)])
+
+    def test_stats_endpoint_params(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('api:workout-sessions-stats')
+        response = self.client.get(url, {'group': 'month', 'end': '2025-03-08'})
+        self.assertEqual(response.data['total_volume_kg'], 3000)
+        self.assertEqual(response.data['series'][0]['sessions'], 2)
+        self.assertEqual(self.client.get(url, {'group': 'year'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'start': '03/2025'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WorkoutSeriesTests(APITestCase):
+    """Séries par période (TruncWeek / TruncMonth) sur les sets, en cache jusqu'au prochain set."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='series', password='pw')
+        self.bench = make_exercise('Bench', 'chest')
+        self.squat = make_exercise('Squat', 'legs')
+        base = timezone.make_aware(datetime(2025, 3, 3, 12, 0))  # Un lundi
+        for day, exercise, weight in [(0, self.bench, 50), (2, self.squat, 100), (7, self.bench, 60)]:
+            session = WorkoutSession.objects.create(user=self.user, started_at=base + timedelta(days=day),
+                                                    status='completed')
+            ExerciseSet.objects.create(session=session, exercise=exercise, reps=10, weight=weight)
+        active = WorkoutSession.objects.create(user=self.user)  # Active : ignorée
+        ExerciseSet.objects.create(session=active, exercise=self.bench, reps=10, weight=500)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:workout-series')
+
+    def test_weekly_volume_by_muscle_group(self):
+        series = get_series(self.user.id, bucket='week', metric='volume', group_by='muscle_group')
+        self.assertEqual([(row['period'], row['group'], row['value']) for row in series], [
+            (date(2025, 3, 3), 'chest', 500), (date(2025, 3, 3), 'legs', 1000), (date(2025, 3, 10), 'chest', 600),
+        ])
+        monthly = get_series(self.user.id, bucket='month', metric='frequency')
+        self.assertEqual([(row['period'], row['value']) for row in monthly], [(date(2025, 3, 1), 3)])
+
+    def test_repeat_read_is_cached_until_next_set(self):
+        params = {'bucket': 'week', 'metric': 'sets'}
+        first = self.client.get(self.url, params)
+        with self.assertNumQueries(0):
+            cached = get_series(self.user.id, bucket='week', metric='sets')
+        self.assertEqual(cached, first.data['series'])
+
+        session = WorkoutSession.objects.filter(user=self.user, status='completed').last()
+        ExerciseSet.objects.create(session=session, exercise=self.squat, reps=5, weight=80)
+        refreshed = self.client.get(self.url, params).data['series']
+        self.assertEqual(sum(row['value'] for row in refreshed), 4)
+
+    def test_delete_invalidates(self):
+        get_series(self.user.id, metric='reps')
+        ExerciseSet.objects.filter(exercise=self.squat).delete()
+        self.assertEqual(sum(row['value'] for row in get_series(self.user.id, metric='reps')), 20)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'bucket': 'year'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'group_by': 'user'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'end': 'hier'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SeedLoadTests(TestCase):
+    """Jeu de données synthétique (seed_load) : cohérent et reproductible."""
+
+    def setUp(self):
+        make_exercise('Squat', 'legs')
+        make_exercise('Row', 'back')
+
+    def _seed(self, *args):
+        call_command('seed_load', '--scale', '0.0002', '--days', '30', *args, stdout=StringIO())
+
+    def _snapshot(self):
+        return list(ExerciseSet.objects.order_by('session__user__username', 'session__started_at', 'id')
+                    .values_list('session__user__username', 'reps', 'weight'))
+
+    def test_seed_is_consistent(self):
+        self._seed()
+        users = User.objects.filter(username__startswith='load_')
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(UserStats.objects.filter(user__in=users).count(), 20)
+        self.assertTrue(ExerciseSet.objects.exists())
+        self.assertTrue(DailyLog.objects.filter(user__in=users).exists())
+        self.assertTrue(Comment.objects.filter(article__slug__startswith='load-').exists())
+        # Dates historiques conservées malgré auto_now_add
+        self.assertLess(DailyLog.objects.order_by('date').first().date, timezone.localdate())
+        # Compteurs, totaux par séance et agrégats alignés sur les lignes créées
+        self.assertEqual(reconcile_counters(dry_run=True), [])
+        for session in WorkoutSession.objects.filter(user__in=users)[:20]:
+            self.assertEqual(session.sets_count, session.sets.count())
+            self.assertEqual(sum(t.sets_count for t in session.exercise_tallies.all()), session.sets_count)
+        self.assertTrue(UserWorkoutAggregate.objects.filter(user__in=users).exists())
+
+    def test_volumes_follow_scale(self):
+        self._seed()
+        # Échelle 0.0002 : 20 utilisateurs et ≈2000 sets (10M × 0.0002), soit ≈10 séances par utilisateur
+        self.assertAlmostEqual(ExerciseSet.objects.count(), 2000, delta=800)
+        self.assertAlmostEqual(WorkoutSession.objects.count() / 20, 10, delta=4)
+
+    def test_same_seed_same_data(self):
+        self._seed()
+        first = self._snapshot()
+        # "_" n'est pas un joker : un compte "loadX…" n'est pas une donnée de seed_load
+        bystander = User.objects.create_user(username='loadXuser', password='pw')
+        WorkoutSession.objects.create(user=bystander)
+        self._seed('--flush')
+        self.assertEqual(self._snapshot(), first)
+        self.assertEqual(User.objects.filter(username__startswith='load_').count(), 20)
+        self.assertTrue(WorkoutSession.objects.filter(user=bystander).exists())
+
+    def test_refuses_to_seed_twice(self):
+        self._seed()
+        with self.assertRaises(CommandError):
+            self._seed()
+
+
+@override_settings(QUERY_BUDGETS_STRICT=False)  # Les budgets ont leurs propres tests (web)
+class BenchmarkTests(TestCase):
+    """Harnais de benchmark : mesure, référence et détection des régressions."""
+
+    def setUp(self):
+        make_exercise('Squat', 'legs')
+        call_command('seed_load', '--scale', '0.0002', '--days', '30', stdout=StringIO())
+        self.baseline = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+
+    def _bench(self, *args):
+        out = StringIO()
+        call_command('benchmark', '--requests', '2', '--warmup', '0', '--only', 'dashboard', '--only', 'api_stats',
+                     '--baseline', self.baseline, *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 95)), (50, 95))
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_baseline_roundtrip_and_query_regression(self):
+        self.assertIn('Référence mise à jour', self._bench('--update-baseline'))
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        self.assertEqual(set(baseline['endpoints']), {'dashboard', 'api_stats'})
+        self.assertIsNotNone(baseline['endpoints']['dashboard']['queries'])
+
+        # Latence large : seule une requête SQL de plus doit faire échouer
+        for result in baseline['endpoints'].values():
+            result['p50_ms'] = result['p95_ms'] = 10_000
+        baseline['peak_rss_mb'] = 100_000
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f)
+        self.assertIn('dans la référence', self._bench())
+
+        baseline['endpoints']['dashboard']['queries'] = 0
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f)
+        with self.assertRaises(CommandError):
+            self._bench()
+
+    def test_server_error_is_reported_per_target(self):
+        with mock.patch('api.views.workout.get_workout_stats', side_effect=RuntimeError('boom')), \
+                self.assertLogs('django.request', 'ERROR'):
+            with self.assertRaisesMessage(CommandError, '1 cible(s) en erreur'):
+                self._bench('--update-baseline')
+        self.assertFalse(os.path.exists(self.baseline))
+
+    def test_admin_account_is_temporary(self):
+        out = StringIO()
+        call_command('benchmark', '--requests', '1', '--warmup', '0', '--only', 'admin_panel',
+                     '--baseline', self.baseline, stdout=out)
+        self.assertIn('admin_panel', out.getvalue())
+        self.assertFalse(User.objects.filter(username='bench_admin').exists())
+
+    def test_other_dataset_compares_queries_only(self):
+        self._bench('--update-baseline')
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        for result in baseline['endpoints'].values():
+            result['p50_ms'] = result['p95_ms'] = 0
+        baseline['dataset']['users'] += 1
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f)
+        self.assertIn('seules les requêtes SQL', self._bench())
+
+
+class ConsistencyScoreTests(TestCase):
+    """Score de régularité : calculé en SQL, stocké par les écritures seulement."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='regular', password='pw', is_onboarded=True)
+        self.exercise = make_exercise('Row', 'back')
+        self.today = timezone.now().date()
+
+    def _log(self, days_ago):
+        log = DailyLog.objects.create(user=self.user, mood=7)
+        DailyLog.objects.filter(id=log.id).update(date=self.today - timedelta(days=days_ago))
+
+    def _stored(self):
+        return UserStats.objects.get(user=self.user).consistency_score
+
+    def test_union_counts_distinct_days_in_one_query(self):
+        self._log(3)
+        self._log(0)
+        session = WorkoutSession.objects.create(user=self.user)
+        ExerciseSet.objects.create(session=session, exercise=self.exercise, reps=10, weight=20)
+        session.complete_session()  # Aujourd'hui : déjà compté par le journal
+        with self.assertNumQueries(1):
+            self.assertEqual(get_consistency_score(self.user.id), int(2 / 30 * 100))
+
+    def test_write_paths_store_score(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))  # Journal vide créé par le GET : rien n'est stocké
+        self.assertEqual(self._stored(), 0)
+        self.client.post(reverse('dashboard'), {'water_liters': 2, 'sleep_hours': 7, 'mood': 6})
+        self.assertEqual(self._stored(), int(1 / 30 * 100))
+        UserStats.objects.filter(user=self.user).update(consistency_score=0)
+        session = WorkoutSession.objects.create(user=self.user)
+        session.complete_session()
+        self.assertEqual(self._stored(), int(1 / 30 * 100))
+
+    def test_analytics_does_not_write(self):
+        self._log(1)
+        UserStats.objects.filter(user=self.user).update(consistency_score=0)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('analytics'))
+        self.assertEqual(response.context['consistency_score'], int(1 / 30 * 100))
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_userstats"')])
+
+    def test_refresh_command_slides_window(self):
+        self._log(0)
+        UserStats.objects.filter(user=self.user).update(consistency_score=3)
+        DailyLog.objects.filter(user=self.user).update(date=self.today - timedelta(days=40))
+        out = StringIO()
+        call_command('refresh_consistency_scores', stdout=out)
+        self.assertIn('1 scores', out.getvalue())
+        self.assertEqual(self._stored(), 0)
@@ -6,7 +6,8 @@ from rest_framework_simplejwt.views import (
 )
 from .views import (ArticleViewSet, CommentViewSet, CategoryViewSet, UserViewSet,
                     WellnessPlanViewSet, EmailTokenObtainPairView, WorkoutSessionViewSet,
-                    ExerciseSetViewSet, ExerciseViewSet, TagViewSet, RecipeViewSet)
+                    ExerciseSetViewSet, ExerciseViewSet, TagViewSet, RecipeViewSet,
+                    WorkoutImportView, WorkoutSeriesView)
 
 app_name = 'api'
 
@@ -23,6 +24,8 @@ router.register(r'exercises', ExerciseViewSet, basename='exercises')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
+    path('workouts/import/', WorkoutImportView.as_view(), name='workout-import'),
+    path('workouts/series/', WorkoutSeriesView.as_view(), name='workout-series'),
     path('', include(router.urls)),
     path('register/', UserViewSet.as_view({'post': 'register'}), name='register'),
     path('token/', EmailTokenObtainPairView.as_view(), name='token_obtain_pair'),
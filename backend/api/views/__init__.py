@@ -2,4 +2,4 @@ from .auth import EmailTokenObtainPairView
 from .users import UserViewSet
 from .wellness import WellnessPlanViewSet
 from .content import CategoryViewSet, ArticleViewSet, CommentViewSet, TagViewSet, RecipeViewSet
-from .workout import WorkoutSessionViewSet, ExerciseSetViewSet, ExerciseViewSet
+from .workout import WorkoutSessionViewSet, ExerciseSetViewSet, ExerciseViewSet, WorkoutImportView, WorkoutSeriesView
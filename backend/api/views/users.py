@@ -1,10 +1,11 @@
-import csv
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from api.models import User
 from api.serializers import UserSerializer
+from api.services.archive import ARCHIVE_FORMATS, archive_filename, iter_user_archive
+from api.services.export import select_columns, streaming_csv_response
 
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -53,17 +54,48 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def export(self, request):
         """
-        Export des utilisateurs en CSV (Admin seulement).
-        URL: /api/users/export/
+        Export des utilisateurs en CSV, envoyé en streaming (Admin seulement).
+        URL: /api/users/export/?columns=id,email&gzip=1
         """
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
+        return self._csv_export(request, 'users', 'users_export.csv')
 
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Nom d\'utilisateur', 'Email', 'Staff', 'Date d\'inscription'])
-
-        users = User.objects.all().values_list('id', 'username', 'email', 'is_staff', 'date_joined')
-        for user in users:
-            writer.writerow(user)
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+            url_path=r'me/export/(?P<dataset>sessions|sets|daily_logs)')
+    def export_mine(self, request, dataset=None):
+        """
+        Export CSV de ses propres données : séances, sets ou journal quotidien.
+        URL: /api/users/me/export/<sessions|sets|daily_logs>/
+        """
+        return self._csv_export(request, dataset, f'{dataset}_export.csv', user_id=request.user.id)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated], url_path='me/archive')
+    def archive(self, request):
+        """
+        Archive zip de toutes ses données (NDJSON ou CSV), envoyée en streaming.
+        Un admin peut exporter pour un autre utilisateur avec ?user=<id>.
+        URL: /api/users/me/archive/?archive_format=csv
+        """
+        user = request.user
+        user_id = request.query_params.get('user')
+        if user_id:
+            if not user.is_staff:
+                return Response({'error': 'Réservé aux administrateurs.'}, status=status.HTTP_403_FORBIDDEN)
+            if not user_id.isdigit():
+                return Response({'error': f"Identifiant invalide : {user_id}"}, status=status.HTTP_400_BAD_REQUEST)
+            user = User.objects.filter(pk=int(user_id)).first()
+            if user is None:
+                return Response({'error': 'Utilisateur introuvable.'}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('archive_format', 'ndjson')
+        if fmt not in ARCHIVE_FORMATS:
+            return Response({'error': f"Format inconnu : {fmt}"}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(iter_user_archive(user.id, fmt=fmt), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{archive_filename(user, fmt)}"'
         return response
+
+    def _csv_export(self, request, dataset, filename, user_id=None):
+        try:
+            columns = select_columns(dataset, request.query_params.get('columns'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+        return streaming_csv_response(dataset, filename, user_id=user_id, columns=columns, gzip=gzip)
@@ -49,6 +49,8 @@ class WellnessPlanViewSet(viewsets.ModelViewSet):
                 stats.lifestyle_score = breakdown.get('lifestyle', 0)
                 stats.consistency_score = breakdown.get('consistency', 0)
             
+            stats.save()
+
             # Gamification: +100 XP
             stats.add_xp(100)
 
@@ -1,16 +1,36 @@
+import json
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import BaseParser, FormParser, JSONParser, MultiPartParser
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from api.models import WorkoutSession, ExerciseSet, Exercise
-from api.serializers import (WorkoutSessionSerializer, WorkoutSessionCreateSerializer, 
-                            ExerciseSetSerializer, ExerciseSetCreateSerializer, ExerciseSerializer)
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_date
+from api.models import WorkoutSession, ExerciseSet, Exercise, SessionExerciseTally
+from api.services.records import get_personal_records
+from api.services.series import get_series
+from api.services.workout_stats import RECENT_SESSIONS, get_workout_stats
+from api.services.sets import MAX_SETS_PER_BATCH, log_sets, set_payload
+from api.services.workout_import import MAX_IMPORT_SESSIONS, import_workout_history, parse_csv, validate_sessions
+from api.serializers import (WorkoutSessionSerializer, WorkoutSessionListSerializer, WorkoutSessionCreateSerializer,
+                            ExerciseSetSerializer, ExerciseSetCreateSerializer, ExerciseSerializer,
+                            ExerciseSetBatchSerializer)
+
+def _date_param(value):
+    """Date optionnelle au format AAAA-MM-JJ (ValueError si invalide)."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Date invalide : {value} (format AAAA-MM-JJ)")
+    return parsed
 
 class WorkoutSessionViewSet(viewsets.ModelViewSet):
     """
     API pour gérer les séances d'entraînement.
     - POST: Démarrer une nouvelle session
-    - GET: Récupérer l'historique des sessions
+    - GET: Récupérer l'historique des sessions (liste allégée + exercices side-loadés)
     - PATCH: Mettre à jour une session (notes)
     - DELETE: Supprimer une session
     - Custom actions: complete_session, add_set
@@ -20,10 +40,35 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return WorkoutSessionCreateSerializer
+        if self.action == 'list':
+            return WorkoutSessionListSerializer
         return WorkoutSessionSerializer
     
     def get_queryset(self):
-        return WorkoutSession.objects.filter(user=self.request.user).prefetch_related('sets__exercise').order_by('-started_at')
+        sessions = WorkoutSession.objects.filter(user=self.request.user).order_by('-started_at')
+        if self.action == 'list':
+            # Liste : totaux dénormalisés + ids des exercices, sans toucher aux sets
+            tallies = SessionExerciseTally.objects.filter(sets_count__gt=0).only('id', 'session_id', 'exercise_id')
+            return sessions.prefetch_related(Prefetch('exercise_tallies', queryset=tallies.order_by('id')))
+        return sessions.select_related('user').prefetch_related('sets__exercise')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Page de séances en représentation allégée. Les exercices référencés
+        sont renvoyés une seule fois dans "exercises" (clé : id).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        sessions = page if page is not None else list(queryset)
+        data = self.get_serializer(sessions, many=True).data
+        exercise_ids = {exercise_id for session in data for exercise_id in session['exercise_ids']}
+        exercises = {
+            exercise['id']: exercise
+            for exercise in Exercise.objects.filter(id__in=exercise_ids).values('id', 'name', 'slug', 'muscle_group')
+        } if exercise_ids else {}
+        response = self.get_paginated_response(data) if page is not None else Response({'results': data})
+        response.data['exercises'] = exercises
+        return response
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -64,6 +109,30 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['post'])
+    def add_sets(self, request, pk=None):
+        """
+        Ajouter plusieurs sets d'un coup à une session active (file hors ligne).
+        Corps : {"sets": [{"exercise_id", "reps", "weight", "rest_seconds", "notes"}, ...]}
+        """
+        session = self.get_object()
+
+        if session.status != 'active':
+            return Response({'error': 'La session n\'est pas active'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = request.data.get('sets') if isinstance(request.data, dict) else request.data
+        serializer = ExerciseSetBatchSerializer(data=data, many=True, allow_empty=False, max_length=MAX_SETS_PER_BATCH)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            created, total_sets = log_sets(session, serializer.validated_data)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'sets': [set_payload(exercise_set) for exercise_set in created],
+            'total_sets': total_sets,
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def active(self, request):
         """
@@ -83,19 +152,117 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
     def stats(self, request):
         """
         Statistiques globales des entraînements de l'utilisateur.
+        URL: /api/workouts/sessions/stats/?start=2025-01-01&end=2025-03-31&group=week&last=10
         """
-        sessions = WorkoutSession.objects.filter(user=request.user, status='completed')
-        
-        total_sessions = sessions.count()
-        total_volume = sum(s.total_volume for s in sessions)
-        total_duration = sum(s.duration_minutes for s in sessions)
-        
+        params = request.query_params
+        last = params.get('last', '')
+        try:
+            stats = get_workout_stats(
+                request.user.id,
+                start=_date_param(params.get('start')),
+                end=_date_param(params.get('end')),
+                group=params.get('group'),
+                recent=min(int(last), 100) if last.isdigit() else RECENT_SESSIONS,
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats)
+
+    @action(detail=False, methods=['get'])
+    def records(self, request):
+        """
+        Records personnels par exercice (max, volume max, 1RM estimé, rep-max).
+        limit : entier de 1 à 100 (plafonné) ; absent = tous les records.
+        URL: /api/workouts/sessions/records/?limit=6
+        """
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return Response({'error': f"limit doit être un entier positif : {limit}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            limit = min(int(limit), 100)
+        return Response(get_personal_records(request.user, limit=limit))
+
+class CSVTextParser(BaseParser):
+    """Corps text/csv brut, transmis tel quel (str) à la vue."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read().decode('utf-8-sig')
+
+
+class WorkoutImportView(APIView):
+    """
+    Import en masse d'un historique d'entraînement (séances terminées + sets).
+    - JSON : {"sessions": [{"started_at", "completed_at", "duration_minutes", "notes",
+      "sets": [{"exercise": "<slug>", "reps", "weight", ...}]}]}
+    - CSV (corps text/csv ou fichier "file") : une ligne par set, colonnes
+      session, started_at, completed_at, duration_minutes, session_notes, exercise,
+      set_number, reps, weight, rest_seconds, notes.
+    URL: /api/workouts/import/
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, CSVTextParser, MultiPartParser, FormParser]
+
+    def _payload(self, request):
+        data = request.data
+        upload = request.FILES.get('file')
+        if upload is not None:
+            content = upload.read().decode('utf-8-sig')
+            if not upload.name.endswith('.json'):
+                return parse_csv(content)
+            data = json.loads(content)
+        elif isinstance(data, str):
+            return parse_csv(data)
+        return data.get('sessions') if isinstance(data, dict) else data
+
+    def post(self, request):
+        try:
+            payload = self._payload(request)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(payload, list) or not payload:
+            return Response({'error': 'Aucune séance à importer'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(payload) > MAX_IMPORT_SESSIONS:
+            return Response({'error': f'Maximum {MAX_IMPORT_SESSIONS} séances par import'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        sessions, errors = validate_sessions(payload)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        summary = import_workout_history(request.user, sessions)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+class WorkoutSeriesView(APIView):
+    """
+    Série temporelle des séances terminées, par période et éventuellement par groupe.
+    - bucket : day, week (défaut), month
+    - metric : volume (défaut), sets, reps, frequency (séances distinctes)
+    - group_by : muscle_group, exercise (slug) ; absent = total
+    - start / end : dates AAAA-MM-JJ incluses
+    En cache jusqu'au prochain set enregistré.
+    URL: /api/workouts/series/?bucket=week&metric=volume&group_by=muscle_group
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            series = get_series(
+                request.user.id,
+                bucket=params.get('bucket', 'week'),
+                metric=params.get('metric', 'volume'),
+                group_by=params.get('group_by') or None,
+                start=_date_param(params.get('start')),
+                end=_date_param(params.get('end')),
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
-            'total_sessions': total_sessions,
-            'total_volume_kg': round(total_volume, 2),
-            'total_duration_minutes': total_duration,
-            'average_duration': round(total_duration / total_sessions, 2) if total_sessions > 0 else 0,
-            'average_volume': round(total_volume / total_sessions, 2) if total_sessions > 0 else 0,
+            'bucket': params.get('bucket', 'week'),
+            'metric': params.get('metric', 'volume'),
+            'group_by': params.get('group_by') or None,
+            'series': series,
         })
 
 class ExerciseSetViewSet(viewsets.ModelViewSet):
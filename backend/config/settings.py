@@ -139,6 +139,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'web.middleware.RequestMetricsMiddleware',  # En tête : compte toutes les requêtes SQL
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -148,6 +149,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'web.middleware.OnboardingMiddleware',
+    'web.middleware.StreakMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -156,7 +158,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + chronométrage des rendus (Server-Timing, web.metrics)
+        'BACKEND': 'web.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -222,6 +225,11 @@ else:
         }
     }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Index couvrants (INCLUDE) : appliqués sur PostgreSQL, simples index de clés sur SQLite.
+    # W040 ne fait que le rappeler à chaque commande, y compris avec DATABASE_URL=sqlite://.
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 # -----------------------------------------------------------------------------
 # MOTS DE PASSE & SÉCURITÉ
 # -----------------------------------------------------------------------------
@@ -275,13 +283,18 @@ AUTH_USER_MODEL = 'api.User'
 # -----------------------------------------------------------------------------
 # CACHE CONFIGURATION (Performance Optimization)
 # -----------------------------------------------------------------------------
+# Backend réel : CACHE_BACKEND / CACHE_LOCATION. LocMem par défaut, propre à chaque
+# processus ; un cache partagé (Memcached, Redis, DatabaseCache) fait partager
+# aux workers les classements (api.services.ranking) et les catalogues.
+# Enveloppé par web.metrics.InstrumentedCache pour compter hits / misses par requête.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'fitwell-cache',
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
-        }
+        'BACKEND': 'web.metrics.InstrumentedCache',
+        'WRAPS': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='fitwell-cache'),
+        # MAX_ENTRIES n'a de sens que pour LocMem / fichiers / base (les clients Memcached / Redis le refusent)
+        'OPTIONS': {} if 'memcached' in CACHE_BACKEND or 'redis' in CACHE_BACKEND else {'MAX_ENTRIES': 10000},
     }
 }
 
@@ -289,6 +302,29 @@ CACHES = {
 CACHE_MIDDLEWARE_SECONDS = 300  # 5 minutes
 CACHE_MIDDLEWARE_KEY_PREFIX = 'fitwell'
 
+# -----------------------------------------------------------------------------
+# BUDGETS DE REQUÊTES SQL (web.middleware.RequestMetricsMiddleware)
+# -----------------------------------------------------------------------------
+# Nombre maximal de requêtes par nom d'URL, session et authentification comprises.
+# Dépassement : avertissement dans les logs ; avec QUERY_BUDGETS_STRICT (activé par le
+# lanceur de tests config.test_runner), QueryBudgetExceeded fait échouer la requête.
+QUERY_BUDGETS = {
+    'home': 6,
+    'dashboard': 14,
+    'analytics': 12,
+    'leaderboard': 10,  # Cache froid sans snapshot : top N et COUNT indexé par métrique, stats
+    'admin_panel': 12,  # Stats froides : un COUNT indexé par indicateur (cache 60 s)
+    'workout_history': 8,
+    'workout_session': 10,
+    'blog_list': 8,
+    'article_detail': 12,
+    'planner': 8,
+    'custom_planner': 8,
+    'profile': 8,
+}
+QUERY_BUDGETS_STRICT = config('QUERY_BUDGETS_STRICT', default=False, cast=bool)
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
 # -----------------------------------------------------------------------------
 # REDIRECTIONS & URLs
 # -----------------------------------------------------------------------------
@@ -0,0 +1,18 @@
+"""
+Lanceur de tests du projet (settings.TEST_RUNNER).
+
+En plus du DiscoverRunner standard :
+- les budgets de requêtes SQL sont stricts : un dépassement fait échouer le test ;
+- la ligne request_metrics (INFO, une par requête) n'est pas affichée.
+"""
+import logging
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGETS_STRICT = True
+        logging.getLogger('api.metrics').setLevel(logging.WARNING)
@@ -0,0 +1,140 @@
+"""
+Instrumentation par requête : nombre de requêtes SQL, temps passé en base,
+hits / misses du cache et temps de rendu des templates.
+
+Les compteurs de la requête en cours vivent dans un ContextVar, alimenté par :
+- un execute_wrapper posé sur chaque connexion (RequestMetricsMiddleware) ;
+- InstrumentedCache, qui enveloppe le backend de cache configuré (settings.CACHES) ;
+- le moteur de templates TimedDjangoTemplates (settings.TEMPLATES).
+Hors requête (commandes, tâches), rien n'est compté.
+"""
+import time
+from contextvars import ContextVar
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.module_loading import import_string
+
+_current = ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Compteurs d'une requête HTTP (durées en millisecondes)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_ms = 0.0
+        self._rendering = 0  # Profondeur des rendus imbriqués (render_to_string dans un template)
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper : compte et chronomètre chaque requête SQL."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_ms': round(self.template_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+        }
+
+    def server_timing(self):
+        """Valeur de l'en-tête Server-Timing."""
+        return ', '.join([
+            f'db;dur={self.db_ms:.2f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'tpl;dur={self.template_ms:.2f}',
+            f'total;dur={self.total_ms:.2f}',
+        ])
+
+
+def start_metrics(metrics=None):
+    """
+    Ouvre (ou rouvre, pour la suite d'une réponse en streaming) les compteurs de
+    la requête en cours. Retourne (metrics, jeton pour stop_metrics).
+    """
+    metrics = metrics or RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop_metrics(token):
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def _count_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class InstrumentedCache:
+    """
+    Enveloppe le backend déclaré sous la clé WRAPS de settings.CACHES (LocMem,
+    Memcached, Redis, base...) et compte hits et misses pour la requête en cours.
+    Seuls get et get_many sont interceptés ; le reste est délégué tel quel.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        self._backend = import_string(params.pop('WRAPS'))(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def __contains__(self, key):
+        return self._backend.has_key(key)
+
+    def get(self, key, default=None, version=None):
+        value = self._backend.get(key, _MISSING, version)
+        _count_cache(value is not _MISSING, value is _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._backend.get_many(keys, version)
+        _count_cache(len(values), len(keys) - len(values))
+        return values
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics._rendering += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._rendering -= 1
+            if not metrics._rendering:
+                metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Moteur Django standard dont les rendus sont chronométrés (RequestMetrics.template_ms)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -1,5 +1,14 @@
+import json
+import logging
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
 from django.shortcuts import redirect
 from django.urls import resolve, Resolver404
+from api.services.gamification import touch_streak
+from web.metrics import start_metrics, stop_metrics
+
+logger = logging.getLogger('api.metrics')
 
 class OnboardingMiddleware:
     """
@@ -63,3 +72,101 @@ class OnboardingMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class StreakMiddleware:
+    """
+    Met à jour le streak quand un utilisateur connecté ouvre une page "active"
+    (dashboard, planner, blog...). Une fois par jour : ensuite, aucune requête.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        # Noms d'URL qui comptent comme une activité du jour
+        self.tracked_url_names = [
+            'dashboard',
+            'planner',
+            'custom_planner',
+            'tools',
+            'profile',
+            'blog_list',
+            'article_detail',
+            'like_article',
+        ]
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.url_name in self.tracked_url_names and request.user.is_authenticated:
+            touch_streak(request.user)
+        return None
+
+
+class QueryBudgetExceeded(Exception):
+    """Une vue a dépassé son budget de requêtes SQL (settings.QUERY_BUDGETS)."""
+
+
+class RequestMetricsMiddleware:
+    """
+    Mesure chaque requête (web.metrics) : requêtes SQL, temps base, cache, rendu.
+    - Ligne de log structurée sur le logger "api.metrics" ;
+    - En-tête Server-Timing en DEBUG ou pour le staff ;
+    - Budget par nom d'URL (settings.QUERY_BUDGETS) : avertissement, ou
+      QueryBudgetExceeded si QUERY_BUDGETS_STRICT (activé par le lanceur de tests).
+    Une réponse en streaming (exports) est mesurée jusqu'à son dernier morceau :
+    ses requêtes s'exécutent pendant l'itération, après la vue. Elle n'a pas
+    d'en-tête Server-Timing, envoyé avant que les compteurs soient connus.
+    À placer en tête de MIDDLEWARE pour compter aussi session et authentification.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with self._measuring() as metrics:
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self._metered(response.streaming_content, metrics, request, response)
+            return response
+
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = metrics.server_timing()
+        self._report(request, response, metrics)
+        return response
+
+    @contextmanager
+    def _measuring(self, metrics=None):
+        metrics, token = start_metrics(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                yield metrics
+        finally:
+            stop_metrics(token)
+
+    def _metered(self, content, metrics, request, response):
+        """Itère la réponse en streaming en comptant les requêtes de chaque morceau."""
+        chunks = iter(content)
+        while True:
+            with self._measuring(metrics):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+        self._report(request, response, metrics)
+
+    def _report(self, request, response, metrics):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        payload = {'method': request.method, 'path': request.path, 'url_name': url_name,
+                   'status': response.status_code, **metrics.as_dict()}
+        logger.info('request_metrics %s', json.dumps(payload), extra={'metrics': payload})
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+        if budget is not None and metrics.queries > budget:
+            message = f'{url_name} : {metrics.queries} requêtes SQL (budget {budget})'
+            if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning('query_budget_exceeded %s', message)
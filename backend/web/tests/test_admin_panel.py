@@ -0,0 +1,154 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from api.models import User, UserSession
+
+
+class AdminPanelSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='password',
+                                                   is_onboarded=True)
+        self.members = [
+            User.objects.create_user(username=f'member{i}', password='password', is_onboarded=True)
+            for i in range(3)
+        ]
+
+    def _login(self, user):
+        client = Client()
+        client.login(username=user.username, password='password')
+        return client
+
+    def test_login_and_logout_maintain_index(self):
+        client = self._login(self.members[0])
+        session = UserSession.objects.get(user=self.members[0])
+        self.assertEqual(session.session_key, client.session.session_key)
+        client.logout()
+        self.assertFalse(UserSession.objects.filter(user=self.members[0]).exists())
+
+    def test_online_status_from_index(self):
+        self._login(self.members[0])
+        self._login(self.members[0])
+        self._login(self.members[1])
+        admin_client = self._login(self.admin)
+
+        response = admin_client.get(reverse('admin_panel'))
+        self.assertEqual(response.status_code, 200)
+        users = {u.username: u for u in response.context['users']}
+        self.assertEqual(users['member0'].active_sessions, 2)
+        self.assertTrue(users['member1'].is_online)
+        self.assertFalse(users['member2'].is_online)
+        self.assertEqual(response.context['stats']['online_now'], 3)
+
+    def test_purge_expired_sessions(self):
+        self._login(self.members[0])
+        Session.objects.update(expire_date=timezone.now() - timedelta(minutes=1))
+        out = StringIO()
+        call_command('sync_user_sessions', stdout=out)
+        self.assertFalse(UserSession.objects.exists())
+        self.assertIn('1 sessions expirées', out.getvalue())
+
+    def test_expiry_read_from_session(self):
+        self._login(self.members[0])
+        admin_client = self._login(self.admin)
+        # La session est prolongée ou écourtée dans django_session seulement
+        Session.objects.exclude(session_key=admin_client.session.session_key).update(
+            expire_date=timezone.now() - timedelta(minutes=1))
+        cache.clear()
+        response = admin_client.get(reverse('admin_panel'))
+        users = {u.username: u for u in response.context['users']}
+        self.assertFalse(users['member0'].is_online)
+        self.assertEqual(response.context['stats']['online_now'], 1)
+
+    def test_login_rotation_leaves_no_orphan(self):
+        client = self._login(self.members[0])
+        old_key = client.session.session_key
+        # Autre compte sur le même navigateur : login() vide la session et change la clé
+        client.post(reverse('login'), {'username': 'member1', 'password': 'password'})
+        new_key = client.session.session_key
+        self.assertNotEqual(new_key, old_key)
+        self.assertEqual(list(UserSession.objects.values_list('user__username', 'session_key')),
+                         [('member1', new_key)])
+
+    def test_password_change_follows_new_key(self):
+        client = self._login(self.members[0])
+        old_key = client.session.session_key
+        UserSession.objects.update(ip='10.0.0.7')
+        response = client.post(reverse('change_password'), {
+            'old_password': 'password', 'new_password1': 'n3w-Passw0rd!', 'new_password2': 'n3w-Passw0rd!',
+        })
+        self.assertEqual(response.status_code, 302)
+        new_key = client.session.session_key
+        self.assertNotEqual(new_key, old_key)
+        self.assertEqual(list(UserSession.objects.values_list('session_key', flat=True)), [new_key])
+        self.assertEqual(UserSession.objects.get().ip, '10.0.0.7')  # Ligne déplacée, pas recréée
+
+    def test_global_stats_indexed_cached_counts(self):
+        User.objects.filter(id=self.members[0].id).update(is_hidden=True, is_verified=True)
+        admin_client = self._login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = admin_client.get(reverse('admin_panel'))
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT' in q['sql'] and '"api_user"' in q['sql']
+                  and 'api_usersession' not in q['sql']]
+        self.assertEqual(len(counts), 5)  # Un COUNT par indicateur, sans agrégation conditionnelle
+        self.assertFalse(any('CASE WHEN' in sql or 'FILTER (WHERE' in sql for sql in counts))
+        with CaptureQueriesContext(connection) as ctx:
+            admin_client.get(reverse('admin_panel'))
+        self.assertFalse(any('COUNT' in q['sql'] and 'api_usersession' not in q['sql'] for q in ctx.captured_queries))
+        stats = response.context['stats']
+        self.assertEqual((stats['total'], stats['hidden'], stats['verified'], stats['staff']), (4, 1, 1, 1))
+        self.assertEqual(stats['active_today'], 1)
+
+        # Servi depuis le cache, invalidé par une action admin
+        User.objects.filter(id=self.members[1].id).update(is_verified=True)
+        self.assertEqual(admin_client.get(reverse('admin_panel')).context['stats']['verified'], 1)
+        admin_client.post(reverse('admin_toggle_hide', args=[self.members[2].id]))
+        stats = admin_client.get(reverse('admin_panel')).context['stats']
+        self.assertEqual((stats['verified'], stats['hidden']), (2, 2))
+
+
+class AdminPanelPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='password',
+                                                   is_onboarded=True)
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        # 60 utilisateurs dont certains ex aequo sur last_login et d'autres jamais connectés
+        users = [User(username=f'user{i:02d}', email=f'user{i:02d}@example.com', is_onboarded=True,
+                      last_login=None if i % 7 == 0 else now - timedelta(hours=i // 2),
+                      last_login_ip=f'10.0.{i}.1')
+                 for i in range(60)]
+        User.objects.bulk_create(users)
+
+    def test_cursor_walks_every_user_once(self):
+        seen, after, pages = [], '', 0
+        while True:
+            response = self.client.get(reverse('admin_panel'), {'after': after} if after else {})
+            seen += [u.username for u in response.context['users']]
+            pages += 1
+            after = response.context['next_cursor']
+            if not after:
+                break
+        self.assertEqual(pages, 2)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), User.objects.count())
+        # Jamais connectés en dernier
+        self.assertEqual(seen[-1], 'user00')
+
+    def test_invalid_cursor_restarts(self):
+        response = self.client.get(reverse('admin_panel'), {'after': 'not-a-cursor'})
+        self.assertTrue(response.context['is_first_page'])
+
+    def test_ip_prefix_search(self):
+        response = self.client.get(reverse('admin_panel'), {'q': '10.0.4'})
+        self.assertEqual(sorted(u.username for u in response.context['users']),
+                         ['user04', 'user40', 'user41', 'user42', 'user43', 'user44', 'user45', 'user46',
+                          'user47', 'user48', 'user49'])
@@ -0,0 +1,159 @@
+"""
+Non-régression des plans d'exécution : la requête principale de chaque vue
+chaude doit passer par son index composite / partiel (EXPLAIN), sur un jeu de
+données synthétique assez gros pour que le planificateur ait le choix.
+Le SQL expliqué est celui que la vue émet réellement (capturé pendant une
+requête du client de test), pas une copie du queryset.
+SQLite : "SEARCH ... USING [COVERING] INDEX <nom>" ; PostgreSQL : "Index [Only] Scan using <nom>".
+"""
+import re
+from datetime import time, timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.models import (
+    Article, Category, Comment, CustomEvent, DailyLog, Exercise, ExerciseSet, User, WorkoutSession,
+)
+
+USERS = 60
+SESSIONS_PER_USER = 25
+SETS_PER_SESSION = 6
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+FULL_SCAN = {
+    'sqlite': r'\bSCAN {table}\b(?! USING)',
+    'postgresql': r'Seq Scan on {table}\b',
+}
+EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([
+            User(username=f'plan{i}', email=f'plan{i}@example.com', password='!', is_onboarded=True)
+            for i in range(USERS)
+        ])
+        exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'Move {i}', slug=f'move-{i}', muscle_group='chest', difficulty='beginner', description='d')
+            for i in range(10)
+        ])
+        now = timezone.now()
+        sessions = WorkoutSession.objects.bulk_create([
+            WorkoutSession(user=user, started_at=now - timedelta(days=n),
+                           status='active' if n == 0 else 'completed')
+            for user in users for n in range(SESSIONS_PER_USER)
+        ])
+        ExerciseSet.objects.bulk_create([
+            ExerciseSet(session=session, exercise=exercises[n % len(exercises)], set_number=n // 2 + 1,
+                        reps=10, weight=50)
+            for session in sessions for n in range(SETS_PER_SESSION)
+        ], batch_size=2000)
+        today = timezone.now().date()
+        for n in range(60, 0, -1):
+            # date est en auto_now_add : créés "aujourd'hui", puis reculés d'un bloc
+            DailyLog.objects.bulk_create([DailyLog(user=user, water_liters=2, sleep_hours=7) for user in users])
+            DailyLog.objects.filter(date=today).update(date=today - timedelta(days=n))
+        CustomEvent.objects.bulk_create([
+            CustomEvent(user=user, title='Event', day_of_week=DAYS[n % 7], start_time=time(6 + n % 12))
+            for user in users for n in range(21)
+        ])
+        category = Category.objects.create(name='Plans', slug='plans')
+        articles = Article.objects.bulk_create([
+            Article(title=f'Article {n}', slug=f'article-{n}', author=users[n % USERS], category=category,
+                    content='c', is_published=n % 10 != 0)
+            for n in range(1500)
+        ])
+        Comment.objects.bulk_create([
+            Comment(article=articles[n % len(articles)], author=users[n % USERS], content='c')
+            for n in range(6000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.user = users[USERS // 2]
+        cls.session = sessions[USERS // 2 * SESSIONS_PER_USER]
+        cls.article = articles[42]
+        cls.exercise = exercises[0]
+
+    def setUp(self):
+        if connection.vendor not in FULL_SCAN:
+            self.skipTest(f'Plans non vérifiés pour {connection.vendor}')
+        self.client.force_login(self.user)
+
+    def view_queries(self, url, method='get', **kwargs):
+        """SQL émis par la vue pendant une requête du client de test."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, msg=f'{url} a répondu {response.status_code}')
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN[connection.vendor] + sql)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertViewUsesIndex(self, queries, table, pattern, index_name):
+        """La requête de la vue sur `table` qui correspond à `pattern` passe par `index_name`."""
+        matching = [sql for sql in queries if sql.startswith('SELECT')
+                    and f'FROM "{table}"' in sql and re.search(pattern, sql)]
+        self.assertEqual(len(matching), 1, msg=f'Requête {pattern!r} sur {table} introuvable ou ambiguë :\n'
+                         + '\n'.join(queries))
+        plan = self.explain(matching[0])
+        self.assertIn(index_name, plan, msg=f'Index {index_name} absent du plan :\n{matching[0]}\n{plan}')
+        self.assertIsNone(re.search(FULL_SCAN[connection.vendor].format(table=table), plan),
+                          msg=f'Parcours complet de {table} :\n{matching[0]}\n{plan}')
+
+    def test_workout_history(self):
+        queries = self.view_queries(reverse('workout_history'))
+        self.assertViewUsesIndex(queries, 'api_workoutsession', r'LIMIT 20$', 'session_user_status_idx')
+
+    def test_active_session(self):
+        queries = self.view_queries(reverse('start_workout'))
+        self.assertViewUsesIndex(queries, 'api_workoutsession', r"\"status\" = 'active'", 'session_user_status_idx')
+
+    def test_next_set_numbers(self):
+        # api.services.sets.log_sets, appelé par la vue d'ajout de set
+        url = reverse('add_set_to_session', args=[self.session.id])
+        queries = self.view_queries(url, 'post', data={'exercise_id': self.exercise.id, 'reps': 8, 'weight': 40})
+        self.assertViewUsesIndex(queries, 'api_exerciseset', r'MAX\("api_exerciseset"."set_number"\)',
+                                 'set_session_exercise_idx')
+
+    def test_recent_daily_logs(self):
+        # Index unique (user, date), parcouru à l'envers
+        queries = self.view_queries(reverse('dashboard'))
+        self.assertViewUsesIndex(queries, 'api_dailylog', r'ORDER BY "api_dailylog"."date" DESC LIMIT 30',
+                                 'api_dailylog_user_id_date')
+
+    def test_today_agenda(self):
+        queries = self.view_queries(reverse('dashboard'))
+        self.assertViewUsesIndex(queries, 'api_customevent', r'"day_of_week" =', 'event_user_day_idx')
+
+    def test_published_articles(self):
+        queries = self.view_queries(reverse('blog_list'))
+        self.assertViewUsesIndex(queries, 'api_article', r'"is_published" ORDER BY "api_article"."created_at" DESC',
+                                 'article_published_idx')
+
+    def test_author_articles(self):
+        token = RefreshToken.for_user(self.user).access_token
+        queries = self.view_queries(reverse('api:article-me'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertViewUsesIndex(queries, 'api_article', r'"author_id" = \d+ ORDER BY',
+                                 'article_author_created_idx')
+
+    def test_article_comments(self):
+        queries = self.view_queries(reverse('article_detail', args=[self.article.slug]))
+        self.assertViewUsesIndex(queries, 'api_comment', r'"article_id" = \d+ ORDER BY',
+                                 'comment_article_created_idx')
+
+    def test_admin_flag_counts(self):
+        # web.views.admin_panel._global_stats : un COUNT par index partiel
+        admin = User.objects.create_superuser('plan-admin', 'plan-admin@example.com', None, is_onboarded=True)
+        self.client.force_login(admin)
+        queries = self.view_queries(reverse('admin_panel'))
+        for flag, index_name in [('is_hidden', 'user_hidden_partial_idx'),
+                                 ('is_verified', 'user_verified_partial_idx'),
+                                 ('is_staff', 'user_staff_partial_idx')]:
+            self.assertViewUsesIndex(queries, 'api_user', rf'COUNT\(\*\).*WHERE "api_user"."{flag}"$', index_name)
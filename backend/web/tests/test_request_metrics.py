@@ -0,0 +1,87 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.models import DailyLog, User
+from web.metrics import current_metrics, start_metrics, stop_metrics
+from web.middleware import QueryBudgetExceeded, logger
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='metered', password='password', is_onboarded=True)
+        self.staff = User.objects.create_user(username='ops', password='password', is_onboarded=True, is_staff=True)
+
+    def test_logs_structured_line(self):
+        with self.assertLogs('api.metrics', level='INFO') as logs:
+            self.client.get(reverse('home'))
+        record = next(r for r in logs.records if r.getMessage().startswith('request_metrics'))
+        self.assertEqual(record.metrics['url_name'], 'home')
+        self.assertEqual(record.metrics['status'], 200)
+        for key in ('queries', 'db_ms', 'cache_hits', 'cache_misses', 'template_ms', 'total_ms'):
+            self.assertIn(key, record.metrics)
+
+    @override_settings(DEBUG=False)
+    def test_server_timing_for_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')))
+
+        self.client.force_login(self.staff)
+        header = self.client.get(reverse('dashboard'))['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('tpl;dur=', header)
+
+    def test_strict_budgets_under_test_runner(self):
+        self.assertTrue(settings.QUERY_BUDGETS_STRICT)
+
+    def test_dashboard_budget_with_a_month_of_logs(self):
+        # Budget calibré sur un historique réel : 30 journaux, pas seulement celui du jour
+        today = timezone.now().date()
+        for day in range(1, 31):
+            log = DailyLog.objects.create(user=self.user, sleep_hours=7, weight=70, mood=3)
+            DailyLog.objects.filter(id=log.id).update(date=today - timedelta(days=day))  # date : auto_now_add
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'))  # QueryBudgetExceeded au-delà du budget
+        self.assertEqual(len(response.context['chart_dates']), 30)
+
+    def test_streaming_response_measured_to_the_end(self):
+        token = RefreshToken.for_user(self.user).access_token
+        url = reverse('api:user-export-mine', kwargs={'dataset': 'daily_logs'})
+        with self.assertLogs('api.metrics', level='INFO') as logs:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+            logger.info('stream_started')  # Rien d'autre n'est journalisé avant la fin du flux
+            self.assertEqual(len(logs.records), 1)
+            b''.join(response.streaming_content)
+        record = logs.records[-1]
+        self.assertTrue(record.getMessage().startswith('request_metrics'))
+        self.assertEqual(record.metrics['queries'], 2)  # Utilisateur (JWT), puis le journal exporté
+
+    @override_settings(QUERY_BUDGETS={'home': 0}, QUERY_BUDGETS_STRICT=True)
+    def test_budget_exceeded_fails_in_strict_mode(self):
+        self.client.force_login(self.user)
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('django.request', 'ERROR'):
+            self.client.get(reverse('home'))
+
+    @override_settings(QUERY_BUDGETS={'home': 0}, QUERY_BUDGETS_STRICT=False)
+    def test_budget_exceeded_warns_otherwise(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('api.metrics', level='WARNING') as logs:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('query_budget_exceeded' in line for line in logs.output))
+
+    def test_cache_counted_only_inside_request(self):
+        cache.set('metrics-key', 1)
+        metrics, token = start_metrics()
+        try:
+            cache.get('metrics-key')
+            cache.get('metrics-missing')
+            cache.get_many(['metrics-key', 'metrics-missing'])
+        finally:
+            stop_metrics(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 2))
+        self.assertIsNone(current_metrics())
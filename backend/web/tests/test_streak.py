@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from api.models import User, UserStats
+from api.services.gamification import touch_streak
+
+
+class StreakMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='streaker', password='password', is_onboarded=True)
+        yesterday = timezone.now().date() - timedelta(days=1)
+        UserStats.objects.filter(user=self.user).update(current_streak=3, last_activity_date=yesterday)
+        self.user = User.objects.get(id=self.user.id)
+
+    def test_tracked_page_updates_streak(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('blog_list'))
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.current_streak, 4)
+        self.assertEqual(stats.last_activity_date, timezone.now().date())
+
+    def test_untracked_page_leaves_streak(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('exercise_library'))
+        self.assertEqual(UserStats.objects.get(user=self.user).current_streak, 3)
+
+    def test_second_touch_of_the_day_is_free(self):
+        self.assertTrue(touch_streak(User.objects.get(id=self.user.id)))
+        with self.assertNumQueries(0):
+            self.assertFalse(touch_streak(User(id=self.user.id)))
+
+    def test_later_page_views_skip_stats(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('blog_list'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('blog_list'))
+        self.assertFalse([q for q in ctx.captured_queries if 'UPDATE "api_userstats"' in q['sql']])
@@ -51,6 +51,15 @@ class WebTests(TestCase):
         self.assertEqual(Comment.objects.count(), 1)
         self.assertEqual(Comment.objects.first().content, 'This is a test comment.')
 
+    def test_article_detail_view(self):
+        """
+        Verify that the article page renders with its comment form.
+        """
+        response = self.client.get(reverse('article_detail', args=[self.article.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test Article')
+        self.assertContains(response, 'window.articleConfig')
+
     def test_article_like(self):
         """
         Verify that a user can like an article.
@@ -0,0 +1,68 @@
+import json
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from api.models import User, Exercise, ExerciseSet, WorkoutSession
+
+
+class BatchSetLoggingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lifter', password='password', is_onboarded=True)
+        self.client.force_login(self.user)
+        self.bench = Exercise.objects.create(name='Bench', muscle_group='chest', difficulty='beginner', description='d')
+        self.squat = Exercise.objects.create(name='Squat', muscle_group='legs', difficulty='beginner', description='d')
+        self.session = WorkoutSession.objects.create(user=self.user)
+        ExerciseSet.objects.create(session=self.session, exercise=self.bench, set_number=1, reps=10, weight=50)
+        self.url = reverse('add_sets_to_session', args=[self.session.id])
+
+    def _post(self, sets):
+        return self.client.post(self.url, json.dumps({'sets': sets}), content_type='application/json')
+
+    def test_batch_numbers_sets_per_exercise(self):
+        queued = [
+            {'exercise_id': self.bench.id, 'reps': 8, 'weight': 55},
+            {'exercise_id': self.squat.id, 'reps': 5, 'weight': 100},
+            {'exercise_id': self.bench.id, 'reps': 6, 'weight': 60, 'rest_seconds': 90},
+        ]
+        response = self._post(queued)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_sets'], 4)
+        self.assertEqual([(s['exercise_name'], s['set_number']) for s in data['sets']],
+                         [('Bench', 2), ('Squat', 1), ('Bench', 3)])
+        self.assertEqual(data['sets'][2]['rest_seconds'], 90)
+
+    def test_batch_query_count_does_not_grow_with_sets(self):
+        def post_counting(count):
+            with CaptureQueriesContext(connection) as ctx:
+                self._post([{'exercise_id': self.squat.id, 'reps': 5, 'weight': 80 + i} for i in range(count)])
+            return len(ctx.captured_queries)
+
+        post_counting(1)  # Première série de squat : crée son total par exercice
+        self.assertEqual(post_counting(2), post_counting(30))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.sets_count, 34)
+        self.assertEqual(self.session.sets.count(), 34)
+
+    def test_invalid_batch_writes_nothing(self):
+        response = self._post([{'exercise_id': self.bench.id, 'reps': 8, 'weight': 55},
+                               {'exercise_id': 999, 'reps': 5, 'weight': 100}])
+        self.assertEqual(response.status_code, 400)
+        response = self._post([{'exercise_id': self.bench.id, 'reps': 0, 'weight': 55}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.session.sets.count(), 1)
+
+    def test_single_set_endpoint_uses_same_numbering(self):
+        response = self.client.post(reverse('add_set_to_session', args=[self.session.id]),
+                                    {'exercise_id': self.bench.id, 'reps': 10, 'weight': 52.5})
+        data = response.json()
+        self.assertEqual((data['set']['set_number'], data['total_sets']), (2, 2))
+        self.assertEqual(data['set']['volume'], 525)
+
+    def test_completed_session_rejected(self):
+        self.session.complete_session()
+        response = self._post([{'exercise_id': self.bench.id, 'reps': 8, 'weight': 55}])
+        self.assertEqual(response.status_code, 400)
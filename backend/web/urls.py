@@ -63,6 +63,7 @@ urlpatterns = [
     path('workout/start/', views.start_workout, name='start_workout'),
     path('workout/session/<int:session_id>/', views.workout_session, name='workout_session_detail'),
     path('workout/session/<int:session_id>/add-set/', views.add_set_to_session, name='add_set_to_session'),
+    path('workout/session/<int:session_id>/add-sets/', views.add_sets_to_session, name='add_sets_to_session'),
     path('workout/session/<int:session_id>/complete/', views.complete_workout_session, name='complete_workout_session'),
     path('workout/history/', views.workout_history, name='workout_history'),
     path('workout/detail/<int:session_id>/', views.workout_detail, name='workout_detail'),
@@ -3,6 +3,6 @@ from .auth import login_view, logout_view, register_view, profile_view, edit_pro
 from .dashboard import dashboard_view, analytics_view, leaderboard_view
 from .planner import planner_view, custom_planner_view, delete_custom_event, complete_custom_event
 from .content import exercise_library, recipe_list, recipe_detail, blog_list, article_detail, delete_comment, like_article
-from .workout import workout_setup_view, workout_session_view, complete_workout, start_workout, workout_session, add_set_to_session, complete_workout_session, workout_history, workout_detail
+from .workout import workout_setup_view, workout_session_view, complete_workout, start_workout, workout_session, add_set_to_session, add_sets_to_session, complete_workout_session, workout_history, workout_detail
 from .onboarding import onboarding_welcome, onboarding_step1, onboarding_step2, onboarding_step3
 from .admin_panel import admin_panel, admin_toggle_hide, admin_delete_user
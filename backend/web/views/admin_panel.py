@@ -8,33 +8,82 @@ Features:
 - Liste tous les utilisateurs avec : last_login, last_login_ip, user_agent, login_count, sessions actives
 - Toggle masquage (is_hidden)
 - Suppression définitive
-- Recherche + tri
+- Recherche + tri, pagination par curseur (keyset)
 - Stats temps réel (total users, actifs aujourd'hui, sessions ouvertes)
 """
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.translation import gettext as _
 from django.utils import timezone
-from django.contrib.sessions.models import Session
-from django.db.models import Q
-from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import F, Q
 from api.models import User
+from api.services.sessions import active_session_counts, online_user_count
 
 
 def is_superuser(user):
     return user.is_authenticated and user.is_superuser
 
 
-def _active_sessions_for_user(user_id: int) -> int:
-    """Compte les sessions actives (non expirées) d'un utilisateur."""
-    now = timezone.now()
-    count = 0
-    for s in Session.objects.filter(expire_date__gte=now):
-        data = s.get_decoded()
-        if str(data.get('_auth_user_id')) == str(user_id):
-            count += 1
-    return count
+ADMIN_PAGE_SIZE = 50
+IP_PREFIX_RE = re.compile(r'^[0-9a-fA-F.:]+$')
+
+
+def _encode_cursor(user):
+    """Curseur opaque "<last_login ISO>|<id>" de la dernière ligne affichée."""
+    last_login = user.last_login.isoformat() if user.last_login else ''
+    return urlsafe_b64encode(f'{last_login}|{user.id}'.encode()).decode()
+
+
+def _decode_cursor(value):
+    """(last_login ou None, id), ou None si le curseur est absent ou invalide."""
+    if not value:
+        return None
+    try:
+        last_login, user_id = urlsafe_b64decode(value.encode()).decode().split('|')
+        return (datetime.fromisoformat(last_login) if last_login else None), int(user_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _after_cursor(last_login, user_id):
+    """Lignes strictement après le curseur dans l'ordre (last_login DESC NULLS LAST, id DESC)."""
+    if last_login is None:
+        return Q(last_login__isnull=True, id__lt=user_id)
+    return (
+        Q(last_login__lt=last_login)
+        | Q(last_login=last_login, id__lt=user_id)
+        | Q(last_login__isnull=True)
+    )
+
+
+ADMIN_STATS_CACHE_KEY = 'admin-panel:stats'
+ADMIN_STATS_TTL = 60  # secondes
+
+
+def _global_stats(today_start):
+    """
+    Stats globales, mises en cache ADMIN_STATS_TTL secondes. Un COUNT par
+    indicateur, chacun servi par son index (last_login, index partiels
+    is_hidden / is_verified / is_staff) : une agrégation conditionnelle
+    unique parcourrait toute la table.
+    """
+    stats = cache.get(ADMIN_STATS_CACHE_KEY)
+    if stats is None:
+        stats = {
+            'total': User.objects.count(),
+            'active_today': User.objects.filter(last_login__gte=today_start).count(),
+            'hidden': User.objects.filter(is_hidden=True).count(),
+            'verified': User.objects.filter(is_verified=True).count(),
+            'staff': User.objects.filter(is_staff=True).count(),
+        }
+        stats['online_now'] = online_user_count()
+        cache.set(ADMIN_STATS_CACHE_KEY, stats, ADMIN_STATS_TTL)
+    return stats
 
 
 @user_passes_test(is_superuser, login_url='login')
@@ -43,46 +92,47 @@ def admin_panel(request):
     q = request.GET.get('q', '').strip()
     show_hidden = request.GET.get('show_hidden') == '1'
 
-    users_qs = User.objects.all().order_by('-last_login', '-date_joined')
+    # Ordre stable couvert par l'index user_login_keyset_idx
+    users_qs = User.objects.order_by(F('last_login').desc(nulls_last=True), '-id')
 
     if not show_hidden:
         users_qs = users_qs.filter(is_hidden=False)
 
     if q:
-        users_qs = users_qs.filter(
-            Q(username__icontains=q) | Q(email__icontains=q) | Q(last_login_ip__icontains=q)
-        )
-
-    # Annoter chaque user avec ses sessions actives (calcul Python car Session est dans une autre DB logique)
-    users = list(users_qs[:200])  # limite raisonnable
+        # username/email : index trigram (PostgreSQL) ; IP : recherche par préfixe
+        search = Q(username__icontains=q) | Q(email__icontains=q)
+        if IP_PREFIX_RE.match(q):
+            search |= Q(last_login_ip__startswith=q)
+        users_qs = users_qs.filter(search)
+
+    # Pagination par curseur : la page N coûte autant que la première
+    cursor = _decode_cursor(request.GET.get('after', ''))
+    if cursor is not None:
+        users_qs = users_qs.filter(_after_cursor(*cursor))
+    users = list(users_qs[:ADMIN_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(users) > ADMIN_PAGE_SIZE:
+        users = users[:ADMIN_PAGE_SIZE]
+        next_cursor = _encode_cursor(users[-1])
+
+    # Annoter chaque user avec ses sessions actives (index UserSession : une requête groupée)
     now = timezone.now()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    sessions_active = Session.objects.filter(expire_date__gte=now)
-    active_user_ids = set()
-    for s in sessions_active:
-        uid = s.get_decoded().get('_auth_user_id')
-        if uid:
-            active_user_ids.add(int(uid))
+    session_counts = active_session_counts([u.id for u in users])
 
     for u in users:
-        u.is_online = u.id in active_user_ids
-        u.active_sessions = _active_sessions_for_user(u.id) if u.is_online else 0
-
-    # Stats globales
-    stats = {
-        'total': User.objects.count(),
-        'active_today': User.objects.filter(last_login__gte=today_start).count(),
-        'online_now': len(active_user_ids),
-        'hidden': User.objects.filter(is_hidden=True).count(),
-        'verified': User.objects.filter(is_verified=True).count(),
-        'staff': User.objects.filter(is_staff=True).count(),
-    }
+        u.active_sessions = session_counts.get(u.id, 0)
+        u.is_online = u.active_sessions > 0
+
+    stats = _global_stats(today_start)
 
     return render(request, 'web/admin_panel.html', {
         'users': users,
         'stats': stats,
         'q': q,
         'show_hidden': show_hidden,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
     })
 
 
@@ -97,6 +147,7 @@ def admin_toggle_hide(request, user_id: int):
         return redirect('admin_panel')
     target.is_hidden = not target.is_hidden
     target.save(update_fields=['is_hidden'])
+    cache.delete(ADMIN_STATS_CACHE_KEY)
     state = _("masqué") if target.is_hidden else _("réaffiché")
     messages.success(request, _("L'utilisateur %(u)s a été %(s)s.") % {'u': target.username, 's': state})
     return redirect('admin_panel')
@@ -116,5 +167,6 @@ def admin_delete_user(request, user_id: int):
         return redirect('admin_panel')
     username = target.username
     target.delete()
+    cache.delete(ADMIN_STATS_CACHE_KEY)
     messages.success(request, _("L'utilisateur %(u)s a été supprimé définitivement.") % {'u': username})
     return redirect('admin_panel')
@@ -8,7 +8,8 @@ from django.conf import settings
 from django.urls import reverse
 from web.forms import CustomUserCreationForm, CustomAuthenticationForm, UserUpdateForm, CustomPasswordChangeForm
 from api.models import User
-from api.services.gamification import check_and_award_badges
+from api.services.gamification import check_and_award_badges, touch_streak
+from api.services.sessions import sync_rotated_session
 
 def login_view(request):
     """
@@ -21,8 +22,7 @@ def login_view(request):
             user = form.get_user()
             login(request, user)
             # Update Streak on Login
-            if hasattr(user, 'stats'):
-                user.stats.update_streak()
+            touch_streak(user)
             return redirect('home')
         else:
             messages.error(request, _("Identifiants invalides."))
@@ -51,8 +51,7 @@ def register_view(request):
             user.backend = 'django.contrib.auth.backends.ModelBackend'
             login(request, user)
             # Init Streak
-            if hasattr(user, 'stats'):
-                user.stats.update_streak()
+            touch_streak(user)
             
             # Send Welcome Email
             try:
@@ -81,10 +80,6 @@ def register_view(request):
 
 @login_required(login_url='login')
 def profile_view(request):
-    # Update Streak on Profile Visit
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     latest_plan = request.user.plans.order_by('-created_at').first()
     return render(request, 'web/profile.html', {'user': request.user, 'plan': latest_plan})
 
@@ -106,7 +101,9 @@ def change_password(request):
         form = CustomPasswordChangeForm(request.user, request.POST)
         if form.is_valid():
             user = form.save()
-            update_session_auth_hash(request, user)  # Important!
+            old_key = request.session.session_key
+            update_session_auth_hash(request, user)  # Important! (change la clé de session)
+            sync_rotated_session(request, old_key)
             messages.success(request, _('Ton nouveau mot de passe est actif. Ta sécurité est assurée. 🔒'))
             return redirect('profile')
         else:
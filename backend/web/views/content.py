@@ -76,10 +76,6 @@ def blog_list(request):
     Liste des articles de blog.
     Supporte la recherche textuelle et le filtrage par catégorie.
     """
-    # Update Streak if reading blog
-    if request.user.is_authenticated and hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     # Optimisé: select_related pour author et category
     articles = Article.objects.filter(is_published=True).select_related('author', 'category')
     categories = Category.objects.all()
@@ -109,10 +105,6 @@ def article_detail(request, slug):
     Permet de liker et de commenter.
     Affiche des articles similaires en bas de page.
     """
-    # Update Streak if reading article
-    if request.user.is_authenticated and hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     # Optimisé: select_related pour author et category, prefetch comments avec authors
     article = get_object_or_404(
         Article.objects.select_related('author', 'category').prefetch_related('comments__author'),
@@ -173,10 +165,6 @@ def delete_comment(request, comment_id):
 
 @login_required(login_url='login')
 def like_article(request, slug):
-    # Like action also counts for streak
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     article = get_object_or_404(Article, slug=slug)
     if article.likes.filter(id=request.user.id).exists():
         article.likes.remove(request.user)
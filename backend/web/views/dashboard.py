@@ -3,10 +3,13 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.utils.translation import gettext as _
-from django.db.models import Avg, Sum, Count, F, Q, Max
+from django.db.models import Avg, Sum
 from datetime import timedelta
 from web.forms import DailyLogForm
-from api.models import DailyLog, WorkoutSession, User, ExerciseSet, Exercise
+from api.services.consistency import get_consistency_score, refresh_consistency_score
+from api.services.records import get_personal_records
+from api.services.leaderboard import get_leaderboards, get_user_ranks
+from api.models import DailyLog, Exercise, UserWorkoutAggregate
 
 @login_required(login_url='login')
 def dashboard_view(request):
@@ -18,16 +21,13 @@ def dashboard_view(request):
     - Les graphiques de progression (Poids, Humeur, Sommeil)
     - L'agenda du jour
     """
-    # Update Streak
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     today_log, created = DailyLog.objects.get_or_create(user=request.user, date=timezone.now().date())
     
     if request.method == 'POST':
         form = DailyLogForm(request.POST, instance=today_log)
         if form.is_valid():
             form.save()
+            refresh_consistency_score(request.user.id)  # Le journal rempli compte comme jour actif
             # Reward for logging (once per day fully)
             request.user.stats.add_xp(20)
             messages.success(request, _("Bien joué ! Ta journée est enregistrée. +20 d'énergie"))
@@ -40,14 +40,14 @@ def dashboard_view(request):
     avg_sleep = week_logs.aggregate(Avg('sleep_hours'))['sleep_hours__avg'] or 0
     avg_water = week_logs.aggregate(Avg('water_liters'))['water_liters__avg'] or 0
     
-    # Chart Data (Last 30 days) - optimisé
-    recent_logs = request.user.daily_logs.only('date', 'weight', 'sleep_hours', 'mood').order_by('-date')[:30]
-    chart_logs = sorted(recent_logs, key=lambda x: x.date)
+    # Chart Data (Last 30 days) - une requête : values() évite le rechargement de user_id ligne par ligne
+    recent_logs = request.user.daily_logs.values('date', 'weight', 'sleep_hours', 'mood').order_by('-date')[:30]
+    chart_logs = sorted(recent_logs, key=lambda x: x['date'])
     
-    chart_dates = [log.date.strftime('%d/%m') for log in chart_logs]
-    chart_weight = [log.weight for log in chart_logs if log.weight]
-    chart_sleep = [log.sleep_hours for log in chart_logs]
-    chart_mood = [log.mood for log in chart_logs]
+    chart_dates = [log['date'].strftime('%d/%m') for log in chart_logs]
+    chart_weight = [log['weight'] for log in chart_logs if log['weight']]
+    chart_sleep = [log['sleep_hours'] for log in chart_logs]
+    chart_mood = [log['mood'] for log in chart_logs]
     
     # Today's Agenda
     today_events = request.user.custom_events.filter(
@@ -76,25 +76,16 @@ def analytics_view(request):
     today = timezone.now().date()
     last_30_days = today - timedelta(days=30)
     
-    # 1. GLOBAL STATS
-    total_workouts = WorkoutSession.objects.filter(user=user, status='completed').count()
-    
-    global_stats = WorkoutSession.objects.filter(user=user, status='completed').aggregate(
-        total_vol=Sum('total_volume'),
-        total_time=Sum('duration_minutes')
-    )
-    total_volume = global_stats['total_vol'] or 0
-    total_duration = global_stats['total_time'] or 0
-    
-    # Consistency Score
-    logs_dates = set(DailyLog.objects.filter(user=user, date__gte=last_30_days).values_list('date', flat=True))
-    workouts_dates = set(WorkoutSession.objects.filter(user=user, started_at__date__gte=last_30_days, status='completed').values_list('started_at__date', flat=True))
-    active_days = len(logs_dates.union(workouts_dates))
-    consistency_score = int((active_days / 30) * 100)
+    # 1. GLOBAL STATS (compteurs de UserStats ; durée depuis les agrégats matérialisés)
+    aggregates = UserWorkoutAggregate.objects.filter(user=user)
+    day_totals = aggregates.filter(muscle_group=UserWorkoutAggregate.DAY_TOTAL)
+    stats = getattr(user, 'stats', None)
+    total_workouts = stats.completed_workouts if stats else 0
+    total_volume = stats.lifetime_volume if stats else 0
+    total_duration = day_totals.aggregate(total_time=Sum('duration_minutes'))['total_time'] or 0
     
-    if hasattr(user, 'stats') and user.stats.consistency_score != consistency_score:
-        user.stats.consistency_score = consistency_score
-        user.stats.save()
+    # Consistency Score (une requête UNION / COUNT ; stocké par les écritures, pas ici)
+    consistency_score = get_consistency_score(user.id, today)
 
     # 2. WEIGHT PROGRESSION
     weight_logs = DailyLog.objects.filter(
@@ -107,56 +98,24 @@ def analytics_view(request):
     weight_values = [log.weight for log in weight_logs]
 
     # 3. VOLUME BY MUSCLE GROUP
-    muscle_volume = ExerciseSet.objects.filter(
-        session__user=user,
-        session__status='completed'
-    ).values('exercise__muscle_group').annotate(
-        volume=Sum(F('weight') * F('reps'))
+    muscle_volume = aggregates.exclude(
+        muscle_group=UserWorkoutAggregate.DAY_TOTAL
+    ).values('muscle_group').annotate(
+        volume=Sum('volume')
     ).order_by('-volume')
     
     muscle_labels_map = dict(Exercise.MUSCLE_CHOICES)
-    muscle_labels = [muscle_labels_map.get(item['exercise__muscle_group'], item['exercise__muscle_group']) for item in muscle_volume]
+    muscle_labels = [muscle_labels_map.get(item['muscle_group'], item['muscle_group']) for item in muscle_volume]
     muscle_values = [item['volume'] for item in muscle_volume]
 
-    # 4. PERSONAL RECORDS (PR)
-    top_exercises_ids = ExerciseSet.objects.filter(
-        session__user=user,
-        session__status='completed'
-    ).values('exercise').annotate(
-        count=Count('id')
-    ).order_by('-count')[:6].values_list('exercise', flat=True)
-    
-    personal_records = []
-    for ex_id in top_exercises_ids:
-        exercise = Exercise.objects.get(id=ex_id)
-        max_weight = ExerciseSet.objects.filter(
-            session__user=user, 
-            exercise=exercise,
-            session__status='completed'
-        ).aggregate(Max('weight'))['weight__max'] or 0
-        
-        max_vol_set = ExerciseSet.objects.filter(
-            session__user=user, 
-            exercise=exercise,
-            session__status='completed'
-        ).annotate(
-            vol=F('weight') * F('reps')
-        ).order_by('-vol').first()
-        max_volume = max_vol_set.vol if max_vol_set else 0
-        
-        personal_records.append({
-            'exercise_name': exercise.name,
-            'max_weight': max_weight,
-            'max_volume': max_volume
-        })
+    # 4. PERSONAL RECORDS (PR) — une requête groupée, en cache jusqu'au prochain set
+    personal_records = get_personal_records(user, limit=6)
 
     # 5. WORKOUT FREQUENCY
     start_week = today - timedelta(days=6)
-    workouts_this_week = WorkoutSession.objects.filter(
-        user=user,
-        started_at__date__gte=start_week,
-        status='completed'
-    ).count()
+    workouts_this_week = day_totals.filter(
+        date__gte=start_week
+    ).aggregate(total=Sum('sessions_count'))['total'] or 0
     
     rest_days = 7 - workouts_this_week
     frequency_labels = ['Entraînement', 'Repos']
@@ -199,37 +158,17 @@ def analytics_view(request):
 def leaderboard_view(request):
     """
     Page de classement global des utilisateurs.
+    Top 10 et rangs servis depuis les classements en cache, sinon depuis le
+    snapshot et un COUNT indexé.
     """
-    # Top 10 XP (optimisé avec only)
-    top_xp = User.objects.select_related('stats').only('username', 'stats__xp', 'stats__level').order_by('-stats__xp')[:10]
-    
-    # Top 10 Streaks (optimisé avec only)
-    top_streak = User.objects.select_related('stats').only('username', 'stats__current_streak', 'stats__level').order_by('-stats__current_streak')[:10]
-    
-    # Top 10 Workouts
-    users_with_workouts = User.objects.annotate(
-        workout_count=Count('workout_sessions', filter=Q(workout_sessions__status='completed')),
-        total_volume=Sum('workout_sessions__total_volume', filter=Q(workout_sessions__status='completed'))
-    ).filter(workout_count__gt=0).order_by('-workout_count')[:10]
-    
-    # User ranks (optimisé - seulement IDs)
-    all_users_xp = list(User.objects.order_by('-stats__xp').values_list('id', flat=True))
-    all_users_streak = list(User.objects.order_by('-stats__current_streak').values_list('id', flat=True))
-    
-    user_rank_xp = all_users_xp.index(request.user.id) + 1 if request.user.id in all_users_xp else 0
-    user_rank_streak = all_users_streak.index(request.user.id) + 1 if request.user.id in all_users_streak else 0
-    
-    user_workouts = WorkoutSession.objects.filter(user=request.user, status='completed').count()
-    users_workout_counts = list(User.objects.annotate(
-        workout_count=Count('workout_sessions', filter=Q(workout_sessions__status='completed'))
-    ).filter(workout_count__gte=user_workouts).values_list('id', flat=True))
-    user_rank_workouts = len(users_workout_counts)
+    boards = get_leaderboards()
+    ranks = get_user_ranks(request.user)
     
     return render(request, 'web/leaderboard.html', {
-        'top_xp': top_xp,
-        'top_streak': top_streak,
-        'top_workouts': users_with_workouts,
-        'user_rank_xp': user_rank_xp,
-        'user_rank_streak': user_rank_streak,
-        'user_rank_workouts': user_rank_workouts
+        'top_xp': boards['xp'],
+        'top_streak': boards['streak'],
+        'top_workouts': boards['workouts'],
+        'user_rank_xp': ranks['xp'],
+        'user_rank_streak': ranks['streak'],
+        'user_rank_workouts': ranks['workouts']
     })
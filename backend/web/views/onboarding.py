@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.utils.translation import gettext as _
 from api.models import WellnessPlan
 from api.services import generate_wellness_plan
-from api.services.gamification import check_and_award_badges
+from api.services.gamification import check_and_award_badges, touch_streak
 
 @login_required(login_url='login')
 def onboarding_welcome(request):
@@ -71,10 +71,11 @@ def onboarding_step3(request):
                 if 'consistency' in breakdown:
                     request.user.stats.consistency_score = breakdown.get('consistency', 0)
 
+            request.user.stats.save()
             request.user.stats.add_xp(100)
-            request.user.stats.update_streak()
+            touch_streak(request.user)
         
-        new_badges = check_and_award_badges(request.user)
+        new_badges = check_and_award_badges(request.user, event='onboarding')
         
         request.user.is_onboarded = True
         request.user.save()
@@ -8,14 +8,10 @@ from django.views.decorators.http import require_POST
 from web.forms import WellnessPlanForm, CustomEventForm
 from api.models import WellnessPlan, CustomEvent
 from api.services import generate_wellness_plan
-from api.services.gamification import check_and_award_badges
+from api.services.gamification import check_and_award_badges, touch_streak
 
 @login_required(login_url='login')
 def planner_view(request):
-    # Update Streak on Planner Visit
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     plans = request.user.plans.order_by('-created_at')
     latest_plan = plans.first()
     
@@ -50,10 +46,10 @@ def planner_view(request):
                 request.user.stats.add_xp(100)
                 
                 # Update Streak (Explicit update on action)
-                request.user.stats.update_streak()
+                touch_streak(request.user)
                 
                 # Badge Trigger
-                check_and_award_badges(request.user)
+                check_and_award_badges(request.user, event='plan_created')
                 
             messages.success(request, _("Ton programme est prêt ! +100 d'énergie"))
             return redirect('planner')
@@ -77,10 +73,6 @@ def planner_view(request):
 
 @login_required(login_url='login')
 def custom_planner_view(request):
-    # Update Streak
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     events = request.user.custom_events.order_by('start_time')
     
     # Organize by day for the template
@@ -14,10 +14,6 @@ def home(request):
 
 @login_required(login_url='login')
 def tools_view(request):
-    # Update Streak on Tools Visit
-    if hasattr(request.user, 'stats'):
-        request.user.stats.update_streak()
-        
     latest_plan = None
     if request.user.is_authenticated:
         latest_plan = request.user.plans.order_by('-created_at').first()
@@ -4,10 +4,15 @@ from django.contrib import messages
 from django.utils.translation import gettext as _
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+import json
 import random
 from web.forms import CustomWorkoutForm
 from api.models import Exercise, WorkoutSession, ExerciseSet, DailyLog, Recipe
-from api.services.gamification import check_and_award_badges
+from api.serializers import ExerciseSetBatchSerializer
+from api.services.consistency import refresh_consistency_score
+from api.services.gamification import check_and_award_badges, touch_streak
+from api.services.sets import MAX_SETS_PER_BATCH, log_sets, set_payload
+from api.services.workout_stats import completed_sessions, get_workout_stats
 from django.utils import timezone
 
 @login_required(login_url='login')
@@ -144,7 +149,7 @@ def complete_workout(request):
     energy_gain = 100
     if hasattr(request.user, 'stats'):
         request.user.stats.add_xp(energy_gain)
-        request.user.stats.update_streak()
+        touch_streak(request.user)
     
     # 2. Add entry to Daily Log
     today_log, created = DailyLog.objects.get_or_create(user=request.user, date=timezone.now().date())
@@ -156,6 +161,7 @@ def complete_workout(request):
     else:
         today_log.notes = log_entry
     today_log.save()
+    refresh_consistency_score(request.user.id)
     
     return JsonResponse({
         'status': 'success',
@@ -220,7 +226,7 @@ def workout_session(request, session_id):
         'session': session,
         'exercises': exercises,
         'sets_by_exercise': sets_by_exercise,
-        'total_sets': session.sets.count()
+        'total_sets': session.sets_count
     })
 
 @login_required(login_url='login')
@@ -234,44 +240,54 @@ def add_set_to_session(request, session_id):
     if session.status != 'active':
         return JsonResponse({'error': 'Session non active'}, status=400)
     
+    serializer = ExerciseSetBatchSerializer(data=request.POST)
+    if not serializer.is_valid():
+        return JsonResponse({'error': 'Série invalide', 'errors': serializer.errors}, status=400)
     try:
-        exercise_id = int(request.POST.get('exercise_id'))
-        reps = int(request.POST.get('reps'))
-        weight = float(request.POST.get('weight'))
-        rest_seconds = int(request.POST.get('rest_seconds', 60))
-        notes = request.POST.get('notes', '')
-        
-        exercise = get_object_or_404(Exercise, id=exercise_id)
-        
-        last_set = session.sets.filter(exercise=exercise).order_by('-set_number').first()
-        set_number = (last_set.set_number + 1) if last_set else 1
-        
-        exercise_set = ExerciseSet.objects.create(
-            session=session,
-            exercise=exercise,
-            set_number=set_number,
-            reps=reps,
-            weight=weight,
-            rest_seconds=rest_seconds,
-            notes=notes
-        )
-        
-        return JsonResponse({
-            'status': 'success',
-            'set': {
-                'id': exercise_set.id,
-                'exercise_name': exercise.name,
-                'set_number': set_number,
-                'reps': reps,
-                'weight': weight,
-                'volume': exercise_set.volume,
-                'rest_seconds': rest_seconds
-            },
-            'total_sets': session.sets.count()
-        })
-    except Exception as e:
+        created, total_sets = log_sets(session, [serializer.validated_data])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'set': set_payload(created[0]),
+        'total_sets': total_sets
+    })
+
+@login_required(login_url='login')
+@require_POST
+def add_sets_to_session(request, session_id):
+    """
+    API endpoint pour ajouter plusieurs sets en une requête (Ajax, JSON).
+    Utilisé pour vider la file des séries enregistrées hors ligne.
+    Corps : {"sets": [{"exercise_id", "reps", "weight", "rest_seconds", "notes"}, ...]}
+    """
+    session = get_object_or_404(WorkoutSession, id=session_id, user=request.user)
+
+    if session.status != 'active':
+        return JsonResponse({'error': 'Session non active'}, status=400)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    serializer = ExerciseSetBatchSerializer(
+        data=payload.get('sets') if isinstance(payload, dict) else payload,
+        many=True, allow_empty=False, max_length=MAX_SETS_PER_BATCH,
+    )
+    if not serializer.is_valid():
+        return JsonResponse({'error': 'Séries invalides', 'errors': serializer.errors}, status=400)
+    try:
+        created, total_sets = log_sets(session, serializer.validated_data)
+    except ValueError as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+    return JsonResponse({
+        'status': 'success',
+        'sets': [set_payload(exercise_set) for exercise_set in created],
+        'total_sets': total_sets
+    })
+
 @login_required(login_url='login')
 @require_POST
 def complete_workout_session(request, session_id):
@@ -286,7 +302,7 @@ def complete_workout_session(request, session_id):
     
     session.complete_session()
     
-    new_badges = check_and_award_badges(request.user)
+    new_badges = check_and_award_badges(request.user, event='workout_completed')
     
     energy_earned = 50 + (session.duration_minutes // 10) * 10
     
@@ -296,7 +312,7 @@ def complete_workout_session(request, session_id):
         'energy_earned': energy_earned,
         'duration_minutes': session.duration_minutes,
         'total_volume': round(session.total_volume, 2),
-        'total_sets': session.sets.count(),
+        'total_sets': session.sets_count,
         'redirect_url': '/workout/history/'
     })
 
@@ -306,35 +322,24 @@ def workout_history(request):
     Historique des séances d'entraînement.
     Affiche toutes les sessions complétées avec statistiques.
     """
-    # Optimisé: only pour charger uniquement les champs nécessaires
-    sessions = WorkoutSession.objects.filter(
-        user=request.user,
-        status='completed'
-    ).prefetch_related('sets__exercise').only(
-        'id', 'started_at', 'duration_minutes', 'total_volume', 'status'
+    # Totaux et séries calculés en base (une requête d'agrégat + une requête LIMIT)
+    stats = get_workout_stats(request.user.id)
+    recent = stats['recent']
+    # Optimisé: only pour charger uniquement les champs affichés
+    sessions = completed_sessions(request.user.id).only(
+        'id', 'started_at', 'duration_minutes', 'total_volume', 'sets_count', 'status', 'notes'
     ).order_by('-started_at')
     
-    # Calculate overall stats
-    total_sessions = sessions.count()
-    total_volume = sum(s.total_volume for s in sessions)
-    total_duration = sum(s.duration_minutes for s in sessions)
-    
-    # Recent sessions for charts (last 10)
-    recent_sessions = sessions[:10]
-    chart_dates = [s.started_at.strftime('%d/%m') for s in reversed(list(recent_sessions))]
-    chart_volume = [s.total_volume for s in reversed(list(recent_sessions))]
-    chart_duration = [s.duration_minutes for s in reversed(list(recent_sessions))]
-    
     return render(request, 'web/workout/history.html', {
         'sessions': sessions[:20],  # Show last 20 sessions
-        'total_sessions': total_sessions,
-        'total_volume': round(total_volume, 2),
-        'total_duration': total_duration,
-        'avg_duration': round(total_duration / total_sessions, 2) if total_sessions > 0 else 0,
-        'avg_volume': round(total_volume / total_sessions, 2) if total_sessions > 0 else 0,
-        'chart_dates': chart_dates,
-        'chart_volume': chart_volume,
-        'chart_duration': chart_duration
+        'total_sessions': stats['total_sessions'],
+        'total_volume': stats['total_volume_kg'],
+        'total_duration': stats['total_duration_minutes'],
+        'avg_duration': stats['average_duration'],
+        'avg_volume': stats['average_volume'],
+        'chart_dates': [started_at.strftime('%d/%m') for started_at in recent['dates']],
+        'chart_volume': recent['volume'],
+        'chart_duration': recent['duration']
     })
 
 @login_required(login_url='login')